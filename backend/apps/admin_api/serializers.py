@@ -43,9 +43,9 @@ class AdminFlightPriceSerializer(serializers.ModelSerializer):
             'destination', 'destination_name', 'destination_code',
             'price_usd', 'airline', 'flight_duration_minutes',
             'departure_date', 'departure_time', 'arrival_time',
-            'is_roundtrip', 'created_at', 'updated_at'
+            'is_roundtrip', 'source', 'fetched_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['fetched_at', 'created_at', 'updated_at']
 
 
 class AdminHotelPriceSerializer(serializers.ModelSerializer):
@@ -58,6 +58,6 @@ class AdminHotelPriceSerializer(serializers.ModelSerializer):
             'id', 'city', 'city_name', 'city_code',
             'hotel_name', 'stars', 'price_per_night_usd',
             'rating', 'checkin_date', 'image_url',
-            'created_at', 'updated_at'
+            'source', 'fetched_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['fetched_at', 'created_at', 'updated_at']
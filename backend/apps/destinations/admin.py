@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Country, City
+from .models import Country, City, BookingDestination
 
 
 @admin.register(Country)
@@ -14,3 +14,9 @@ class CityAdmin(admin.ModelAdmin):
     list_display = ['name_uz', 'iata_code', 'country', 'is_hub', 'avg_hotel_price_usd']
     list_filter = ['is_hub', 'country']
     search_fields = ['name', 'name_uz', 'iata_code']
+
+
+@admin.register(BookingDestination)
+class BookingDestinationAdmin(admin.ModelAdmin):
+    list_display = ['city', 'dest_id', 'dest_type', 'updated_at']
+    search_fields = ['city__name', 'city__name_uz', 'dest_id']
@@ -1,7 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DestinationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.destinations'
     verbose_name = "Manzillar"
+
+    def ready(self):
+        from services.booking_destinations import invalidate_directory
+        from services.geo_index import invalidate_geo_index
+        from .models import BookingDestination, City
+
+        # Shahar koordinatalari o'zgarsa fazoviy indeks qayta tuziladi
+        post_save.connect(invalidate_geo_index, sender=City, dispatch_uid='geo_index_city_saved')
+        post_delete.connect(invalidate_geo_index, sender=City, dispatch_uid='geo_index_city_deleted')
+
+        # Booking.com ID katalogi (shahar nomlari yoki ID lar o'zgarsa)
+        for sender in (City, BookingDestination):
+            post_save.connect(invalidate_directory, sender=sender, dispatch_uid=f'booking_directory_{sender.__name__}_saved')
+            post_delete.connect(invalidate_directory, sender=sender, dispatch_uid=f'booking_directory_{sender.__name__}_deleted')
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 10:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0002_popularroute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDestination',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dest_id', models.CharField(max_length=20, verbose_name='Booking.com ID')),
+                ('dest_type', models.CharField(default='city', max_length=20, verbose_name='Turi')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Oxirgi yangilanish')),
+                ('city', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking_destination', to='destinations.city', verbose_name='Shahar')),
+            ],
+            options={
+                'verbose_name': 'Booking.com manzili',
+                'verbose_name_plural': 'Booking.com manzillari',
+            },
+        ),
+    ]
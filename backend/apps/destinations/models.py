@@ -131,3 +131,23 @@ class PopularRoute(models.Model):
 
     def __str__(self):
         return f"{self.origin.iata_code} → {self.destination.iata_code} (${self.avg_price})"
+
+
+class BookingDestination(models.Model):
+    """Booking.com shahar ID si (API orqali topilgan, services/booking_destinations.py)"""
+    city = models.OneToOneField(
+        City,
+        on_delete=models.CASCADE,
+        related_name='booking_destination',
+        verbose_name="Shahar"
+    )
+    dest_id = models.CharField(max_length=20, verbose_name="Booking.com ID")
+    dest_type = models.CharField(max_length=20, default='city', verbose_name="Turi")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Oxirgi yangilanish")
+
+    class Meta:
+        verbose_name = "Booking.com manzili"
+        verbose_name_plural = "Booking.com manzillari"
+
+    def __str__(self):
+        return f"{self.city.name}: {self.dest_id}"
@@ -1,8 +1,10 @@
-from rest_framework import viewsets, filters
+import math
+from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Country, City
 from .serializers import CountrySerializer, CitySerializer, CityMinimalSerializer
+from services.geo_index import get_geo_index
 
 
 class CountryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -38,3 +40,43 @@ class CityViewSet(viewsets.ReadOnlyModelViewSet):
         cities = cities[:10]
         serializer = CityMinimalSerializer(cities, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Yaqin atrofdagi shaharlar (code yoki lat/lon + radius km)"""
+        try:
+            radius = min(float(request.query_params.get('radius', 150)), 2000)
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({'error': "radius va limit son bo'lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+        # nan min() dan o'tib ketadi, 0 yoki manfiy limit esa ro'yxatni kesadi
+        if not math.isfinite(radius) or radius <= 0 or limit < 1:
+            return Response(
+                {'error': "radius musbat son, limit esa kamida 1 bo'lishi kerak"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        index = get_geo_index()
+        code = request.query_params.get('code', '').upper()
+        if code:
+            if code not in index.points:
+                return Response({'error': f"Shahar topilmadi: {code}"}, status=status.HTTP_404_NOT_FOUND)
+            found = index.nearby_code(code, radius, limit)
+        else:
+            try:
+                lat = float(request.query_params['lat'])
+                lon = float(request.query_params['lon'])
+            except (KeyError, ValueError):
+                return Response({'error': "code yoki lat va lon parametrlari kerak"}, status=status.HTTP_400_BAD_REQUEST)
+            if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+                return Response({'error': "lat/lon koordinatalari noto'g'ri"}, status=status.HTTP_400_BAD_REQUEST)
+            found = index.nearby(lat, lon, radius, limit)
+
+        cities = self.get_queryset().in_bulk([c for _, c in found], field_name='iata_code')
+        result = []
+        for distance, city_code in found:
+            if city_code in cities:
+                data = CitySerializer(cities[city_code]).data
+                data['distance_km'] = round(distance, 1)
+                result.append(data)
+        return Response(result)
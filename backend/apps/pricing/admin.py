@@ -4,13 +4,13 @@ from .models import FlightPrice, HotelPrice
 
 @admin.register(FlightPrice)
 class FlightPriceAdmin(admin.ModelAdmin):
-    list_display = ['origin', 'destination', 'price_usd', 'airline', 'departure_date']
-    list_filter = ['airline', 'departure_date', 'is_roundtrip']
+    list_display = ['origin', 'destination', 'price_usd', 'airline', 'departure_date', 'source', 'fetched_at']
+    list_filter = ['airline', 'departure_date', 'is_roundtrip', 'source']
     search_fields = ['origin__name_uz', 'destination__name_uz', 'airline']
 
 
 @admin.register(HotelPrice)
 class HotelPriceAdmin(admin.ModelAdmin):
-    list_display = ['hotel_name', 'city', 'stars', 'price_per_night_usd', 'rating']
-    list_filter = ['stars', 'city']
+    list_display = ['hotel_name', 'city', 'stars', 'price_per_night_usd', 'rating', 'source', 'fetched_at']
+    list_filter = ['stars', 'city', 'source']
     search_fields = ['hotel_name', 'city__name_uz']
@@ -0,0 +1,46 @@
+"""
+Taxminiy narxlar (imputatsiya) jadvalini tayyorlash management command
+
+Ishlatish:
+    python manage.py build_price_imputation
+    python manage.py build_price_imputation --min-samples 5
+    python manage.py build_price_imputation --output /tmp/imputation.json
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from services.price_imputation import fit_imputation_table, save_imputation_table
+
+
+class Command(BaseCommand):
+    help = "Tarixiy narxlardan hafta kuni va uchishgacha qolgan kunlar koeffitsientlarini hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help="Jadval fayli (default: settings.PRICE_IMPUTATION_PATH)"
+        )
+        parser.add_argument(
+            '--min-samples',
+            type=int,
+            default=3,
+            help="Yo'nalish jadvalga kirishi uchun minimal yozuvlar soni (default: 3)"
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.stdout.write("Imputatsiya jadvali tayyorlanmoqda...")
+
+        table = fit_imputation_table(min_samples=options['min_samples'])
+        path = save_imputation_table(table, options['output'])
+
+        self.stdout.write(f"  {len(table['routes'])} ta yo'nalish")
+        self.stdout.write(f"  Hafta kuni koeffitsientlari: {table['global']['dow']}")
+        self.stdout.write(f"  Qolgan kunlar koeffitsientlari: {table['global']['lead']}")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"\nJadval saqlandi: {path} ({elapsed:.2f} s)")
+        )
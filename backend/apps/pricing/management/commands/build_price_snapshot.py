@@ -0,0 +1,48 @@
+"""
+Parvozlar grafi snapshotini tayyorlash management command
+
+Ishlatish:
+    python manage.py build_price_snapshot
+    python manage.py build_price_snapshot --output /tmp/snapshot.pkl
+    python manage.py build_price_snapshot --no-hierarchy
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from services.price_snapshot import PriceSnapshot
+
+
+class Command(BaseCommand):
+    help = "Parvozlar grafi snapshotini va contraction hierarchy ni tayyorlaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help="Snapshot fayli (default: settings.PRICE_SNAPSHOT_PATH)"
+        )
+        parser.add_argument(
+            '--no-hierarchy',
+            action='store_true',
+            help="Contraction hierarchy tayyorlamaslik (faqat graf)"
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.stdout.write("Snapshot tayyorlanmoqda...")
+
+        snapshot = PriceSnapshot.build(with_hierarchy=not options['no_hierarchy'])
+        path = snapshot.save(options['output'])
+
+        nodes = len(snapshot.graph)
+        edges = sum(len(targets) for targets in snapshot.graph.values())
+        self.stdout.write(f"  {nodes} ta shahar, {edges} ta qirra")
+        self.stdout.write(f"  {snapshot.stats.get('pruned_edges', 0)} ta dominatsiya qilingan qirra olib tashlandi")
+        if snapshot.hierarchy:
+            self.stdout.write(f"  {snapshot.hierarchy.shortcuts_count} ta shortcut qo'shildi")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"\nSnapshot saqlandi: {path} ({elapsed:.2f} s)")
+        )
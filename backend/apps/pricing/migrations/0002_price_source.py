@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-19 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightprice',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='API dan olingan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='flightprice',
+            name='source',
+            field=models.CharField(choices=[('manual', "Qo'lda / seed"), ('travelpayouts_api', 'Travelpayouts API'), ('travelpayouts_free', 'Travelpayouts (bepul)'), ('booking', 'Booking.com')], default='manual', max_length=30, verbose_name='Manba'),
+        ),
+        migrations.AddField(
+            model_name='hotelprice',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='API dan olingan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='hotelprice',
+            name='source',
+            field=models.CharField(choices=[('manual', "Qo'lda / seed"), ('travelpayouts_api', 'Travelpayouts API'), ('travelpayouts_free', 'Travelpayouts (bepul)'), ('booking', 'Booking.com')], default='manual', max_length=30, verbose_name='Manba'),
+        ),
+    ]
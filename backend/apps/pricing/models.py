@@ -1,6 +1,14 @@
 from django.db import models
 from apps.destinations.models import City
 
+# Narx qayerdan kelgani (live narxlar services/price_writer.py orqali yoziladi)
+PRICE_SOURCE_CHOICES = [
+    ('manual', "Qo'lda / seed"),
+    ('travelpayouts_api', 'Travelpayouts API'),
+    ('travelpayouts_free', 'Travelpayouts (bepul)'),
+    ('booking', 'Booking.com'),
+]
+
 
 class FlightPrice(models.Model):
     """Parvoz narxi modeli"""
@@ -27,6 +35,8 @@ class FlightPrice(models.Model):
     departure_time = models.TimeField(null=True, blank=True, verbose_name="Uchish vaqti")
     arrival_time = models.TimeField(null=True, blank=True, verbose_name="Qo'nish vaqti")
     is_roundtrip = models.BooleanField(default=False, verbose_name="Borib-qaytish")
+    source = models.CharField(max_length=30, choices=PRICE_SOURCE_CHOICES, default='manual', verbose_name="Manba")
+    fetched_at = models.DateTimeField(null=True, blank=True, verbose_name="API dan olingan vaqt")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -70,6 +80,8 @@ class HotelPrice(models.Model):
     )
     checkin_date = models.DateField(verbose_name="Kirish sanasi")
     image_url = models.URLField(blank=True, null=True, verbose_name="Rasm URL")
+    source = models.CharField(max_length=30, choices=PRICE_SOURCE_CHOICES, default='manual', verbose_name="Manba")
+    fetched_at = models.DateTimeField(null=True, blank=True, verbose_name="API dan olingan vaqt")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -0,0 +1,234 @@
+"""
+Ko'plab qidiruvlarni oflayn bajarish management command
+
+Qidiruvlar CSV yoki NDJSON fayldan o'qiladi va protsesslar puliga taqsimlanadi.
+Har bir worker bitta umumiy graf snapshotini ishlatadi, natijalar NDJSON
+ko'rinishida oqim bilan yoziladi.
+
+Spec maydonlari: origin, destination, departure_date, return_date yoki nights,
+travelers, hotel_stars, budget_max, include_transit, mode, passport
+
+Ishlatish:
+    python manage.py batch_search searches.csv --output results.ndjson
+    python manage.py batch_search searches.ndjson --workers 8
+    cat searches.ndjson | python manage.py batch_search - --format ndjson > results.ndjson
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from apps.search.models import TravelSearch
+from services.price_snapshot import PriceSnapshot
+from services.route_optimizer import RouteOptimizer
+
+# Worker ichidagi snapshot (fork da ota protsessdan meros, spawn da yuklanadi)
+_worker_snapshot = None
+
+
+def _init_worker(snapshot_path: str):
+    """Worker initsializatsiyasi - snapshot va alohida DB ulanishi"""
+    global _worker_snapshot
+    # Ota protsessning ulanishlari ishlatilmaydi - har bir worker o'zinikini ochadi
+    connections.close_all()
+    if _worker_snapshot is None:
+        _worker_snapshot = PriceSnapshot.load(snapshot_path)
+
+
+def parse_bool(value, default: bool = True) -> bool:
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'ha')
+
+
+def build_search(spec: dict, cities: dict) -> TravelSearch:
+    """Spec dan saqlanmagan TravelSearch yaratish"""
+    origin = cities.get(str(spec.get('origin', '')).upper())
+    destination = cities.get(str(spec.get('destination', '')).upper())
+    if not origin or not destination:
+        raise ValueError(f"Shahar topilmadi: {spec.get('origin')} / {spec.get('destination')}")
+
+    departure_date = date.fromisoformat(spec['departure_date'])
+    if spec.get('return_date'):
+        return_date = date.fromisoformat(spec['return_date'])
+    else:
+        return_date = departure_date + timedelta(days=int(spec.get('nights') or 7))
+    if return_date <= departure_date:
+        raise ValueError("Qaytish sanasi ketish sanasidan keyin bo'lishi kerak")
+
+    budget = spec.get('budget_max')
+    return TravelSearch(
+        origin=origin,
+        destination=destination,
+        departure_date=departure_date,
+        return_date=return_date,
+        travelers=int(spec.get('travelers') or 1),
+        include_transit=parse_bool(spec.get('include_transit')),
+        hotel_stars=int(spec.get('hotel_stars') or 3),
+        budget_max_usd=Decimal(str(budget)) if budget not in (None, '') else None,
+    )
+
+
+def read_specs(path: str, fmt: str = 'auto') -> list:
+    """CSV yoki NDJSON dan qidiruvlar ro'yxati"""
+    if fmt == 'auto':
+        fmt = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+    try:
+        source = sys.stdin if path == '-' else open(path, newline='')
+    except OSError as e:
+        raise CommandError(f"Faylni ochib bo'lmadi: {e}")
+
+    try:
+        if fmt == 'csv':
+            return [
+                {key: value for key, value in row.items() if value not in (None, '')}
+                for row in csv.DictReader(source)
+            ]
+        specs = []
+        for number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                specs.append(json.loads(line))
+            except ValueError as e:
+                raise CommandError(f"{number}-qatorda noto'g'ri JSON: {e}")
+        return specs
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def _run_search(item):
+    """Bitta qidiruvni bajarish (worker ichida)"""
+    index, spec = item
+    started = time.perf_counter()
+    result = {'index': index, 'spec': spec}
+    try:
+        search = build_search(spec, _worker_snapshot.cities)
+        optimizer = RouteOptimizer(
+            search,
+            snapshot=_worker_snapshot,
+            passport=spec.get('passport') or None
+        )
+        variants = optimizer.find_optimal_route(mode=spec.get('mode') or RouteOptimizer.MODE_BALANCED)
+        result.update({'ok': True, 'variants': variants})
+    except Exception as e:
+        result.update({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class Command(BaseCommand):
+    help = "CSV/NDJSON dagi qidiruvlarni protsesslar pulida bajarib, natijalarni NDJSON ga yozadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            type=str,
+            help="Qidiruvlar fayli (.csv yoki .ndjson), '-' - stdin"
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='-',
+            help="Natijalar fayli (NDJSON), default: stdout"
+        )
+        parser.add_argument(
+            '--format',
+            choices=['auto', 'csv', 'ndjson'],
+            default='auto',
+            help="Kirish formati (default: fayl kengaytmasi bo'yicha)"
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Protsesslar soni (default: CPU yadrolari soni)"
+        )
+        parser.add_argument(
+            '--chunksize',
+            type=int,
+            default=8,
+            help="Har bir workerga bir martada beriladigan qidiruvlar soni (default: 8)"
+        )
+        parser.add_argument(
+            '--snapshot',
+            type=str,
+            default=None,
+            help="Graf snapshoti (default: settings.PRICE_SNAPSHOT_PATH, bo'lmasa tayyorlanadi)"
+        )
+
+    def handle(self, *args, **options):
+        global _worker_snapshot
+
+        # Natijalar stdout ga yozilsa, hisobot stderr ga
+        report = self.stderr if options['output'] == '-' else self.stdout
+
+        specs = read_specs(options['input'], options['format'])
+        if not specs:
+            raise CommandError("Qidiruvlar topilmadi")
+
+        # Umumiy snapshot - bo'lmasa bir marta tayyorlab saqlanadi
+        snapshot = PriceSnapshot.load(options['snapshot'])
+        if snapshot is None:
+            report.write("Snapshot topilmadi, tayyorlanmoqda...")
+            snapshot = PriceSnapshot.build()
+            options['snapshot'] = snapshot.save(options['snapshot'])
+        _worker_snapshot = snapshot
+
+        workers = max(1, options['workers'])
+        report.write(f"{len(specs)} ta qidiruv, {workers} ta worker")
+
+        out = sys.stdout if options['output'] == '-' else open(options['output'], 'w')
+        started = time.perf_counter()
+        done = 0
+        failed = 0
+        pool = None
+        try:
+            if workers == 1:
+                _init_worker(options['snapshot'])
+                results = map(_run_search, enumerate(specs))
+            else:
+                # Fork dan oldin ulanishlar yopiladi (workerlar ulashmasligi uchun)
+                connections.close_all()
+                context = multiprocessing.get_context(
+                    'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+                )
+                pool = context.Pool(workers, initializer=_init_worker, initargs=(options['snapshot'],))
+                results = pool.imap_unordered(_run_search, enumerate(specs), chunksize=options['chunksize'])
+
+            for result in results:
+                out.write(json.dumps(result, ensure_ascii=False, default=str) + '\n')
+                done += 1
+                if not result['ok']:
+                    failed += 1
+                if done % 100 == 0:
+                    elapsed = time.perf_counter() - started
+                    report.write(f"  {done}/{len(specs)} ({done / elapsed:.1f} qidiruv/s)")
+
+            if pool:
+                pool.close()
+                pool.join()
+        finally:
+            # Xato yoki Ctrl-C da workerlar osilib qolmasin
+            if pool:
+                pool.terminate()
+                pool.join()
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.perf_counter() - started
+        report.write(self.style.SUCCESS(
+            f"\n{done} ta qidiruv {elapsed:.2f} s da bajarildi "
+            f"({done / elapsed:.1f} qidiruv/s, {failed} ta xato)"
+        ))
@@ -0,0 +1,249 @@
+"""
+RouteFinder va RouteOptimizer ni narxlar manbalari bo'yicha solishtirish (A/B)
+
+Bir xil qidiruvlar to'plami har bir (dvijok, manba) juftligi orqali o'tkaziladi va
+kechikish persentillari (p50/p95/p99), qidiruv boshiga DB so'rovlari soni hamda
+asosiy juftlikka nisbatan natija farqlari (eng arzon narx, tavsiya etilgan marshrut)
+hisoblanadi.
+
+Manbalar: default (dvijokning o'z zanjiri), database, snapshot, live
+
+Ishlatish:
+    python manage.py benchmark_engines searches.ndjson
+    python manage.py benchmark_engines --recent 100 --backends default,database,snapshot
+    python manage.py benchmark_engines searches.csv --engines optimizer --repeat 3 --json report.json
+"""
+
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.search.management.commands.batch_search import build_search, read_specs
+from apps.search.models import TravelSearch
+from services.price_oracle import ORACLE_BACKENDS, build_oracle
+from services.price_snapshot import PriceSnapshot
+from services.route_finder import RouteFinder
+from services.route_optimizer import RouteOptimizer
+
+ENGINES = ('finder', 'optimizer')
+BACKENDS = ('default',) + ORACLE_BACKENDS
+
+
+class QueryCounter:
+    """connection.execute_wrapper uchun so'rovlar hisoblagichi"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank persentil (bo'sh ro'yxat uchun 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(variants: list) -> dict:
+    """Solishtirish uchun qisqa natija: eng arzon narx va tavsiya etilgan marshrut"""
+    recommended = next((v for v in variants if v.get('is_recommended')), None)
+    return {
+        'count': len(variants),
+        'cheapest': min((v['total_cost'] for v in variants), default=None),
+        'recommended': recommended['cities_sequence'] if recommended else None,
+    }
+
+
+class Command(BaseCommand):
+    help = "Qidiruvlarni har bir dvijok va narxlar manbai orqali o'tkazib, tezlik va natijalarni solishtiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            type=str,
+            help="Qidiruvlar fayli (.csv yoki .ndjson, batch_search formati); berilmasa - oxirgi qidiruvlar"
+        )
+        parser.add_argument(
+            '--recent',
+            type=int,
+            default=50,
+            help="Fayl berilmasa, bazadagi oxirgi qidiruvlar soni (default: 50)"
+        )
+        parser.add_argument(
+            '--engines',
+            type=str,
+            default=','.join(ENGINES),
+            help=f"Dvijoklar (default: {','.join(ENGINES)})"
+        )
+        parser.add_argument(
+            '--backends',
+            type=str,
+            default='default,database,snapshot',
+            help=f"Narxlar manbalari: {', '.join(BACKENDS)} (default: default,database,snapshot)"
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=None,
+            help="Natijalar solishtiriladigan juftlik, masalan optimizer:default (default: birinchi juftlik)"
+        )
+        parser.add_argument(
+            '--mode',
+            type=str,
+            default=RouteOptimizer.MODE_BALANCED,
+            help="Optimizer rejimi (spec da mode bo'lmasa)"
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help="Har bir qidiruv necha marta bajarilishi (kechikish statistikasi uchun)"
+        )
+        parser.add_argument(
+            '--snapshot',
+            type=str,
+            default=None,
+            help="Graf snapshoti (default: settings.PRICE_SNAPSHOT_PATH, bo'lmasa xotirada tayyorlanadi)"
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            default=None,
+            help="To'liq hisobotni JSON faylga yozish"
+        )
+
+    def handle(self, *args, **options):
+        engines = self._parse_list(options['engines'], ENGINES, 'dvijok')
+        backends = self._parse_list(options['backends'], BACKENDS, 'manba')
+        combos = [(engine, backend) for engine in engines for backend in backends]
+
+        baseline = tuple(options['baseline'].split(':', 1)) if options['baseline'] else combos[0]
+        if baseline not in combos:
+            raise CommandError(f"Asosiy juftlik ro'yxatda yo'q: {':'.join(baseline)}")
+
+        snapshot = PriceSnapshot.load(options['snapshot'])
+        if snapshot is None:
+            self.stdout.write("Snapshot topilmadi, xotirada tayyorlanmoqda...")
+            snapshot = PriceSnapshot.build()
+
+        searches = self._load_searches(options, snapshot)
+        if not searches:
+            raise CommandError("Qidiruvlar topilmadi")
+        self.stdout.write(
+            f"{len(searches)} ta qidiruv x {len(combos)} ta juftlik x {options['repeat']} marta"
+        )
+
+        stats = {
+            combo: {'latency_ms': [], 'queries': [], 'failed': 0, 'results': [None] * len(searches)}
+            for combo in combos
+        }
+
+        # Juftliklar har bir qidiruv ichida almashadi - kesh va fon yuklamasi ta'siri teng taqsimlanadi
+        for repeat in range(max(1, options['repeat'])):
+            for index, (search, mode) in enumerate(searches):
+                for combo in combos:
+                    entry = stats[combo]
+                    counter = QueryCounter()
+                    started = time.perf_counter()
+                    try:
+                        with connection.execute_wrapper(counter):
+                            variants = self._run(combo, search, mode, snapshot)
+                    except Exception as e:
+                        entry['failed'] += 1
+                        self.stderr.write(f"  {':'.join(combo)} #{index}: {type(e).__name__}: {e}")
+                        continue
+                    entry['latency_ms'].append((time.perf_counter() - started) * 1000)
+                    entry['queries'].append(counter.count)
+                    if repeat == 0:
+                        entry['results'][index] = summarize(variants)
+
+        report = self._build_report(stats, baseline)
+        self._print_report(report, baseline)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+            self.stdout.write(f"\nHisobot saqlandi: {options['json']}")
+
+    def _parse_list(self, value: str, allowed: tuple, label: str) -> list:
+        items = [item.strip() for item in value.split(',') if item.strip()]
+        unknown = [item for item in items if item not in allowed]
+        if unknown or not items:
+            raise CommandError(f"Noma'lum {label}: {', '.join(unknown) or value} (mumkin: {', '.join(allowed)})")
+        return items
+
+    def _load_searches(self, options: dict, snapshot: PriceSnapshot) -> list:
+        """(TravelSearch, rejim) ro'yxati - fayldan yoki bazadagi oxirgi qidiruvlardan"""
+        if options['input']:
+            searches = []
+            for number, spec in enumerate(read_specs(options['input']), 1):
+                try:
+                    searches.append((build_search(spec, snapshot.cities), spec.get('mode') or options['mode']))
+                except (KeyError, ValueError) as e:
+                    raise CommandError(f"{number}-qidiruv: {e}")
+            return searches
+
+        recent = TravelSearch.objects.select_related(
+            'origin__country', 'destination__country'
+        ).order_by('-created_at')[:options['recent']]
+        return [(search, options['mode']) for search in recent]
+
+    def _run(self, combo: tuple, search: TravelSearch, mode: str, snapshot: PriceSnapshot) -> list:
+        """Bitta qidiruv - natijalar saqlanmaydi"""
+        engine, backend = combo
+        oracle = None if backend == 'default' else build_oracle(backend, snapshot.graph)
+        if engine == 'finder':
+            return RouteFinder(search, oracle=oracle).find_all_routes()
+        return RouteOptimizer(search, snapshot=snapshot, oracle=oracle).find_optimal_route(mode=mode)
+
+    def _build_report(self, stats: dict, baseline: tuple) -> dict:
+        """Persentillar, so'rovlar soni va asosiy juftlikka nisbatan farqlar"""
+        reference = stats[baseline]['results']
+        report = {}
+        for combo, entry in stats.items():
+            latency = entry['latency_ms']
+            price_diffs = []
+            mismatches = 0
+            compared = 0
+            for ours, theirs in zip(entry['results'], reference):
+                if ours is None or theirs is None:
+                    continue
+                compared += 1
+                if ours['recommended'] != theirs['recommended']:
+                    mismatches += 1
+                if ours['cheapest'] is not None and theirs['cheapest']:
+                    price_diffs.append(abs(ours['cheapest'] - theirs['cheapest']) / theirs['cheapest'] * 100)
+
+            report[':'.join(combo)] = {
+                'runs': len(latency),
+                'failed': entry['failed'],
+                'p50_ms': round(percentile(latency, 50), 2),
+                'p95_ms': round(percentile(latency, 95), 2),
+                'p99_ms': round(percentile(latency, 99), 2),
+                'mean_queries': round(sum(entry['queries']) / len(entry['queries']), 1) if entry['queries'] else 0,
+                'max_queries': max(entry['queries'], default=0),
+                'compared': compared,
+                'mean_price_diff_pct': round(sum(price_diffs) / len(price_diffs), 2) if price_diffs else 0.0,
+                'max_price_diff_pct': round(max(price_diffs, default=0.0), 2),
+                'recommended_mismatches': mismatches,
+            }
+        return report
+
+    def _print_report(self, report: dict, baseline: tuple):
+        self.stdout.write(f"\nAsosiy juftlik: {':'.join(baseline)}\n")
+        self.stdout.write(
+            f"{'juftlik':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'so`rov':>8}"
+            f"{'xato':>6}{'narx farqi %':>14}{'maks %':>9}{'tavsiya farqi':>15}"
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f"{name:<22}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+                f"{row['mean_queries']:>8.1f}{row['failed']:>6}{row['mean_price_diff_pct']:>14.2f}"
+                f"{row['max_price_diff_pct']:>9.2f}{row['recommended_mismatches']:>9}/{row['compared']:<5}"
+            )
@@ -1,3 +1,4 @@
+import math
 from rest_framework import serializers
 from .models import TravelSearch, RouteVariant
 from apps.destinations.serializers import CityMinimalSerializer
@@ -34,6 +35,32 @@ class TravelSearchCreateSerializer(serializers.Serializer):
         required=False,
         allow_null=True
     )
+    passport = serializers.CharField(
+        max_length=2,
+        required=False,
+        allow_blank=True
+    )  # Sayohatchi pasporti (masalan, UZ) - viza talab qilinadigan hublar chiqariladi
+    return_to = serializers.ListField(
+        child=serializers.CharField(max_length=3),
+        required=False,
+        max_length=3
+    )  # Open-jaw: qaytish mumkin bo'lgan boshqa shaharlar (IATA)
+    nearby_radius_km = serializers.FloatField(
+        required=False,
+        min_value=0,
+        max_value=500
+    )  # Muqobil aeroportlar radiusi (masalan, DXB uchun AUH)
+    time_budget = serializers.FloatField(
+        required=False,
+        min_value=0.5,
+        max_value=30
+    )  # Qidiruv vaqt chegarasi (sekund), berilmasa SEARCH_TIME_BUDGET
+
+    def validate_time_budget(self, value):
+        # nan min/max tekshiruvlaridan o'tib ketadi
+        if not math.isfinite(value):
+            raise serializers.ValidationError("Vaqt chegarasi son bo'lishi kerak")
+        return value
 
     def validate(self, data):
         if data['departure_date'] >= data['return_date']:
@@ -44,6 +71,81 @@ class TravelSearchCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "Ketish va kelish shaharlari bir xil bo'lmasligi kerak"
             )
+        if data['destination'] in data.get('return_to', []):
+            raise serializers.ValidationError(
+                "Qaytish shahri manzil bilan bir xil bo'lmasligi kerak"
+            )
+        return data
+
+
+class SearchRefineSerializer(serializers.Serializer):
+    """Mavjud qidiruvni yangilash serializeri (faqat mehmonxona/yo'lovchi/byudjet)"""
+    travelers = serializers.IntegerField(required=False, min_value=1, max_value=10)
+    hotel_stars = serializers.IntegerField(required=False, min_value=1, max_value=5)
+    budget_max = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        required=False,
+        allow_null=True
+    )
+    optimization_mode = serializers.ChoiceField(
+        choices=['cheapest', 'fastest', 'balanced', 'comfort'],
+        default='balanced'
+    )
+
+
+class MultiCityPlanSerializer(serializers.Serializer):
+    """Ko'p shaharli rejalashtirish serializeri"""
+    origin = serializers.CharField(max_length=3)  # IATA kodi
+    cities = serializers.ListField(
+        child=serializers.CharField(max_length=3),
+        min_length=1,
+        max_length=8
+    )
+    departure_date = serializers.DateField()
+    nights = serializers.IntegerField(min_value=1, max_value=60)
+    travelers = serializers.IntegerField(default=1, min_value=1, max_value=10)
+    hotel_stars = serializers.IntegerField(default=3, min_value=1, max_value=5)
+
+    def validate(self, data):
+        if len(set(data['cities'])) != len(data['cities']):
+            raise serializers.ValidationError(
+                "Shaharlar takrorlanmasligi kerak"
+            )
+        if data['origin'] in data['cities']:
+            raise serializers.ValidationError(
+                "Boshlang'ich shahar tashrif ro'yxatida bo'lmasligi kerak"
+            )
+        if data['nights'] < len(data['cities']):
+            raise serializers.ValidationError(
+                "Har bir shahar uchun kamida 1 kecha kerak"
+            )
+        return data
+
+
+class MeetupSearchSerializer(serializers.Serializer):
+    """Guruh uchrashuvi qidiruvi serializeri"""
+    origins = serializers.ListField(
+        child=serializers.CharField(max_length=3),
+        min_length=2,
+        max_length=10
+    )
+    travelers = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=10),
+        required=False
+    )  # Har bir origin uchun yo'lovchilar soni (origins bilan bir xil tartibda)
+    objective = serializers.ChoiceField(choices=['sum', 'max'], default='sum')
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=50)
+
+    def validate(self, data):
+        if len(set(data['origins'])) != len(data['origins']):
+            raise serializers.ValidationError(
+                "Boshlang'ich shaharlar takrorlanmasligi kerak"
+            )
+        if 'travelers' in data and len(data['travelers']) != len(data['origins']):
+            raise serializers.ValidationError(
+                "travelers ro'yxati origins bilan bir xil uzunlikda bo'lishi kerak"
+            )
         return data
 
 
@@ -2,19 +2,33 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
+import time
 from datetime import datetime, date, timedelta
 from .models import TravelSearch, RouteVariant
 from .serializers import (
     TravelSearchSerializer,
     TravelSearchCreateSerializer,
     RouteVariantSerializer,
-    SearchResultSerializer
+    SearchResultSerializer,
+    MultiCityPlanSerializer,
+    MeetupSearchSerializer,
+    SearchRefineSerializer
 )
 from apps.destinations.models import City
 from services.route_finder import RouteFinder
-from services.route_optimizer import RouteOptimizer
+from services.route_optimizer import RouteOptimizer, load_flight_layer
+from services.price_snapshot import get_snapshot
+from services.multi_city_planner import MultiCityPlanner
+from services.meetup_search import MeetupSearch
 from services.external_apis import travelpayouts_api, booking_api
+from services.async_external_apis import async_travelpayouts_api, async_booking_api
+from services.price_cache import price_cache
+from services.price_writer import price_writer
 from services.popular_routes_scraper import popular_routes_scraper
 
 
@@ -54,12 +68,31 @@ class TravelSearchViewSet(viewsets.ModelViewSet):
         optimization_mode = request.data.get('optimization_mode', 'balanced')
         use_optimizer = request.data.get('use_optimizer', True)
         use_live_prices = request.data.get('use_live_prices', False)
+        time_budget = data.get('time_budget', settings.SEARCH_TIME_BUDGET)
+        refinement = None
+        visa_filter = None
 
         if use_optimizer:
             # Yangi ilg'or optimizer ishlatish
-            optimizer = RouteOptimizer(search, use_live_prices=use_live_prices)
-            variants = optimizer.find_optimal_route(mode=optimization_mode)
+            deadline = time.monotonic() + time_budget
+            # Graf va contraction hierarchy oflayn snapshot dan - live yozuvlar (write-through)
+            # DB grafini doim o'zgartiradi, aniq sana narxlari esa DatabaseOracle orqali olinadi
+            optimizer = RouteOptimizer(
+                search,
+                use_live_prices=use_live_prices,
+                snapshot=get_snapshot(),
+                passport=data.get('passport') or None,
+                return_to=data.get('return_to'),
+                nearby_radius_km=data.get('nearby_radius_km')
+            )
+            variants = optimizer.find_optimal_route(mode=optimization_mode, deadline=deadline)
             saved_variants = optimizer.save_variants(variants)
+            optimizer.cache_flight_layer()
+            refinement = optimizer.refinement
+            visa_filter = {
+                'passport': optimizer.passport,
+                'excluded_cities': sorted(optimizer.excluded_cities),
+            }
         else:
             # Eski finder ishlatish
             finder = RouteFinder(search)
@@ -80,7 +113,9 @@ class TravelSearchViewSet(viewsets.ModelViewSet):
                 'mode': optimization_mode,
                 'available_modes': ['cheapest', 'fastest', 'balanced', 'comfort']
             },
-            'live_prices': use_live_prices
+            'live_prices': use_live_prices,
+            'refinement': refinement,
+            'visa_filter': visa_filter
         }
 
         return Response(result, status=status.HTTP_201_CREATED)
@@ -93,6 +128,49 @@ class TravelSearchViewSet(viewsets.ModelViewSet):
         serializer = RouteVariantSerializer(variants, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def refine(self, request, pk=None):
+        """Mehmonxona, yo'lovchilar yoki byudjet o'zgarganda - parvozlarni qayta qidirmasdan yangilash"""
+        search = self.get_object()
+        serializer = SearchRefineSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        flight_layer, source = load_flight_layer(search)
+
+        if 'travelers' in data:
+            search.travelers = data['travelers']
+        if 'hotel_stars' in data:
+            search.hotel_stars = data['hotel_stars']
+        if 'budget_max' in data:
+            search.budget_max_usd = data['budget_max']
+
+        optimizer = RouteOptimizer(search, flight_layer=flight_layer)
+        variants = optimizer.refine(mode=data['optimization_mode'])
+
+        with transaction.atomic():
+            search.save(update_fields=['travelers', 'hotel_stars', 'budget_max_usd'])
+            search.variants.all().delete()
+            saved_variants = optimizer.save_variants(variants)
+        # Byudjetdan o'tmagan variantlar ham keyingi refine uchun saqlanib qoladi
+        optimizer.cache_flight_layer()
+
+        recommended = next(
+            (v for v in saved_variants if v.is_recommended),
+            saved_variants[0] if saved_variants else None
+        )
+
+        return Response({
+            'search': TravelSearchSerializer(search).data,
+            'variants': RouteVariantSerializer(saved_variants, many=True).data,
+            'recommended': RouteVariantSerializer(recommended).data if recommended else None,
+            'optimization': {
+                'mode': data['optimization_mode'],
+                'available_modes': ['cheapest', 'fastest', 'balanced', 'comfort']
+            },
+            'flight_layer_source': source
+        })
+
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """Mashhur yo'nalishlar - avtomatik tavsiya"""
@@ -107,6 +185,59 @@ class TravelSearchViewSet(viewsets.ModelViewSet):
 
         return Response(recommendations)
 
+    @action(detail=False, methods=['post'], url_path='multi-city')
+    def multi_city(self, request):
+        """Bir nechta shaharni eng arzon tartibda aylanib chiqish (Held-Karp)"""
+        serializer = MultiCityPlanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        origin = get_object_or_404(City, iata_code=data['origin'])
+        cities = {c.iata_code: c for c in City.objects.select_related('country').filter(iata_code__in=data['cities'])}
+        missing = [code for code in data['cities'] if code not in cities]
+        if missing:
+            return Response(
+                {'error': f"Shaharlar topilmadi: {', '.join(missing)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        planner = MultiCityPlanner(
+            origin=origin,
+            cities=[cities[code] for code in data['cities']],
+            departure_date=data['departure_date'],
+            total_nights=data['nights'],
+            travelers=data['travelers'],
+            hotel_stars=data['hotel_stars'],
+        )
+        plan = planner.plan()
+
+        return Response({
+            'plan': plan,
+            'optimization': plan['details']['optimization'] if plan else None
+        })
+
+    @action(detail=False, methods=['post'])
+    def meetup(self, request):
+        """Bir nechta shahardan uchib, bitta joyda uchrashish uchun manzillar"""
+        serializer = MeetupSearchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        origins = {c.iata_code: c for c in City.objects.filter(iata_code__in=data['origins'])}
+        missing = [code for code in data['origins'] if code not in origins]
+        if missing:
+            return Response(
+                {'error': f"Shaharlar topilmadi: {', '.join(missing)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        meetup = MeetupSearch(
+            origins=[origins[code] for code in data['origins']],
+            travelers=data.get('travelers'),
+            objective=data['objective'],
+        )
+        return Response(meetup.search(limit=data['limit']))
+
 
 class RouteVariantViewSet(viewsets.ReadOnlyModelViewSet):
     """Yo'nalish varianti API"""
@@ -114,34 +245,35 @@ class RouteVariantViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = RouteVariantSerializer
 
 
-class LiveFlightPricesView(APIView):
+class LiveFlightPricesView(View):
     """
     Aviasales.uz dan real vaqtda parvoz narxlarini olish
 
     GET /api/flights/live/?origin=TAS&destination=IST&date=2024-03-15
 
     Bu API Aviasales.uz (Travelpayouts) dan real vaqtda narxlarni oladi.
-    Narxlar 5 daqiqa keshlanadi.
+    Narxlar 5 daqiqa keshlanadi. View async (config/asgi.py) - tashqi API ni
+    kutish worker oqimini band qilmaydi.
     """
 
-    def get(self, request):
-        origin = request.query_params.get('origin', '').upper()
-        destination = request.query_params.get('destination', '').upper()
-        departure_date_str = request.query_params.get('date')
-        return_date_str = request.query_params.get('return_date')
-        direct_only = request.query_params.get('direct', 'false').lower() == 'true'
-        currency = request.query_params.get('currency', 'usd').lower()
-        refresh = request.query_params.get('refresh', 'false').lower() == 'true'
+    async def get(self, request):
+        origin = request.GET.get('origin', '').upper()
+        destination = request.GET.get('destination', '').upper()
+        departure_date_str = request.GET.get('date')
+        return_date_str = request.GET.get('return_date')
+        direct_only = request.GET.get('direct', 'false').lower() == 'true'
+        currency = request.GET.get('currency', 'usd').lower()
+        refresh = request.GET.get('refresh', 'false').lower() == 'true'
 
         # Validatsiya
         if not origin or not destination:
-            return Response(
+            return JsonResponse(
                 {'error': 'origin va destination parametrlari majburiy'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         if len(origin) != 3 or len(destination) != 3:
-            return Response(
+            return JsonResponse(
                 {'error': 'IATA kodlari 3 ta belgidan iborat bo\'lishi kerak (masalan: TAS, IST)'},
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -157,13 +289,13 @@ class LiveFlightPricesView(APIView):
             if return_date_str:
                 return_date = datetime.strptime(return_date_str, '%Y-%m-%d').date()
         except ValueError:
-            return Response(
+            return JsonResponse(
                 {'error': 'Sana formati noto\'g\'ri. To\'g\'ri format: YYYY-MM-DD'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Real vaqtda narxlarni olish
-        flights = travelpayouts_api.search_flights(
+        # Real vaqtda narxlarni olish (kutish worker oqimini band qilmaydi)
+        flights = await async_travelpayouts_api.search_flights(
             origin=origin,
             destination=destination,
             departure_date=departure_date,
@@ -173,13 +305,10 @@ class LiveFlightPricesView(APIView):
             use_cache=not refresh  # refresh=true bo'lsa, keshni o'tkazib yuborish
         )
 
-        # API holati
-        api_status = travelpayouts_api.get_api_status()
-
         # Eng arzon narxni topish
         cheapest = min(flights, key=lambda x: x['price']) if flights else None
 
-        return Response({
+        return JsonResponse({
             'success': True,
             'origin': origin,
             'destination': destination,
@@ -190,12 +319,12 @@ class LiveFlightPricesView(APIView):
             'cheapest_price': cheapest['price'] if cheapest else None,
             'flights': flights,
             'data_source': flights[0]['data_source'] if flights else 'none',
-            'api_configured': api_status['configured'],
+            'api_configured': async_travelpayouts_api.is_configured(),
             'aviasales_link': f"https://www.aviasales.uz/search/{origin}{departure_date.strftime('%d%m')}{destination}1"
         })
 
 
-class FlightPriceCalendarView(APIView):
+class FlightPriceCalendarView(View):
     """
     Oylik narxlar kalendarini olish
 
@@ -204,13 +333,13 @@ class FlightPriceCalendarView(APIView):
     Bu API Aviasales.uz dan butun oy uchun eng arzon narxlarni oladi.
     """
 
-    def get(self, request):
-        origin = request.query_params.get('origin', '').upper()
-        destination = request.query_params.get('destination', '').upper()
-        month = request.query_params.get('month')  # Format: YYYY-MM
+    async def get(self, request):
+        origin = request.GET.get('origin', '').upper()
+        destination = request.GET.get('destination', '').upper()
+        month = request.GET.get('month')  # Format: YYYY-MM
 
         if not origin or not destination:
-            return Response(
+            return JsonResponse(
                 {'error': 'origin va destination parametrlari majburiy'},
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -220,9 +349,9 @@ class FlightPriceCalendarView(APIView):
             month = date.today().strftime('%Y-%m')
 
         # Kalendar narxlarini olish
-        prices = travelpayouts_api.get_prices_calendar(origin, destination, month)
+        prices = await async_travelpayouts_api.get_prices_calendar(origin, destination, month)
 
-        return Response({
+        return JsonResponse({
             'success': True,
             'origin': origin,
             'destination': destination,
@@ -233,22 +362,22 @@ class FlightPriceCalendarView(APIView):
         })
 
 
-class LiveHotelPricesView(APIView):
+class LiveHotelPricesView(View):
     """
     Booking.com dan real vaqtda mehmonxona narxlarini olish
 
     GET /api/hotels/live/?city=Istanbul&checkin=2025-01-15&checkout=2025-01-22&stars=3
     """
 
-    def get(self, request):
-        city = request.query_params.get('city', '')
-        checkin_str = request.query_params.get('checkin')
-        checkout_str = request.query_params.get('checkout')
-        stars = int(request.query_params.get('stars', 3))
-        refresh = request.query_params.get('refresh', 'false').lower() == 'true'
+    async def get(self, request):
+        city = request.GET.get('city', '')
+        checkin_str = request.GET.get('checkin')
+        checkout_str = request.GET.get('checkout')
+        stars = int(request.GET.get('stars', 3))
+        refresh = request.GET.get('refresh', 'false').lower() == 'true'
 
         if not city:
-            return Response(
+            return JsonResponse(
                 {'error': 'city parametri majburiy'},
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -265,13 +394,13 @@ class LiveHotelPricesView(APIView):
             else:
                 checkout_date = checkin_date + timedelta(days=7)
         except ValueError:
-            return Response(
+            return JsonResponse(
                 {'error': 'Sana formati noto\'g\'ri. To\'g\'ri format: YYYY-MM-DD'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         # Mehmonxona narxlarini olish
-        hotels = booking_api.search_hotels(
+        hotels = await async_booking_api.search_hotels(
             city_name=city,
             checkin_date=checkin_date,
             checkout_date=checkout_date,
@@ -279,14 +408,11 @@ class LiveHotelPricesView(APIView):
             use_cache=not refresh
         )
 
-        # API holati
-        api_status = booking_api.get_api_status()
-
         # Eng arzon mehmonxonani topish
         cheapest = min(hotels, key=lambda x: x['price_per_night']) if hotels else None
         nights = (checkout_date - checkin_date).days
 
-        return Response({
+        return JsonResponse({
             'success': True,
             'city': city,
             'checkin_date': checkin_date.isoformat(),
@@ -297,7 +423,7 @@ class LiveHotelPricesView(APIView):
             'cheapest_per_night': cheapest['price_per_night'] if cheapest else None,
             'cheapest_total': cheapest['price_per_night'] * nights if cheapest else None,
             'hotels': hotels[:10],  # Top 10
-            'api_configured': api_status['configured'],
+            'api_configured': async_travelpayouts_api.is_configured(),
             'booking_link': f"https://www.booking.com/searchresults.html?ss={city}&checkin={checkin_date}&checkout={checkout_date}"
         })
 
@@ -328,6 +454,9 @@ class APIStatusView(APIView):
                 'register_url': 'https://rapidapi.com/apidojo/api/booking-com',
                 'env_var': 'RAPIDAPI_KEY',
             },
+            'cache': price_cache.stats(),
+            'single_flight': price_cache.single_flight.stats(),
+            'price_writer': price_writer.stats(),
             'instructions': {
                 'uz': 'API larni ishga tushirish uchun .env fayliga tokenlarni qo\'shing',
                 'steps': [
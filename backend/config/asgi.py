@@ -0,0 +1,40 @@
+"""
+ASGI config for Blissful Tour project.
+
+Live narx viewlari (flights/live, flights/calendar, hotels/live) async - tashqi
+API ni kutish worker oqimini band qilmaydi:
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+Django lifespan xabarlarini qabul qilmaydi - ularni shu yerda ushlaymiz:
+worker to'xtaganda umumiy httpx klienti yopiladi (ulanishlar oqib ketmaydi).
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django_application = get_asgi_application()
+
+# Booking.com ID katalogi oldindan yuklanadi - birinchi so'rovlar DB ni kutmaydi
+from services.async_external_apis import aclose_async_client  # noqa: E402
+from services.booking_destinations import warm_directory  # noqa: E402
+
+warm_directory()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await aclose_async_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -66,6 +66,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database - PostgreSQL for production, SQLite for development
 DATABASE_URL = os.getenv('DATABASE_URL')
@@ -119,10 +120,31 @@ REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
+# Qidiruv uchun vaqt byudjeti (sekund) - live narxlar shu muddatgacha aniqlashtiriladi
+SEARCH_TIME_BUDGET = float(os.getenv('SEARCH_TIME_BUDGET', '8'))
+
+# Live API narxlarini fonda FlightPrice / HotelPrice ga yozish (services/price_writer.py)
+PRICE_WRITE_THROUGH = os.getenv('PRICE_WRITE_THROUGH', 'True').lower() == 'true'
+
+# Oflayn graf snapshoti (python manage.py build_price_snapshot)
+PRICE_SNAPSHOT_PATH = os.getenv('PRICE_SNAPSHOT_PATH', str(BASE_DIR / 'data' / 'price_snapshot.pkl'))
+
+# Taxminiy narxlar jadvali (python manage.py build_price_imputation)
+PRICE_IMPUTATION_PATH = os.getenv('PRICE_IMPUTATION_PATH', str(BASE_DIR / 'data' / 'price_imputation.json'))
+
 # Cache settings
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    # Tashqi narxlar uchun workerlar o'rtasidagi umumiy kesh (services/price_cache.py)
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'blissful',
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared-prices',
+    },
 }
@@ -7,3 +7,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 application = get_wsgi_application()
+
+# Booking.com ID katalogi oldindan yuklanadi - birinchi so'rovlar DB ni kutmaydi
+from services.booking_destinations import warm_directory  # noqa: E402
+
+warm_directory()
@@ -0,0 +1,383 @@
+"""
+Async External APIs - Tashqi API larning async varianti (httpx)
+
+Live narx viewlari (config/asgi.py orqali) shu klientlardan foydalanadi: tashqi
+javobni kutish worker oqimini band qilmaydi, bitta protsess yuzlab parallel
+so'rovni ushlab turadi.
+
+So'rov parametrlari, parse, fallback va kesh kalitlari sinxron klientlardan
+(external_apis) olinadi; price_cache, circuit breaker va rate limiter ham
+umumiy - sinxron va async chaqiruvchilar bir xil kesh va limitlarni bo'lishadi.
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from datetime import date, datetime
+from functools import partial
+from typing import Dict, List, Optional
+import httpx
+from asgiref.sync import sync_to_async
+from services.circuit_breaker import get_circuit_breaker
+from services.external_apis import (
+    AviasalesAPI,
+    BookingComAPI,
+    CALENDAR_CACHE_TTL,
+    DEST_EMPTY_TTL,
+    FLIGHT_CACHE_TTL,
+    HOTEL_CACHE_TTL,
+    booking_api,
+    travelpayouts_api,
+)
+from services.price_cache import price_cache
+from services.price_writer import price_writer
+from services.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Qisqa sinxron amallar (kesh, breaker) - umumiy oqimlar pulida
+run_sync = partial(sync_to_async, thread_sensitive=False)
+
+# ORM amallari - Django ning umumiy sinxron oqimida (ulanishlar so'rov tsiklida yopiladi)
+run_orm = sync_to_async
+
+# Protsessdagi ulanishlar puli (event loop bo'yicha bitta klient)
+POOL_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=30)
+
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Joriy event loop uchun umumiy httpx klienti (ulanishlar qayta ishlatiladi)"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(limits=POOL_LIMITS)
+    return client
+
+
+async def aclose_async_client():
+    """Joriy event loop klientini yopish (ASGI lifespan shutdown da)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+async def guarded_aget(
+    endpoint: str,
+    rate_limiter: TokenBucket,
+    url: str,
+    params: Dict,
+    timeout: float,
+    headers: Dict[str, str]
+) -> Optional[httpx.Response]:
+    """
+    guarded_get() ning async varianti
+
+    Endpoint ochiq (open) bo'lsa yoki limit uzoq kutishni talab qilsa - None.
+    Tarmoq xatolari breakerga yozilib qayta ko'tariladi.
+    """
+    breaker = get_circuit_breaker(endpoint)
+    if not await run_sync(breaker.allow)():
+        logger.info(f"{endpoint}: circuit ochiq, o'tkazib yuborildi")
+        return None
+    if not await rate_limiter.aacquire():
+        # Half-open sinovi yuborilmadi - boshqa so'rov sinab ko'rsin
+        await run_sync(breaker.release)()
+        return None
+
+    started = time.monotonic()
+    try:
+        response = await get_async_client().get(url, params=params, headers=headers, timeout=timeout)
+    except httpx.HTTPError:
+        await run_sync(breaker.record)(False, time.monotonic() - started)
+        raise
+    # 5xx va kvota xatolari (403/429) - endpoint hozircha yaroqsiz
+    failed = response.status_code >= 500 or response.status_code in (403, 429)
+    await run_sync(breaker.record)(not failed, time.monotonic() - started)
+    return response
+
+
+class AsyncAviasalesAPI:
+    """Aviasales.uz / Travelpayouts - async klient (AviasalesAPI ustida)"""
+
+    def __init__(self, api: AviasalesAPI = travelpayouts_api):
+        self.api = api
+
+    def is_configured(self) -> bool:
+        return self.api.is_configured()
+
+    async def _request(self, endpoint: str, url: str, params: Dict, timeout: float) -> Optional[httpx.Response]:
+        return await guarded_aget(
+            f"travelpayouts:{endpoint}", self.api.rate_limiter, url, params, timeout, dict(self.api.session.headers)
+        )
+
+    async def search_flights(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date] = None,
+        direct: bool = False,
+        currency: str = 'usd',
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """AviasalesAPI.search_flights bilan bir xil natija va kesh"""
+        cache_key = self.api._flights_cache_key(origin, destination, departure_date, return_date, direct, currency)
+        args = (origin, destination, departure_date, return_date, direct, currency)
+
+        if not use_cache:
+            return await self._fetch_flights(*args)
+        return await price_cache.aget_or_refresh(
+            'flights', cache_key,
+            lambda: self._fetch_flights(*args),
+            lambda: self.api._fetch_flights(*args),
+            FLIGHT_CACHE_TTL, cache_if=bool
+        )
+
+    async def _fetch_flights(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        direct: bool,
+        currency: str
+    ) -> List[Dict]:
+        """Manbalar zanjiri: API -> bepul endpoint -> taxminiy narxlar"""
+        flights = []
+        data_source = 'fallback'
+
+        if self.is_configured():
+            flights = await self._search_via_api(origin, destination, departure_date, return_date, direct, currency)
+            if flights:
+                data_source = 'travelpayouts_api'
+
+        if not flights:
+            flights = await self._search_free_api(origin, destination, departure_date, currency)
+            if flights:
+                data_source = 'travelpayouts_free'
+
+        if not flights:
+            flights = self.api._get_fallback_flights(origin, destination, departure_date)
+            data_source = 'fallback'
+
+        fetched_at = datetime.now().isoformat()
+        for flight in flights:
+            flight['data_source'] = data_source
+            flight['fetched_at'] = fetched_at
+
+        if data_source != 'fallback':
+            price_writer.enqueue_flights(flights, departure_date, data_source)
+
+        return flights
+
+    async def _search_via_api(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        direct: bool,
+        currency: str
+    ) -> List[Dict]:
+        """prices_for_dates, natija bo'lmasa get_latest_prices"""
+        try:
+            params = self.api._prices_for_dates_params(origin, destination, departure_date, return_date, direct, currency)
+            response = await self._request('prices_for_dates', self.api.PRICES_URL, params, 15)
+            data = {}
+            if response is not None:
+                response.raise_for_status()
+                data = response.json()
+
+            if data.get('success') and data.get('data'):
+                logger.info(f"Aviasales API (prices_for_dates): {origin}->{destination} - {len(data['data'])} ta natija")
+                return self.api._parse_api_response(data['data'], origin, destination)
+
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Aviasales prices_for_dates xatosi: {e}")
+
+        try:
+            params = self.api._latest_prices_params(origin, destination, currency)
+            response = await self._request('latest_prices', self.api.PRICES_LATEST_URL, params, 15)
+            if response is None:
+                return []
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get('success') and data.get('data'):
+                logger.info(f"Aviasales API (latest_prices): {origin}->{destination} - {len(data['data'])} ta natija")
+                return self.api._parse_latest_prices(data['data'], origin, destination)
+
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Aviasales latest_prices xatosi: {e}")
+
+        return []
+
+    async def _search_free_api(self, origin: str, destination: str, departure_date: date, currency: str) -> List[Dict]:
+        """Bepul prices/cheap endpoint"""
+        try:
+            params = self.api._cheap_params(origin, destination, departure_date, currency)
+            response = await self._request('cheap', self.api.PRICES_CHEAP_URL, params, 10)
+
+            if response is not None and response.status_code == 200:
+                flights = self.api._parse_cheap_prices(response.json(), origin, destination)
+                if flights:
+                    logger.info(f"Aviasales Free API: {origin}->{destination} - {len(flights)} ta natija")
+                    return flights
+
+        except Exception as e:
+            logger.warning(f"Aviasales Free API xatosi: {e}")
+
+        return []
+
+    async def get_prices_calendar(self, origin: str, destination: str, month: str) -> Dict[str, float]:
+        """Oylik narxlar kalendari (sinxron klient bilan umumiy kesh)"""
+        cache_key = self.api._get_cache_key('calendar', origin, destination, month)
+
+        async def load():
+            calendar = await self._fetch_prices_calendar(origin, destination, month)
+            return await run_sync(self.api._remember_empty_calendar)(cache_key, calendar)
+
+        return await price_cache.aget_or_refresh(
+            'calendar', cache_key, load,
+            lambda: self.api._remember_empty_calendar(
+                cache_key, self.api._fetch_prices_calendar(origin, destination, month)
+            ),
+            CALENDAR_CACHE_TTL, cache_if=bool
+        )
+
+    async def _fetch_prices_calendar(self, origin: str, destination: str, month: str) -> Dict[str, float]:
+        try:
+            if self.is_configured():
+                params = self.api._calendar_params(origin, destination, month)
+                response = await self._request('calendar', self.api.CALENDAR_URL, params, 10)
+                if response is not None and response.status_code == 200:
+                    data = response.json()
+                    await run_sync(self.api._store_calendar_days)(origin, destination, data)
+                    return self.api._parse_calendar(data)
+        except Exception as e:
+            logger.error(f"Calendar API xatosi: {e}")
+        return {}
+
+
+class AsyncBookingComAPI:
+    """Booking.com (RapidAPI) - async klient (BookingComAPI ustida)"""
+
+    def __init__(self, api: BookingComAPI = booking_api):
+        self.api = api
+
+    def is_configured(self) -> bool:
+        return self.api.is_configured()
+
+    async def _request(self, endpoint: str, url: str, params: Dict, timeout: float) -> Optional[httpx.Response]:
+        return await guarded_aget(
+            f"booking:{endpoint}", self.api.rate_limiter, url, params, timeout, self.api.headers
+        )
+
+    async def search_hotels(
+        self,
+        city_name: str,
+        checkin_date: date,
+        checkout_date: date,
+        adults: int = 1,
+        rooms: int = 1,
+        currency: str = 'USD',
+        min_stars: int = 3,
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """BookingComAPI.search_hotels bilan bir xil natija va kesh"""
+        if not self.is_configured():
+            logger.warning("Booking.com API sozlanmagan, fallback narxlar qaytariladi")
+            return self.api._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+
+        cache_key_hash = self.api._hotels_cache_key(city_name, checkin_date, checkout_date, min_stars)
+        args = (city_name, checkin_date, checkout_date, adults, rooms, currency, min_stars)
+
+        if use_cache:
+            hotels = await price_cache.aget_or_refresh(
+                'hotels', cache_key_hash,
+                lambda: self._fetch_hotels(*args),
+                lambda: self.api._fetch_hotels(*args),
+                HOTEL_CACHE_TTL, cache_if=bool
+            )
+        else:
+            hotels = await self._fetch_hotels(*args)
+
+        # API natija bermasa - taxminiy narxlar (keshga yozilmaydi)
+        return hotels or self.api._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+
+    async def _fetch_hotels(
+        self,
+        city_name: str,
+        checkin_date: date,
+        checkout_date: date,
+        adults: int,
+        rooms: int,
+        currency: str,
+        min_stars: int
+    ) -> List[Dict]:
+        """Booking.com API so'rovi (natija bo'lmasa bo'sh ro'yxat)"""
+        try:
+            dest_id = await run_orm(self.api._known_destination)(city_name)
+            if dest_id is None:
+                dest_id = await self._get_destination_id(city_name)
+            if not dest_id:
+                logger.warning(f"Booking.com: {city_name} topilmadi")
+                return []
+
+            params = self.api._search_params(dest_id, checkin_date, checkout_date, adults, rooms, currency, min_stars)
+            response = await self._request('search', f"{self.api.BASE_URL}/hotels/search", params, 15)
+            if response is None:
+                return []
+
+            if response.status_code in [403, 429]:
+                logger.warning(f"Booking.com API rate limit ({response.status_code}), fallback ishlatiladi")
+                return []
+
+            response.raise_for_status()
+            hotels = self.api._parse_hotels(response.json().get('result') or [], min_stars)
+            if hotels:
+                logger.info(f"Booking.com API: {city_name} - {len(hotels)} ta mehmonxona topildi")
+                price_writer.enqueue_hotels(city_name, checkin_date, hotels)
+            return hotels
+
+        except httpx.TimeoutException:
+            logger.warning(f"Booking.com API timeout: {city_name}")
+            return []
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Booking.com API xatosi: {e}")
+            return []
+
+    async def _get_destination_id(self, city_name: str) -> Optional[str]:
+        """Shahar ID sini topish (natija yoki xato eslab qolinadi)"""
+        remember = run_orm(self.api._remember_destination)
+        try:
+            params = {'name': city_name, 'locale': 'en-gb'}
+            response = await self._request('locations', f"{self.api.BASE_URL}/hotels/locations", params, 10)
+            if response is None:
+                await remember(city_name, None)
+                return None
+
+            if response.status_code in [403, 429]:
+                logger.warning(f"Booking.com locations API rate limit ({response.status_code})")
+                await remember(city_name, None)
+                return None
+
+            response.raise_for_status()
+            dest_id = self.api._parse_destination(response.json())
+            await remember(city_name, dest_id, DEST_EMPTY_TTL)
+            return dest_id
+
+        except httpx.TimeoutException:
+            logger.warning(f"Destination ID olishda timeout: {city_name}")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Destination ID olishda xato: {e}")
+        await remember(city_name, None)
+        return None
+
+
+# API instanslari
+async_travelpayouts_api = AsyncAviasalesAPI()
+async_booking_api = AsyncBookingComAPI()
@@ -0,0 +1,88 @@
+"""
+Booking Destinations - Booking.com shahar ID lari katalogi
+
+API orqali topilgan ID lar BookingDestination jadvalida (City bilan bog'langan)
+saqlanadi, shuning uchun qayta ishga tushganda ham, boshqa workerlarda ham
+/hotels/locations qayta so'ralmaydi.
+
+Protsess ichida katalog bir marta DB dan yuklanadi (wsgi/asgi ishga tushganda
+warm_directory()) va BookingDestination yoki City o'zgarganda bekor qilinadi
+(signallar apps.py da ulanadi). Kalit - shahar nomi (inglizcha yoki o'zbekcha,
+katta-kichik harf farqsiz).
+"""
+
+import logging
+import threading
+from typing import Dict, Optional
+from django.db import DatabaseError, connection
+from apps.destinations.models import BookingDestination, City
+
+logger = logging.getLogger(__name__)
+
+# Jarayon ichidagi katalog (o'zgarishlarda bekor qilinadi)
+_directory = {'map': None}
+_lock = threading.Lock()
+
+
+def _normalize(city_name: str) -> str:
+    return city_name.strip().lower()
+
+
+def get_directory() -> Dict[str, str]:
+    """{shahar nomi: dest_id} (kerak bo'lganda DB dan yuklanadi)"""
+    directory = _directory['map']
+    if directory is None:
+        with _lock:
+            directory = _directory['map']
+            if directory is None:
+                directory = {}
+                for name, name_uz, dest_id in BookingDestination.objects.values_list(
+                    'city__name', 'city__name_uz', 'dest_id'
+                ):
+                    directory[_normalize(name)] = dest_id
+                    directory.setdefault(_normalize(name_uz), dest_id)
+                _directory['map'] = directory
+                logger.info(f"Booking.com manzillar katalogi yuklandi: {len(directory)} ta nom")
+    return directory
+
+
+def lookup_destination(city_name: str) -> Optional[str]:
+    """Katalogdagi ID (yo'q bo'lsa None)"""
+    try:
+        return get_directory().get(_normalize(city_name))
+    except DatabaseError as e:
+        logger.warning(f"Booking.com manzillar katalogini o'qib bo'lmadi: {e}")
+        return None
+
+
+def save_destination(city_name: str, dest_id: str, dest_type: str = 'city') -> bool:
+    """Topilgan ID ni jadvalga yozish (shahar bazada bo'lmasa False)"""
+    city = City.objects.filter(name__iexact=city_name.strip()).first() or \
+        City.objects.filter(name_uz__iexact=city_name.strip()).first()
+    if city is None:
+        return False
+    # Signal katalogni bekor qiladi - keyingi so'rov yangisini yuklaydi
+    BookingDestination.objects.update_or_create(city=city, defaults={'dest_id': dest_id, 'dest_type': dest_type})
+    return True
+
+
+def warm_directory():
+    """Ishga tushishda katalogni yuklash (jadval hali yo'q bo'lsa - keyinroq, birinchi so'rovda)"""
+    # Alohida oqimda - ASGI server ilovani event loop ichida import qilsa ham DB ga murojaat mumkin
+    thread = threading.Thread(target=_warm, name='booking-directory-warm')
+    thread.start()
+    thread.join()
+
+
+def _warm():
+    try:
+        get_directory()
+    except DatabaseError as e:
+        logger.warning(f"Booking.com manzillar katalogi oldindan yuklanmadi: {e}")
+    finally:
+        connection.close()
+
+
+def invalidate_directory(**kwargs):
+    """Katalogni bekor qilish (BookingDestination / City post_save / post_delete signali)"""
+    _directory['map'] = None
@@ -0,0 +1,116 @@
+"""
+Cache Codec - Provayder javoblarini keshda ixcham saqlash
+
+Parvoz/mehmonxona ro'yxatlari - bir xil kalitli lug'atlar. Ular ustunlarga
+ajratiladi (kalitlar bir marta), hamma qatorda bir xil bo'lgan qiymatlar
+(origin, data_source, fetched_at ...) bitta doimiy sifatida saqlanadi, natija
+COMPRESS_THRESHOLD dan katta bo'lsa zlib bilan siqiladi.
+
+Format: MAGIC + versiya bayti + bayroqlar bayti + pickle (ehtimol siqilgan).
+decode() eski (kodeksiz) yozuvlarni o'zgarishsiz qaytaradi, noma'lum versiyada
+CacheCodecError - chaqiruvchi yozuvni keshda yo'q deb hisoblaydi.
+
+Masalan:
+    data = encode(flights)      # b'\\xbcP\\x01\\x01...'
+    decode(data) == flights     # True
+    decode(flights) is flights  # eski yozuv
+"""
+
+import pickle
+import zlib
+from typing import Any, Callable, Dict, List, Tuple
+
+MAGIC = b'\xbcP'
+VERSION = 1
+
+FLAG_ZLIB = 0x01
+
+# Shundan katta (bayt) pickle siqiladi - kichik yozuvlarda zlib foyda bermaydi
+COMPRESS_THRESHOLD = 1024
+COMPRESS_LEVEL = 6
+
+# Doimiy ustun sifatida faqat o'zgarmas qiymatlar saqlanadi (qatorlar bitta obyektni bo'lishadi)
+_SCALARS = (str, int, float, bool, type(None))
+
+_RAW = 'raw'
+_COLUMNS = 'cols'
+_CONST = 'c'
+_LIST = 'l'
+
+
+class CacheCodecError(ValueError):
+    """Yozuvni o'qib bo'lmaydi (noma'lum versiya yoki buzilgan ma'lumot)"""
+
+
+def _constant(values: List[Any]) -> bool:
+    first = values[0]
+    if not isinstance(first, _SCALARS):
+        return False
+    # 1 == 1.0 == True - turi ham bir xil bo'lishi kerak
+    return all(type(value) is type(first) and value == first for value in values)
+
+
+def _to_columns(value: Any) -> Tuple:
+    """Bir xil kalitli lug'atlar ro'yxati -> ustunlar, qolgan hammasi o'zgarishsiz"""
+    if not isinstance(value, list) or not value or not all(type(item) is dict for item in value):
+        return (_RAW, value)
+    keys = tuple(value[0])
+    # Kalitlar (va tartibi) har qatorda bir xil bo'lsagina - aks holda JSON tartibi buziladi
+    if any(tuple(item) != keys for item in value):
+        return (_RAW, value)
+
+    columns = []
+    for key in keys:
+        values = [item[key] for item in value]
+        columns.append((_CONST, values[0]) if _constant(values) else (_LIST, values))
+    return (_COLUMNS, len(value), keys, columns)
+
+
+def _from_columns(packed: Tuple) -> Any:
+    if packed[0] == _RAW:
+        return packed[1]
+    _, count, keys, columns = packed
+    expanded = [values if kind == _LIST else [values] * count for kind, values in columns]
+    return [dict(zip(keys, row)) for row in zip(*expanded)] if keys else [{} for _ in range(count)]
+
+
+def encode(value: Any, compress_threshold: int = COMPRESS_THRESHOLD) -> bytes:
+    """Qiymat -> ixcham baytlar (joriy VERSION)"""
+    body = pickle.dumps(_to_columns(value), pickle.HIGHEST_PROTOCOL)
+    flags = 0
+    if len(body) > compress_threshold:
+        compressed = zlib.compress(body, COMPRESS_LEVEL)
+        if len(compressed) < len(body):
+            body, flags = compressed, FLAG_ZLIB
+    return MAGIC + bytes((VERSION, flags)) + body
+
+
+def _decode_v1(flags: int, body: bytes) -> Any:
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return _from_columns(pickle.loads(body))
+
+
+# Versiya -> o'quvchi (yangi format qo'shilganda eskilari shu yerda qoladi)
+_DECODERS: Dict[int, Callable[[int, bytes], Any]] = {
+    1: _decode_v1,
+}
+
+
+def is_encoded(data: Any) -> bool:
+    return isinstance(data, bytes) and data[:2] == MAGIC
+
+
+def decode(data: Any) -> Any:
+    """Baytlar -> qiymat (har chaqiruvda yangi nusxa); kodeksiz eski yozuv - o'zgarishsiz"""
+    if not is_encoded(data):
+        return data
+    if len(data) < 4:
+        raise CacheCodecError("Yozuv sarlavhasi to'liq emas")
+    decoder = _DECODERS.get(data[2])
+    if decoder is None:
+        raise CacheCodecError(f"Noma'lum kesh kodek versiyasi: {data[2]}")
+    try:
+        return decoder(data[3], data[4:])
+    except (zlib.error, pickle.UnpicklingError, EOFError, ValueError, TypeError) as e:
+        raise CacheCodecError(f"Yozuvni o'qib bo'lmadi: {e}") from e
@@ -0,0 +1,223 @@
+"""
+Circuit Breaker - Tashqi API endpointlari holatini kuzatish
+
+Har bir endpoint uchun so'nggi WINDOW_SECONDS dagi chaqiruvlar, xatolar va sekin
+javoblar umumiy keshda (barcha workerlar uchun) sanaladi:
+1. closed - so'rovlar odatdagidek yuboriladi
+2. open - xato yoki sekin javoblar ulushi chegaradan oshdi; so'rovlar darhol
+   o'tkazib yuboriladi va chaqiruvchi keyingi manbaga o'tadi
+3. half_open - open_seconds o'tgach bitta worker sinov so'rovini yuboradi;
+   muvaffaqiyatli bo'lsa - closed, aks holda yana open
+
+Umumiy kesh ishlamasa breaker so'rovlarni to'xtatmaydi (fail-open).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = 'shared'
+KEY_PREFIX = 'circuit'
+
+# Oyna bir necha chelakdan iborat (har biri BUCKET_SECONDS)
+BUCKET_SECONDS = 10
+WINDOW_SECONDS = 60
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+@dataclass(frozen=True)
+class BreakerConfig:
+    """Breaker chegaralari"""
+    # Oynada kamida shuncha chaqiruv bo'lsa baholanadi
+    min_calls: int = 5
+    error_threshold: float = 0.5
+    slow_call_seconds: float = 5.0
+    slow_threshold: float = 0.8
+    # Open holatda turish muddati (sekund)
+    open_seconds: int = 30
+
+
+class CircuitBreaker:
+    """Bitta endpoint uchun breaker (holat umumiy keshda)"""
+
+    def __init__(self, name: str, config: BreakerConfig = BreakerConfig(), alias: str = SHARED_CACHE_ALIAS):
+        self.name = name
+        self.config = config
+        self.alias = alias
+        self.prefix = f"{KEY_PREFIX}:{name}"
+        self._lock = threading.Lock()
+        self._counters = {'allowed': 0, 'rejected': 0, 'opened': 0, 'probes': 0}
+
+    @property
+    def shared(self):
+        try:
+            return caches[self.alias]
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _window_keys(self, now: float) -> List[str]:
+        current = int(now // BUCKET_SECONDS)
+        buckets = range(current - WINDOW_SECONDS // BUCKET_SECONDS + 1, current + 1)
+        return [f"{self.prefix}:{bucket}:{field}" for bucket in buckets for field in ('calls', 'errors', 'slow')]
+
+    def _state(self) -> Optional[Dict]:
+        return self.shared.get(f"{self.prefix}:state")
+
+    def allow(self) -> bool:
+        """So'rov yuborish mumkinmi (open bo'lsa False, half_open da faqat bitta sinov)"""
+        try:
+            state = self._state()
+            if state is None:
+                self._count('allowed')
+                return True
+
+            if time.time() < state['until']:
+                self._count('rejected')
+                return False
+
+            # Half-open: barcha workerlar orasida bitta sinov so'rovi
+            if self.shared.add(f"{self.prefix}:probe", 1, self.config.open_seconds):
+                self._count('probes')
+                return True
+            self._count('rejected')
+            return False
+        except Exception as e:
+            logger.warning(f"Circuit breaker ({self.name}) holatini o'qib bo'lmadi: {e}")
+            return True
+
+    def release(self):
+        """allow() ruxsat berdi, lekin so'rov yuborilmadi (masalan, rate limit) - sinov o'rnini bo'shatish"""
+        try:
+            state = self._state()
+            if state is not None and time.time() >= state['until']:
+                self.shared.delete(f"{self.prefix}:probe")
+        except Exception as e:
+            logger.warning(f"Circuit breaker ({self.name}) sinov o'rnini bo'shatib bo'lmadi: {e}")
+
+    def record(self, success: bool, elapsed: float):
+        """Chaqiruv natijasini yozish va holatni qayta baholash"""
+        slow = elapsed >= self.config.slow_call_seconds
+        now = time.time()
+        try:
+            state = self._state()
+            if state is not None and now >= state['until']:
+                # Sinov so'rovi natijasi
+                if success and not slow:
+                    self._close(now)
+                else:
+                    self._open(now, 'sinov so\'rovi muvaffaqiyatsiz')
+                return
+
+            bucket = int(now // BUCKET_SECONDS)
+            self._incr(f"{self.prefix}:{bucket}:calls")
+            if not success:
+                self._incr(f"{self.prefix}:{bucket}:errors")
+            if slow:
+                self._incr(f"{self.prefix}:{bucket}:slow")
+
+            if state is None and (not success or slow):
+                self._evaluate(now)
+        except Exception as e:
+            logger.warning(f"Circuit breaker ({self.name}) natijani yozib bo'lmadi: {e}")
+
+    def _incr(self, key: str):
+        try:
+            self.shared.incr(key)
+        except ValueError:
+            # Kalit hali yo'q - oyna tugagach o'zi o'chadi
+            self.shared.add(key, 0, WINDOW_SECONDS + BUCKET_SECONDS)
+            self.shared.incr(key)
+
+    def _window(self, now: float) -> Dict[str, int]:
+        values = self.shared.get_many(self._window_keys(now))
+        totals = {'calls': 0, 'errors': 0, 'slow': 0}
+        for key, value in values.items():
+            totals[key.rsplit(':', 1)[1]] += int(value)
+        return totals
+
+    def _evaluate(self, now: float):
+        window = self._window(now)
+        if window['calls'] < self.config.min_calls:
+            return
+        error_rate = window['errors'] / window['calls']
+        slow_rate = window['slow'] / window['calls']
+        if error_rate >= self.config.error_threshold:
+            self._open(now, f"xatolar {error_rate:.0%}")
+        elif slow_rate >= self.config.slow_threshold:
+            self._open(now, f"sekin javoblar {slow_rate:.0%}")
+
+    def _open(self, now: float, reason: str):
+        until = now + self.config.open_seconds
+        # Holat open muddatidan uzoqroq saqlanadi - half_open ni aniqlash uchun
+        self.shared.set(f"{self.prefix}:state", {'state': OPEN, 'until': until}, self.config.open_seconds * 10)
+        self.shared.delete(f"{self.prefix}:probe")
+        self._count('opened')
+        logger.warning(f"Circuit breaker ochildi: {self.name} ({reason}), {self.config.open_seconds} s")
+
+    def _close(self, now: float):
+        self.shared.delete_many([f"{self.prefix}:state", f"{self.prefix}:probe", *self._window_keys(now)])
+        logger.info(f"Circuit breaker yopildi: {self.name}")
+
+    def status(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        try:
+            now = time.time()
+            state = self._state()
+            window = self._window(now)
+        except Exception as e:
+            return {'state': 'unknown', 'error': str(e), **counters}
+
+        if state is None:
+            current = CLOSED
+        else:
+            current = OPEN if now < state['until'] else HALF_OPEN
+        return {
+            'state': current,
+            'open_until': state['until'] if state else None,
+            **window,
+            'error_rate': round(window['errors'] / window['calls'], 3) if window['calls'] else 0.0,
+            **counters,
+        }
+
+
+# Endpointlar uchun chegaralar (ko'rsatilmaganlari - BreakerConfig())
+BREAKER_CONFIGS = {
+    'travelpayouts:prices_for_dates': BreakerConfig(slow_call_seconds=8.0),
+    'travelpayouts:latest_prices': BreakerConfig(slow_call_seconds=8.0),
+    'booking:search': BreakerConfig(min_calls=3, open_seconds=60),
+    'booking:locations': BreakerConfig(min_calls=3, open_seconds=60),
+}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Endpoint breakeri (protsessda bitta instans)"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name, BREAKER_CONFIGS.get(name, BreakerConfig()))
+    return breaker
+
+
+def circuit_status(prefix: str = '') -> Dict[str, Dict]:
+    """Sozlangan va ishlatilgan breakerlar holati"""
+    names = sorted(set(_breakers) | set(BREAKER_CONFIGS))
+    return {name: get_circuit_breaker(name).status() for name in names if name.startswith(prefix)}
@@ -0,0 +1,235 @@
+"""
+Contraction Hierarchy - Katta parvozlar grafida tezkor eng arzon yo'l so'rovlari
+
+Oflayn bosqich (build):
+1. Tugunlar muhimlik bo'yicha tartiblanadi (edge difference + qo'shnilar)
+2. Har bir tugun "qisqartiriladi" - kerak bo'lsa shortcut qirralar qo'shiladi
+3. Natija: yuqoriga yo'nalgan ikki graf (oldinga va orqaga qidiruv uchun)
+
+So'rov (query): ikki tomonlama Dijkstra faqat yuqoriga qarab - bir necha o'nlab
+tugunni ko'radi, so'ng shortcutlar asl yo'lga yoyiladi.
+"""
+
+import heapq
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.graph_search import Edge, Graph, INF, edge_price
+
+# Witness qidiruvida ko'riladigan tugunlar chegarasi
+WITNESS_SETTLE_LIMIT = 20
+
+
+class ContractionHierarchy:
+    """Oldindan hisoblangan contraction hierarchy"""
+
+    def __init__(
+        self,
+        rank: Dict[str, int],
+        upward: Dict[str, List[Tuple[str, float]]],
+        downward: Dict[str, List[Tuple[str, float]]],
+        middle: Dict[Tuple[str, str], str],
+    ):
+        self.rank = rank
+        self.upward = upward        # u -> [(x, w)], rank[x] > rank[u]
+        self.downward = downward    # x -> [(u, w)], u -> x qirrasi, rank[u] > rank[x]
+        self.middle = middle        # shortcut (u, x) -> qisqartirilgan tugun
+
+    @property
+    def shortcuts_count(self) -> int:
+        return len(self.middle)
+
+    @classmethod
+    def build(cls, graph: Graph, weight: Callable[[Edge], float] = edge_price) -> 'ContractionHierarchy':
+        """Grafdan hierarchy tuzish"""
+        out_edges = {node: {} for node in graph}
+        in_edges = {node: {} for node in graph}
+        for origin, edges in graph.items():
+            for edge in edges:
+                dest = edge[0]
+                if dest == origin:
+                    continue
+                out_edges.setdefault(dest, {})
+                in_edges.setdefault(dest, {})
+                w = weight(edge)
+                if w < out_edges[origin].get(dest, INF):
+                    out_edges[origin][dest] = w
+                    in_edges[dest][origin] = w
+
+        # Qisqartirilgandan keyin ham barcha qirralar (asl + shortcut) saqlanadi
+        all_edges = {
+            (origin, dest): w
+            for origin, targets in out_edges.items()
+            for dest, w in targets.items()
+        }
+        middle = {}
+        contracted = set()
+        depth = {node: 0 for node in out_edges}
+
+        def shortcuts_for(node: str) -> List[Tuple[str, str, float]]:
+            """Tugun qisqartirilsa kerak bo'ladigan shortcutlar"""
+            needed = []
+            sources = list(in_edges[node].items())
+            targets = list(out_edges[node].items())
+            if not sources or not targets:
+                return needed
+            max_out = max(w for _, w in targets)
+            for u, w_in in sources:
+                limit = w_in + max_out
+                witness = _witness_search(out_edges, u, node, limit)
+                for x, w_out in targets:
+                    if x == u:
+                        continue
+                    via = w_in + w_out
+                    if witness.get(x, INF) > via:
+                        needed.append((u, x, via))
+            return needed
+
+        def importance(node: str) -> int:
+            removed = len(in_edges[node]) + len(out_edges[node])
+            return len(shortcuts_for(node)) - removed + depth[node]
+
+        queue = [(importance(node), node) for node in out_edges]
+        heapq.heapify(queue)
+        rank = {}
+
+        while queue:
+            _, node = heapq.heappop(queue)
+            if node in contracted:
+                continue
+
+            # Lazy yangilash - muhimlik o'zgargan bo'lsa qaytadan navbatga
+            current = importance(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+
+            for u, x, via in shortcuts_for(node):
+                if via < out_edges[u].get(x, INF):
+                    out_edges[u][x] = via
+                    in_edges[x][u] = via
+                    all_edges[(u, x)] = via
+                    middle[(u, x)] = node
+
+            rank[node] = len(rank)
+            contracted.add(node)
+
+            # Qolgan grafdan tugunni olib tashlash (witness qidiruvlari tezlashadi)
+            for u in in_edges[node]:
+                out_edges[u].pop(node, None)
+                depth[u] = max(depth[u], depth[node] + 1)
+            for x in out_edges[node]:
+                in_edges[x].pop(node, None)
+                depth[x] = max(depth[x], depth[node] + 1)
+
+        upward = {node: [] for node in rank}
+        downward = {node: [] for node in rank}
+        for (origin, dest), w in all_edges.items():
+            if rank[dest] > rank[origin]:
+                upward[origin].append((dest, w))
+            else:
+                downward[dest].append((origin, w))
+
+        return cls(rank, upward, downward, middle)
+
+    def query(self, start: str, end: str) -> Optional[List[str]]:
+        """Eng arzon yo'l - yuqoriga yo'nalgan ikki tomonlama qidiruv"""
+        if start not in self.rank or end not in self.rank:
+            return None
+        if start == end:
+            return [start]
+
+        adjacency = (self.upward, self.downward)
+        dist = ({start: 0}, {end: 0})
+        parents = ({start: None}, {end: None})
+        heaps = ([(0, start)], [(0, end)])
+        settled = (set(), set())
+        best = INF
+        meeting = None
+
+        while heaps[0] or heaps[1]:
+            # Ikkala tomon ham eng yaxshi natijadan oshsa - to'xtash
+            fronts = [heap[0][0] if heap else INF for heap in heaps]
+            if min(fronts) >= best:
+                break
+            side = 0 if fronts[0] <= fronts[1] else 1
+
+            cost, current = heapq.heappop(heaps[side])
+            if current in settled[side]:
+                continue
+            settled[side].add(current)
+
+            if current in dist[1 - side]:
+                total = cost + dist[1 - side][current]
+                if total < best:
+                    best = total
+                    meeting = current
+
+            for neighbor, w in adjacency[side].get(current, []):
+                new_cost = cost + w
+                if new_cost < dist[side].get(neighbor, INF):
+                    dist[side][neighbor] = new_cost
+                    parents[side][neighbor] = current
+                    heapq.heappush(heaps[side], (new_cost, neighbor))
+
+        if meeting is None:
+            return None
+
+        # Hierarchy dagi yo'l (shortcutlar bilan)
+        path = []
+        node = meeting
+        while node is not None:
+            path.append(node)
+            node = parents[0][node]
+        path.reverse()
+        node = parents[1][meeting]
+        while node is not None:
+            path.append(node)
+            node = parents[1][node]
+
+        # Shortcutlarni asl qirralarga yoyish
+        unpacked = [path[0]]
+        for origin, dest in zip(path, path[1:]):
+            unpacked.extend(self._unpack(origin, dest))
+        return unpacked
+
+    def _unpack(self, origin: str, dest: str) -> List[str]:
+        """Shortcut qirrani asl tugunlar ketma-ketligiga yoyish (origin siz)"""
+        result = []
+        stack = [(origin, dest)]
+        while stack:
+            u, x = stack.pop()
+            via = self.middle.get((u, x))
+            if via is None:
+                result.append(x)
+            else:
+                # Avval u -> via, so'ng via -> x
+                stack.append((via, x))
+                stack.append((u, via))
+        return result
+
+
+def _witness_search(
+    out_edges: Dict[str, Dict[str, float]],
+    source: str,
+    skip: str,
+    limit: float
+) -> Dict[str, float]:
+    """Qisqartirilayotgan tugunsiz cheklangan Dijkstra (witness yo'llar)"""
+    dist = {source: 0}
+    heap = [(0, source)]
+    settled = 0
+
+    while heap and settled < WITNESS_SETTLE_LIMIT:
+        cost, current = heapq.heappop(heap)
+        if cost > dist.get(current, INF) or cost > limit:
+            continue
+        settled += 1
+        for neighbor, w in out_edges[current].items():
+            if neighbor == skip:
+                continue
+            new_cost = cost + w
+            if new_cost < dist.get(neighbor, INF) and new_cost <= limit:
+                dist[neighbor] = new_cost
+                heapq.heappush(heap, (new_cost, neighbor))
+
+    return dist
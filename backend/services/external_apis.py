@@ -15,19 +15,66 @@ import re
 import json
 import requests
 import hashlib
+import time
 from datetime import date, datetime, timedelta
 from typing import Optional, List, Dict, Any
 from decimal import Decimal
 from urllib.parse import urlencode
 import logging
 from functools import lru_cache
-from django.core.cache import cache
+from services.price_cache import price_cache
+from services.price_imputation import impute_flight_price
+from services.price_writer import price_writer
+from services.booking_destinations import lookup_destination, save_destination
+from services.circuit_breaker import circuit_status, get_circuit_breaker
+from services.rate_limiter import get_rate_limiter, TokenBucket
 
 logger = logging.getLogger(__name__)
 
 # Kesh vaqtlari (sekundlarda)
 FLIGHT_CACHE_TTL = 300  # 5 daqiqa - real vaqt uchun
 CALENDAR_CACHE_TTL = 3600  # 1 soat
+CALENDAR_EMPTY_TTL = 600  # bo'sh oy yoki xato - 10 daqiqa (kunlik so'rovlar kalendarni qayta so'ramaydi)
+HOTEL_CACHE_TTL = 3600  # 1 soat
+
+# Booking.com shahar ID si topilmagani eslab qolinadi (qayta so'ralmaydi)
+DEST_ERROR_TTL = 120  # xato, timeout, circuit/limit - 2 daqiqa
+DEST_EMPTY_TTL = 3600  # API shaharni topmadi - 1 soat
+
+
+def guarded_get(
+    session: requests.Session,
+    endpoint: str,
+    rate_limiter: TokenBucket,
+    url: str,
+    params: Dict,
+    timeout: float
+) -> Optional[requests.Response]:
+    """
+    Circuit breaker va rate limit ostidagi GET so'rov
+
+    Endpoint ochiq (open) bo'lsa yoki limit uzoq kutishni talab qilsa - None
+    (chaqiruvchi darhol keyingi manbaga o'tadi). Tarmoq xatolari qayd qilinib qayta ko'tariladi.
+    """
+    breaker = get_circuit_breaker(endpoint)
+    if not breaker.allow():
+        logger.info(f"{endpoint}: circuit ochiq, o'tkazib yuborildi")
+        return None
+    if not rate_limiter.acquire():
+        # Half-open sinovi yuborilmadi - boshqa so'rov sinab ko'rsin
+        breaker.release()
+        return None
+
+    started = time.monotonic()
+    try:
+        response = session.get(url, params=params, timeout=timeout)
+    except requests.RequestException:
+        breaker.record(False, time.monotonic() - started)
+        raise
+    # 5xx va kvota xatolari (403/429) - endpoint hozircha yaroqsiz
+    failed = response.status_code >= 500 or response.status_code in (403, 429)
+    breaker.record(not failed, time.monotonic() - started)
+    return response
 
 
 class AviasalesAPI:
@@ -45,6 +92,7 @@ class AviasalesAPI:
     PRICES_LATEST_URL = "https://api.travelpayouts.com/aviasales/v3/get_latest_prices"
     PRICES_CHEAP_URL = "https://api.travelpayouts.com/v1/prices/cheap"
     DIRECT_FLIGHTS_URL = "https://api.travelpayouts.com/v1/prices/direct"
+    CALENDAR_URL = "https://api.travelpayouts.com/v1/prices/calendar"
 
     # Aviasales.uz uchun web endpoint (API ishlamasa)
     AVIASALES_WEB_URL = "https://www.aviasales.uz/search"
@@ -58,12 +106,17 @@ class AviasalesAPI:
             'Accept': 'application/json',
             'Accept-Language': 'uz,ru;q=0.9,en;q=0.8',
         })
-        self._last_request_time = None
+        # Barcha workerlar uchun umumiy limit
+        self.rate_limiter = get_rate_limiter('travelpayouts')
 
     def is_configured(self) -> bool:
         """API sozlanganligini tekshirish"""
         return bool(self.token and self.token != 'your_travelpayouts_token_here')
 
+    def _request(self, endpoint: str, url: str, params: Dict, timeout: float) -> Optional[requests.Response]:
+        """Endpoint breakeri va umumiy limit ostida so'rov"""
+        return guarded_get(self.session, f"travelpayouts:{endpoint}", self.rate_limiter, url, params, timeout)
+
     def _get_cache_key(self, prefix: str, *args) -> str:
         """Kesh kalitini yaratish"""
         key_data = f"{prefix}:{':'.join(str(a) for a in args)}"
@@ -75,6 +128,8 @@ class AviasalesAPI:
             'configured': self.is_configured(),
             'token_set': bool(self.token),
             'marker_set': bool(self.marker),
+            'rate_limit': self.rate_limiter.status(),
+            'circuits': circuit_status('travelpayouts:'),
             'endpoints': {
                 'prices_for_dates': self.PRICES_URL,
                 'latest_prices': self.PRICES_LATEST_URL,
@@ -109,20 +164,43 @@ class AviasalesAPI:
         Returns:
             Parvozlar ro'yxati
         """
-        # Keshni tekshirish
-        cache_key = self._get_cache_key(
+        # Keshni tekshirish (eskirgan bo'lsa darhol qaytariladi va fonda yangilanadi)
+        cache_key = self._flights_cache_key(origin, destination, departure_date, return_date, direct, currency)
+
+        def load():
+            return self._fetch_flights(origin, destination, departure_date, return_date, direct, currency)
+
+        if not use_cache:
+            return load()
+        return price_cache.get_or_refresh('flights', cache_key, load, FLIGHT_CACHE_TTL, cache_if=bool)
+
+    def _flights_cache_key(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        direct: bool,
+        currency: str
+    ) -> str:
+        """search_flights kesh kaliti (sinxron va async klient uchun bir xil)"""
+        return self._get_cache_key(
             'flights', origin, destination,
             departure_date.isoformat() if isinstance(departure_date, date) else departure_date,
             return_date.isoformat() if return_date and isinstance(return_date, date) else return_date,
             direct, currency
         )
 
-        if use_cache:
-            cached = cache.get(cache_key)
-            if cached:
-                logger.info(f"Keshdan: {origin}->{destination}")
-                return cached
-
+    def _fetch_flights(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        direct: bool,
+        currency: str
+    ) -> List[Dict]:
+        """Manbalar zanjiri: API -> bepul endpoint -> taxminiy narxlar"""
         flights = []
         data_source = 'fallback'
 
@@ -143,14 +221,15 @@ class AviasalesAPI:
             flights = self._get_fallback_flights(origin, destination, departure_date)
             data_source = 'fallback'
 
-        # Ma'lumot manbasi qo'shish
+        # Ma'lumot manbasi qo'shish (bitta javob - bitta vaqt, keshda doimiy ustun bo'ladi)
+        fetched_at = datetime.now().isoformat()
         for flight in flights:
             flight['data_source'] = data_source
-            flight['fetched_at'] = datetime.now().isoformat()
+            flight['fetched_at'] = fetched_at
 
-        # Keshga saqlash
-        if flights and use_cache:
-            cache.set(cache_key, flights, FLIGHT_CACHE_TTL)
+        # API narxlari fonda bazaga yoziladi (taxminiy narxlar emas)
+        if data_source != 'fallback':
+            price_writer.enqueue_flights(flights, departure_date, data_source)
 
         return flights
 
@@ -167,24 +246,14 @@ class AviasalesAPI:
 
         # 1. Avval prices_for_dates bilan urinish
         try:
-            params = {
-                'origin': origin,
-                'destination': destination,
-                'departure_at': departure_date.strftime('%Y-%m-%d'),
-                'currency': currency,
-                'token': self.token,
-                'sorting': 'price',
-                'direct': 'true' if direct else 'false',
-                'limit': 10,
-                'one_way': 'true' if not return_date else 'false',
-            }
-
-            if return_date:
-                params['return_at'] = return_date.strftime('%Y-%m-%d')
+            params = self._prices_for_dates_params(origin, destination, departure_date, return_date, direct, currency)
 
-            response = self.session.get(self.PRICES_URL, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            # Circuit ochiq yoki limit - keyingi endpointga o'tiladi
+            response = self._request('prices_for_dates', self.PRICES_URL, params, 15)
+            data = {}
+            if response is not None:
+                response.raise_for_status()
+                data = response.json()
 
             if data.get('success') and data.get('data'):
                 logger.info(f"Aviasales API (prices_for_dates): {origin}->{destination} - {len(data['data'])} ta natija")
@@ -195,15 +264,11 @@ class AviasalesAPI:
 
         # 2. Agar natija bo'lmasa, get_latest_prices bilan urinish
         try:
-            params = {
-                'origin': origin,
-                'destination': destination,
-                'currency': currency,
-                'token': self.token,
-                'limit': 10,
-            }
+            params = self._latest_prices_params(origin, destination, currency)
 
-            response = self.session.get(self.PRICES_LATEST_URL, params=params, timeout=15)
+            response = self._request('latest_prices', self.PRICES_LATEST_URL, params, 15)
+            if response is None:
+                return []
             response.raise_for_status()
             data = response.json()
 
@@ -216,6 +281,39 @@ class AviasalesAPI:
 
         return []
 
+    def _prices_for_dates_params(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        direct: bool,
+        currency: str
+    ) -> Dict:
+        params = {
+            'origin': origin,
+            'destination': destination,
+            'departure_at': departure_date.strftime('%Y-%m-%d'),
+            'currency': currency,
+            'token': self.token,
+            'sorting': 'price',
+            'direct': 'true' if direct else 'false',
+            'limit': 10,
+            'one_way': 'true' if not return_date else 'false',
+        }
+        if return_date:
+            params['return_at'] = return_date.strftime('%Y-%m-%d')
+        return params
+
+    def _latest_prices_params(self, origin: str, destination: str, currency: str) -> Dict:
+        return {
+            'origin': origin,
+            'destination': destination,
+            'currency': currency,
+            'token': self.token,
+            'limit': 10,
+        }
+
     def _parse_latest_prices(self, flights_data: List[Dict], origin: str, destination: str) -> List[Dict]:
         """get_latest_prices javobini parse qilish"""
         flights = []
@@ -229,56 +327,57 @@ class AviasalesAPI:
                 'return_at': flight.get('return_date', ''),
                 'duration': flight.get('duration', 0),
                 'transfers': flight.get('number_of_changes', 0),
-                'link': self._build_aviasales_link(origin, destination, {'departure_at': flight.get('depart_date', '')}),
+                'link': self.build_aviasales_link(origin, destination, {'departure_at': flight.get('depart_date', '')}),
             })
         return flights
 
     def _search_free_api(self, origin: str, destination: str, departure_date: date, currency: str) -> List[Dict]:
         """Bepul API endpoint dan qidirish (token kerak emas)"""
         try:
-            # Cheap prices endpoint
-            month = departure_date.strftime('%Y-%m')
-            url = f"https://api.travelpayouts.com/v1/prices/cheap"
-
-            params = {
-                'origin': origin,
-                'destination': destination,
-                'depart_date': month,
-                'currency': currency,
-            }
-
-            # Token bo'lmasa ham ishlaydi (cheklangan)
-            if self.token:
-                params['token'] = self.token
+            response = self._request('cheap', self.PRICES_CHEAP_URL, self._cheap_params(origin, destination, departure_date, currency), 10)
 
-            response = self.session.get(url, params=params, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success') and data.get('data'):
-                    dest_data = data['data'].get(destination, {})
-                    flights = []
-                    for key, flight_info in dest_data.items():
-                        flights.append({
-                            'origin': origin,
-                            'destination': destination,
-                            'price': float(flight_info.get('price', 0)),
-                            'airline': flight_info.get('airline', 'Unknown'),
-                            'departure_at': flight_info.get('departure_at', ''),
-                            'return_at': flight_info.get('return_at', ''),
-                            'duration': flight_info.get('flight_duration', 0),
-                            'transfers': flight_info.get('number_of_changes', 0),
-                            'expires_at': flight_info.get('expires_at', ''),
-                        })
-                    if flights:
-                        logger.info(f"Aviasales Free API: {origin}->{destination} - {len(flights)} ta natija")
-                        return flights
+            if response is not None and response.status_code == 200:
+                flights = self._parse_cheap_prices(response.json(), origin, destination)
+                if flights:
+                    logger.info(f"Aviasales Free API: {origin}->{destination} - {len(flights)} ta natija")
+                    return flights
 
         except Exception as e:
             logger.warning(f"Aviasales Free API xatosi: {e}")
 
         return []
 
+    def _cheap_params(self, origin: str, destination: str, departure_date: date, currency: str) -> Dict:
+        params = {
+            'origin': origin,
+            'destination': destination,
+            'depart_date': departure_date.strftime('%Y-%m'),
+            'currency': currency,
+        }
+        # Token bo'lmasa ham ishlaydi (cheklangan)
+        if self.token:
+            params['token'] = self.token
+        return params
+
+    def _parse_cheap_prices(self, data: Dict, origin: str, destination: str) -> List[Dict]:
+        """prices/cheap javobini parse qilish"""
+        if not (data.get('success') and data.get('data')):
+            return []
+        flights = []
+        for key, flight_info in data['data'].get(destination, {}).items():
+            flights.append({
+                'origin': origin,
+                'destination': destination,
+                'price': float(flight_info.get('price', 0)),
+                'airline': flight_info.get('airline', 'Unknown'),
+                'departure_at': flight_info.get('departure_at', ''),
+                'return_at': flight_info.get('return_at', ''),
+                'duration': flight_info.get('flight_duration', 0),
+                'transfers': flight_info.get('number_of_changes', 0),
+                'expires_at': flight_info.get('expires_at', ''),
+            })
+        return flights
+
     def _parse_api_response(self, flights_data: List[Dict], origin: str, destination: str) -> List[Dict]:
         """API javobini parse qilish"""
         flights = []
@@ -292,17 +391,32 @@ class AviasalesAPI:
                 'return_at': flight.get('return_at', ''),
                 'duration': flight.get('duration', 0) or flight.get('duration_to', 0),
                 'transfers': flight.get('transfers', 0),
-                'link': self._build_aviasales_link(origin, destination, flight),
+                'link': self.build_aviasales_link(origin, destination, flight),
             })
         return flights
 
-    def _build_aviasales_link(self, origin: str, destination: str, flight: Dict) -> str:
+    def build_aviasales_link(self, origin: str, destination: str, flight: Dict) -> str:
         """Aviasales.uz havolasini yaratish"""
         departure = flight.get('departure_at', '')[:10].replace('-', '')
         return f"https://www.aviasales.uz/search/{origin}{departure}{destination}1"
 
     def _get_fallback_flights(self, origin: str, destination: str, departure_date: date) -> List[Dict]:
         """API ishlamasa, taxminiy narxlar (O'zbekiston yo'nalishlari uchun)"""
+        # Tarixdan hisoblangan jadval (hafta kuni va qolgan kunlar bo'yicha)
+        imputed = impute_flight_price(origin, destination, departure_date)
+        if imputed:
+            logger.info(f"Aviasales Fallback (imputatsiya): {origin}->{destination} = ${imputed['price']}")
+            return [{
+                'origin': origin,
+                'destination': destination,
+                'price': float(imputed['price']),
+                'airline': imputed['airline'],
+                'departure_at': departure_date.strftime('%Y-%m-%d'),
+                'duration': imputed['duration'],
+                'transfers': 0,
+                'link': f"https://www.aviasales.uz/search/{origin}{departure_date.strftime('%d%m')}{destination}1",
+            }]
+
         base_prices = {
             # Toshkentdan
             ('TAS', 'IST'): (250, 'Turkish Airlines', 300),
@@ -368,27 +482,91 @@ class AviasalesAPI:
         return None
 
     def get_prices_calendar(self, origin: str, destination: str, month: str) -> Dict[str, float]:
-        """Oylik narxlar kalendarini olish"""
+        """Oylik narxlar kalendarini olish (keshlangan, parallel so'rovlar birlashtiriladi)"""
+        cache_key = self._get_cache_key('calendar', origin, destination, month)
+        return price_cache.get_or_refresh(
+            'calendar', cache_key,
+            lambda: self._remember_empty_calendar(cache_key, self._fetch_prices_calendar(origin, destination, month)),
+            CALENDAR_CACHE_TTL, cache_if=bool
+        )
+
+    def _remember_empty_calendar(self, cache_key: str, calendar: Dict[str, float]) -> Dict[str, float]:
+        """Bo'sh oy - CALENDAR_EMPTY_TTL ga salbiy yozuv ({}), to'la oy - get_or_refresh o'zi yozadi"""
+        if not calendar:
+            price_cache.set('calendar', cache_key, {}, CALENDAR_EMPTY_TTL)
+        return calendar
+
+    def _fetch_prices_calendar(self, origin: str, destination: str, month: str) -> Dict[str, float]:
+        """Travelpayouts kalendar so'rovi (xato bo'lsa bo'sh lug'at)"""
         try:
             if self.is_configured():
-                params = {
-                    'origin': origin,
-                    'destination': destination,
-                    'calendar_type': 'departure_date',
-                    'depart_date': month,
-                    'token': self.token,
-                    'currency': 'usd',
-                }
-                url = "https://api.travelpayouts.com/v1/prices/calendar"
-                response = self.session.get(url, params=params, timeout=10)
-                if response.status_code == 200:
+                params = self._calendar_params(origin, destination, month)
+                response = self._request('calendar', self.CALENDAR_URL, params, 10)
+                if response is not None and response.status_code == 200:
                     data = response.json()
-                    if data.get('success'):
-                        return {d: info['price'] for d, info in data.get('data', {}).items()}
+                    self._store_calendar_days(origin, destination, data)
+                    return self._parse_calendar(data)
         except Exception as e:
             logger.error(f"Calendar API xatosi: {e}")
         return {}
 
+    def get_calendar_day(self, origin: str, destination: str, departure_date: date) -> Optional[Dict]:
+        """
+        Kunlik eng arzon narx oylik kalendar yozuvlaridan
+
+        Yozuv bo'lmasa oy kalendari olinadi - bitta so'rov oyning barcha kunlarini
+        'flight_day' ga yoyadi. Kalendarda bu kun yo'q bo'lsa None (chaqiruvchi kunlik so'rovga o'tadi);
+        bo'sh oy keshdagi {} dan olinadi - kalendar qayta so'ralmaydi.
+        """
+        if not self.is_configured():
+            return None
+        key = self._calendar_day_key(origin, destination, departure_date.isoformat())
+        entry = price_cache.get('flight_day', key)
+        if entry is None and self.get_prices_calendar(origin, destination, departure_date.strftime('%Y-%m')):
+            entry = price_cache.get('flight_day', key)
+        return entry
+
+    def _calendar_day_key(self, origin: str, destination: str, day: str) -> str:
+        return f"{origin}:{destination}:{day}"
+
+    def _calendar_days(self, origin: str, destination: str, data: Dict) -> Dict[str, Dict]:
+        """
+        Kalendar javobi -> {'TAS:IST:2025-03-15': {'price', 'airline', 'transfers', 'departure_at'}}
+
+        return_at li yozuvlar - borib-qaytish narxi, bir tomonlama segment narxi sifatida yaroqsiz
+        """
+        if not data.get('success'):
+            return {}
+        return {
+            self._calendar_day_key(origin, destination, day[:10]): {
+                'price': float(info['price']),
+                'airline': info.get('airline') or 'Aviakompaniya',
+                'transfers': info.get('transfers', 0),
+                'departure_at': info.get('departure_at', day),
+            }
+            for day, info in data.get('data', {}).items()
+            if info.get('price') and not info.get('return_at')
+        }
+
+    def _store_calendar_days(self, origin: str, destination: str, data: Dict):
+        """Kalendarni kunlik yozuvlarga yoyish (kalendar bilan bir xil muddat)"""
+        price_cache.set_many('flight_day', self._calendar_days(origin, destination, data), CALENDAR_CACHE_TTL)
+
+    def _calendar_params(self, origin: str, destination: str, month: str) -> Dict:
+        return {
+            'origin': origin,
+            'destination': destination,
+            'calendar_type': 'departure_date',
+            'depart_date': month,
+            'token': self.token,
+            'currency': 'usd',
+        }
+
+    def _parse_calendar(self, data: Dict) -> Dict[str, float]:
+        if not data.get('success'):
+            return {}
+        return {d: info['price'] for d, info in data.get('data', {}).items()}
+
 
 # Backwards compatibility
 TravelpayoutsAPI = AviasalesAPI
@@ -404,7 +582,7 @@ class BookingComAPI:
 
     BASE_URL = "https://booking-com.p.rapidapi.com/v1"
 
-    # Shahar ID lari keshi (API chaqiruvlarini kamaytirish uchun)
+    # Ma'lum shahar ID lari (API orqali topilganlari BookingDestination jadvalida va price_cache 'booking_dest' da)
     CITY_IDS = {
         'Istanbul': '-755070',
         'Dubai': '-782831',
@@ -428,21 +606,16 @@ class BookingComAPI:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
-        self._last_request_time = None
-        self._min_request_interval = 1.0  # Minimal 1 sekund oralig'i
+        # Barcha workerlar uchun umumiy limit (sekundiga 1 ta so'rov)
+        self.rate_limiter = get_rate_limiter('booking')
 
     def is_configured(self) -> bool:
         """API sozlanganligini tekshirish"""
         return bool(self.api_key and self.api_key != 'your_rapidapi_key_here')
 
-    def _rate_limit(self):
-        """Rate limiting - so'rovlar orasida minimal vaqt"""
-        import time
-        if self._last_request_time:
-            elapsed = time.time() - self._last_request_time
-            if elapsed < self._min_request_interval:
-                time.sleep(self._min_request_interval - elapsed)
-        self._last_request_time = time.time()
+    def _request(self, endpoint: str, url: str, params: Dict, timeout: float) -> Optional[requests.Response]:
+        """Endpoint breakeri va umumiy limit ostida so'rov"""
+        return guarded_get(self.session, f"booking:{endpoint}", self.rate_limiter, url, params, timeout)
 
     def get_api_status(self) -> Dict[str, Any]:
         """API holatini tekshirish"""
@@ -451,6 +624,8 @@ class BookingComAPI:
             'api_key_set': bool(self.api_key),
             'base_url': self.BASE_URL,
             'cached_cities': list(self.CITY_IDS.keys()),
+            'rate_limit': self.rate_limiter.status(),
+            'circuits': circuit_status('booking:'),
         }
 
     def search_hotels(
@@ -480,131 +655,173 @@ class BookingComAPI:
         Returns:
             Mehmonxonalar ro'yxati
         """
-        # Keshni tekshirish
-        cache_key = f"booking:{city_name}:{checkin_date}:{checkout_date}:{min_stars}"
-        cache_key_hash = hashlib.md5(cache_key.encode()).hexdigest()
-
-        if use_cache:
-            cached = cache.get(cache_key_hash)
-            if cached:
-                logger.info(f"Booking.com keshdan: {city_name}")
-                return cached
-
         if not self.is_configured():
             logger.warning("Booking.com API sozlanmagan, fallback narxlar qaytariladi")
             return self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
 
+        # Keshni tekshirish (eskirgan bo'lsa darhol qaytariladi va fonda yangilanadi)
+        cache_key_hash = self._hotels_cache_key(city_name, checkin_date, checkout_date, min_stars)
+
+        def load():
+            return self._fetch_hotels(city_name, checkin_date, checkout_date, adults, rooms, currency, min_stars)
+
+        if use_cache:
+            hotels = price_cache.get_or_refresh('hotels', cache_key_hash, load, HOTEL_CACHE_TTL, cache_if=bool)
+        else:
+            hotels = load()
+
+        # API natija bermasa - taxminiy narxlar (keshga yozilmaydi)
+        return hotels or self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+
+    def _hotels_cache_key(self, city_name: str, checkin_date: date, checkout_date: date, min_stars: int) -> str:
+        """search_hotels kesh kaliti (sinxron va async klient uchun bir xil)"""
+        cache_key = f"booking:{city_name}:{checkin_date}:{checkout_date}:{min_stars}"
+        return hashlib.md5(cache_key.encode()).hexdigest()
+
+    def _fetch_hotels(
+        self,
+        city_name: str,
+        checkin_date: date,
+        checkout_date: date,
+        adults: int,
+        rooms: int,
+        currency: str,
+        min_stars: int
+    ) -> List[Dict]:
+        """Booking.com API so'rovi (natija bo'lmasa bo'sh ro'yxat)"""
         try:
-            # Avval keshdan shahar ID sini olish
-            dest_id = self.CITY_IDS.get(city_name)
-            if not dest_id:
+            # Avval kod, katalog va keshdan shahar ID sini olish
+            dest_id = self._known_destination(city_name)
+            if dest_id is None:
                 dest_id = self._get_destination_id(city_name)
             if not dest_id:
                 logger.warning(f"Booking.com: {city_name} topilmadi")
-                return self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
-
-            # Yulduz filtri (hostel uchun maxsus)
-            class_filter = None
-            if min_stars == 1:
-                class_filter = '0'  # Hostel/budget
-            elif min_stars >= 2:
-                class_filter = str(min_stars)
-
-            params = {
-                'dest_id': dest_id,
-                'dest_type': 'city',
-                'checkin_date': checkin_date.strftime('%Y-%m-%d'),
-                'checkout_date': checkout_date.strftime('%Y-%m-%d'),
-                'adults_number': adults,
-                'room_number': rooms,
-                'currency': currency,
-                'order_by': 'price',
-                'filter_by_currency': currency,
-                'units': 'metric',
-                'locale': 'en-gb',
-                'page_number': 0,
-                'include_adjacency': 'true',
-            }
-
-            if class_filter:
-                params['categories_filter_ids'] = f'class::{class_filter}'
+                return []
 
-            # Rate limiting qo'llash
-            self._rate_limit()
+            params = self._search_params(dest_id, checkin_date, checkout_date, adults, rooms, currency, min_stars)
 
-            response = self.session.get(
-                f"{self.BASE_URL}/hotels/search",
-                params=params,
-                timeout=15
-            )
+            # Circuit ochiq yoki limit - kesh/taxminiy narxga o'tiladi
+            response = self._request('search', f"{self.BASE_URL}/hotels/search", params, 15)
+            if response is None:
+                return []
 
             # 403 yoki 429 xatosi - fallback ishlatish
             if response.status_code in [403, 429]:
                 logger.warning(f"Booking.com API rate limit ({response.status_code}), fallback ishlatiladi")
-                return self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+                return []
 
             response.raise_for_status()
-            data = response.json()
-
-            hotels = []
-            if data.get('result'):
-                hotels = self._parse_hotels(data['result'], min_stars)
+            hotels = self._parse_hotels(response.json().get('result') or [], min_stars)
+            if hotels:
                 logger.info(f"Booking.com API: {city_name} - {len(hotels)} ta mehmonxona topildi")
-
-                # Keshga saqlash (1 soat)
-                if hotels and use_cache:
-                    cache.set(cache_key_hash, hotels, 3600)
-
-                return hotels
-
-            return self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+                price_writer.enqueue_hotels(city_name, checkin_date, hotels)
+            return hotels
 
         except requests.Timeout:
             logger.warning(f"Booking.com API timeout: {city_name}")
-            return self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+            return []
         except requests.RequestException as e:
             logger.error(f"Booking.com API xatosi: {e}")
-            return self._get_fallback_hotels(city_name, checkin_date, checkout_date, min_stars)
+            return []
 
-    def _get_destination_id(self, city_name: str) -> Optional[str]:
-        """Shahar ID sini topish"""
+    def _search_params(
+        self,
+        dest_id: str,
+        checkin_date: date,
+        checkout_date: date,
+        adults: int,
+        rooms: int,
+        currency: str,
+        min_stars: int
+    ) -> Dict:
+        # Yulduz filtri (hostel uchun maxsus)
+        class_filter = None
+        if min_stars == 1:
+            class_filter = '0'  # Hostel/budget
+        elif min_stars >= 2:
+            class_filter = str(min_stars)
+
+        params = {
+            'dest_id': dest_id,
+            'dest_type': 'city',
+            'checkin_date': checkin_date.strftime('%Y-%m-%d'),
+            'checkout_date': checkout_date.strftime('%Y-%m-%d'),
+            'adults_number': adults,
+            'room_number': rooms,
+            'currency': currency,
+            'order_by': 'price',
+            'filter_by_currency': currency,
+            'units': 'metric',
+            'locale': 'en-gb',
+            'page_number': 0,
+            'include_adjacency': 'true',
+        }
+
+        if class_filter:
+            params['categories_filter_ids'] = f'class::{class_filter}'
+        return params
+
+    def _known_destination(self, city_name: str) -> Optional[str]:
+        """
+        Kod, BookingDestination katalogi yoki keshdagi shahar ID si
+
+        None - hali noma'lum (API so'raladi), '' - yaqinda topilmagan (API so'ralmaydi)
+        """
+        dest_id = self.CITY_IDS.get(city_name) or lookup_destination(city_name)
+        if dest_id:
+            return dest_id
+        return price_cache.get('booking_dest', city_name)
+
+    def _remember_destination(self, city_name: str, dest_id: Optional[str], negative_ttl: int = DEST_ERROR_TTL):
+        """Topilgan ID - keshga va jadvalga; topilmagani - qisqa muddatli salbiy yozuv"""
+        if not dest_id:
+            price_cache.set('booking_dest', city_name, '', negative_ttl)
+            return
+        # Umumiy keshga (barcha workerlar uchun) va jadvalga (qayta ishga tushganda ham)
+        price_cache.set('booking_dest', city_name, dest_id)
         try:
-            # Rate limiting qo'llash
-            self._rate_limit()
+            save_destination(city_name, dest_id)
+        except Exception as e:
+            logger.warning(f"Booking.com ID sini saqlab bo'lmadi ({city_name}): {e}")
 
+    def _get_destination_id(self, city_name: str) -> Optional[str]:
+        """Shahar ID sini topish (natija yoki xato eslab qolinadi)"""
+        try:
             params = {
                 'name': city_name,
                 'locale': 'en-gb',
             }
 
-            response = self.session.get(
-                f"{self.BASE_URL}/hotels/locations",
-                params=params,
-                timeout=10
-            )
+            # Circuit ochiq yoki limit - DEST_ERROR_TTL dan keyin urinib ko'riladi
+            response = self._request('locations', f"{self.BASE_URL}/hotels/locations", params, 10)
+            if response is None:
+                self._remember_destination(city_name, None)
+                return None
 
             # 403 yoki 429 xatosi
             if response.status_code in [403, 429]:
                 logger.warning(f"Booking.com locations API rate limit ({response.status_code})")
+                self._remember_destination(city_name, None)
                 return None
 
             response.raise_for_status()
-            data = response.json()
-
-            if data:
-                for item in data:
-                    if item.get('dest_type') == 'city':
-                        # Keshga qo'shish
-                        self.CITY_IDS[city_name] = item.get('dest_id')
-                        return item.get('dest_id')
-            return None
+            dest_id = self._parse_destination(response.json())
+            self._remember_destination(city_name, dest_id, DEST_EMPTY_TTL)
+            return dest_id
 
         except requests.Timeout:
             logger.warning(f"Destination ID olishda timeout: {city_name}")
-            return None
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Destination ID olishda xato: {e}")
-            return None
+        self._remember_destination(city_name, None)
+        return None
+
+    def _parse_destination(self, data: List[Dict]) -> Optional[str]:
+        """locations javobidan birinchi shahar ID si"""
+        for item in data or []:
+            if item.get('dest_type') == 'city':
+                return item.get('dest_id')
+        return None
 
     def _parse_hotels(self, hotels_data: List[Dict], min_stars: int) -> List[Dict]:
         """API javobini parse qilish"""
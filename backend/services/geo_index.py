@@ -0,0 +1,112 @@
+"""
+Geo Index - Aeroportlar uchun xotiradagi fazoviy indeks
+
+Shaharlar koordinatalari bo'yicha to'r (grid) indeksi:
+1. Har bir shahar GRID_CELL_DEGREES o'lchamli katakka joylashtiriladi
+2. Radius so'rovi faqat qo'shni kataklarni ko'radi, masofa - haversine
+3. City o'zgarganda indeks bekor qilinadi (signallar apps.py da ulanadi)
+
+Masalan: DXB atrofida 150 km - AUH, SHJ (muqobil aeroportlar).
+"""
+
+import logging
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from apps.destinations.models import City
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Katak o'lchami (gradus) - ~111 km kenglik bo'yicha
+GRID_CELL_DEGREES = 1.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Ikki nuqta orasidagi masofa (km)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """To'r asosidagi fazoviy indeks"""
+
+    def __init__(self, points: Iterable[Tuple[str, float, float]], cell_degrees: float = GRID_CELL_DEGREES):
+        self.cell = cell_degrees
+        self.points: Dict[str, Tuple[float, float]] = {}
+        self.grid: Dict[Tuple[int, int], List[str]] = {}
+        self.lon_cells = math.ceil(360 / cell_degrees)
+
+        for code, lat, lon in points:
+            lat, lon = float(lat), float(lon)
+            self.points[code] = (lat, lon)
+            self.grid.setdefault(self._cell(lat, lon), []).append(code)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            math.floor((lat + 90) / self.cell),
+            math.floor((lon + 180) / self.cell) % self.lon_cells,
+        )
+
+    def nearby(self, lat: float, lon: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[float, str]]:
+        """Radius ichidagi shaharlar: [(masofa_km, kod), ...] masofa bo'yicha"""
+        lat, lon = float(lat), float(lon)
+        lat_span = radius_km / 111.0
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + lat_span)))
+        lon_span = radius_km / (111.0 * max(cos_lat, 1e-6))
+
+        row_min, _ = self._cell(max(-90.0, lat - lat_span), lon)
+        row_max, _ = self._cell(min(90.0, lat + lat_span), lon)
+        if lon_span >= 180:
+            columns = range(self.lon_cells)
+        else:
+            first = math.floor((lon - lon_span + 180) / self.cell)
+            last = math.floor((lon + lon_span + 180) / self.cell)
+            columns = {column % self.lon_cells for column in range(first, last + 1)}
+
+        found = []
+        for row in range(row_min, row_max + 1):
+            for column in columns:
+                for code in self.grid.get((row, column), ()):
+                    point_lat, point_lon = self.points[code]
+                    distance = haversine_km(lat, lon, point_lat, point_lon)
+                    if distance <= radius_km:
+                        found.append((distance, code))
+
+        found.sort()
+        return found[:limit] if limit else found
+
+    def nearby_code(self, code: str, radius_km: float, limit: Optional[int] = None) -> List[Tuple[float, str]]:
+        """Shahar atrofidagi boshqa shaharlar (o'zidan tashqari)"""
+        point = self.points.get(code)
+        if point is None:
+            return []
+        found = [item for item in self.nearby(point[0], point[1], radius_km) if item[1] != code]
+        return found[:limit] if limit else found
+
+
+# Jarayon ichidagi indeks (City o'zgarganda bekor qilinadi)
+_index = {'geo': None}
+_lock = threading.Lock()
+
+
+def get_geo_index() -> GeoIndex:
+    """Joriy indeks (kerak bo'lganda DB dan tuziladi)"""
+    index = _index['geo']
+    if index is None:
+        with _lock:
+            index = _index['geo']
+            if index is None:
+                index = GeoIndex(City.objects.values_list('iata_code', 'latitude', 'longitude'))
+                _index['geo'] = index
+                logger.info(f"Geo indeks tuzildi: {len(index.points)} ta shahar")
+    return index
+
+
+def invalidate_geo_index(**kwargs):
+    """Indeksni bekor qilish (City post_save / post_delete signali)"""
+    _index['geo'] = None
@@ -0,0 +1,171 @@
+"""
+Graph Search - Parvozlar grafida eng qisqa yo'l algoritmlari
+
+Graf formati: {origin: [(dest, price, duration, airline), ...]}
+Teskari graf xuddi shu formatda, lekin qirralar manzildan kelib chiqishga qarab:
+{dest: [(origin, price, duration, airline), ...]}
+"""
+
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Edge = Tuple[str, float, int, str]
+Graph = Dict[str, List[Edge]]
+
+INF = float('inf')
+
+
+def edge_price(edge: Edge) -> float:
+    """Qirra og'irligi - narx"""
+    return edge[1]
+
+
+def edge_duration(edge: Edge) -> float:
+    """
+    Qirra og'irligi - davomiylik + layover (2 soat)
+
+    Har bir oraliq to'xtashda layover qo'shiladi. Birinchi parvozda layover
+    yo'q, lekin har bir qirraga qo'shilgan doimiy qiymat yo'llar tartibini
+    o'zgartirmaydi.
+    """
+    return edge[2] + 120
+
+
+def build_reverse_graph(graph: Graph) -> Graph:
+    """Teskari grafni tuzish (har bir qirra yo'nalishi almashtiriladi)"""
+    reverse = {node: [] for node in graph}
+    for origin, edges in graph.items():
+        for dest, price, duration, airline in edges:
+            reverse.setdefault(dest, []).append((origin, price, duration, airline))
+    return reverse
+
+
+def bidirectional_dijkstra(
+    graph: Graph,
+    reverse_graph: Graph,
+    start: str,
+    end: str,
+    weight: Callable[[Edge], float] = edge_price,
+    excluded: Optional[Set[str]] = None
+) -> Optional[List[str]]:
+    """
+    Ikki tomonlama Dijkstra
+
+    Oldinga qidiruv start dan graph bo'yicha, orqaga qidiruv end dan
+    reverse_graph bo'yicha olib boriladi. Ikkala navbatning eng kichik
+    qiymatlari yig'indisi topilgan eng yaxshi yo'ldan oshganda to'xtaydi.
+    excluded - orqali o'tib bo'lmaydigan tugunlar (masalan, viza talab qilinadigan).
+    """
+    excluded = excluded or set()
+    if start == end:
+        return [start]
+
+    adjacency = (graph, reverse_graph)
+    dist = ({start: 0}, {end: 0})
+    parents = ({start: None}, {end: None})
+    heaps = ([(0, start)], [(0, end)])
+    settled = (set(), set())
+
+    best = INF
+    meeting = None
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+
+        # Kichikroq chegara tomonini kengaytirish
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        cost, current = heapq.heappop(heaps[side])
+        if current in settled[side]:
+            continue
+        settled[side].add(current)
+
+        other = 1 - side
+        for edge in adjacency[side].get(current, []):
+            neighbor = edge[0]
+            if neighbor in excluded:
+                continue
+            new_cost = cost + weight(edge)
+            if new_cost < dist[side].get(neighbor, INF):
+                dist[side][neighbor] = new_cost
+                parents[side][neighbor] = current
+                heapq.heappush(heaps[side], (new_cost, neighbor))
+
+            # Chegaralar uchrashdi
+            if neighbor in dist[other]:
+                total = dist[side][neighbor] + dist[other][neighbor]
+                if total < best:
+                    best = total
+                    meeting = neighbor
+
+    if meeting is None:
+        return None
+
+    # start -> meeting
+    path = []
+    node = meeting
+    while node is not None:
+        path.append(node)
+        node = parents[0][node]
+    path.reverse()
+
+    # meeting -> end
+    node = parents[1][meeting]
+    while node is not None:
+        path.append(node)
+        node = parents[1][node]
+
+    return path
+
+
+def dijkstra_tree(
+    graph: Graph,
+    sources: Iterable[str],
+    weight: Callable[[Edge], float] = edge_price,
+    excluded: Optional[Set[str]] = None
+) -> Tuple[Dict[str, float], Dict[str, Optional[str]]]:
+    """
+    Ko'p manbali Dijkstra - barcha tugunlargacha eng qisqa yo'llar daraxti
+
+    Teskari grafda ishlatilsa: dist[x] - x dan eng yaqin manbagacha narx,
+    parents[x] - shu yo'ldagi keyingi tugun (manbalarda None).
+    excluded tugunlar orqali o'tilmaydi.
+    """
+    excluded = excluded or set()
+    dist = {}
+    parents = {}
+    heap = []
+    for source in sources:
+        dist[source] = 0
+        parents[source] = None
+        heap.append((0, source))
+    heapq.heapify(heap)
+    settled = set()
+
+    while heap:
+        cost, current = heapq.heappop(heap)
+        if current in settled:
+            continue
+        settled.add(current)
+
+        for edge in graph.get(current, []):
+            neighbor = edge[0]
+            if neighbor in excluded:
+                continue
+            new_cost = cost + weight(edge)
+            if new_cost < dist.get(neighbor, INF):
+                dist[neighbor] = new_cost
+                parents[neighbor] = current
+                heapq.heappush(heap, (new_cost, neighbor))
+
+    return dist, parents
+
+
+def tree_path(parents: Dict[str, Optional[str]], node: str) -> Optional[List[str]]:
+    """Daraxtdan node -> manba yo'li"""
+    if node not in parents:
+        return None
+    path = [node]
+    while parents[path[-1]] is not None:
+        path.append(parents[path[-1]])
+    return path
@@ -0,0 +1,157 @@
+"""
+Meetup Search - Turli shaharlardan uchrashish joyini topish
+
+Guruh a'zolari bir nechta shahardan (masalan, Toshkent, Samarqand, Moskva)
+uchadi va bitta manzilda uchrashadi:
+1. Har bir boshlang'ich shahar uchun bitta one-to-all Dijkstra (umumiy graf)
+2. Natijalar [origin x manzil] jadvaliga yig'iladi
+3. Manzil o'qi bo'yicha ustunma-ustun reduksiya: jami/maksimal narx va
+   yetib kelish vaqtlari farqi (spread)
+
+N ta origin va M ta manzil uchun N x M alohida qidiruv o'rniga N ta qidiruv.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional
+from apps.destinations.models import City
+from services.graph_search import INF, Graph, dijkstra_tree, edge_duration, edge_price, tree_path
+from services.price_snapshot import build_flight_graph, get_snapshot
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVE_SUM = 'sum'   # Guruhning jami narxi
+OBJECTIVE_MAX = 'max'   # Eng qimmat yo'lovchi narxi (adolatli uchrashuv)
+
+
+class MeetupSearch:
+    """Bir nechta origin uchun umumiy uchrashish manzillarini topish"""
+
+    def __init__(
+        self,
+        origins: List[City],
+        travelers: Optional[List[int]] = None,
+        objective: str = OBJECTIVE_SUM,
+        graph: Optional[Graph] = None,
+        cities: Optional[Dict[str, City]] = None,
+    ):
+        if objective not in (OBJECTIVE_SUM, OBJECTIVE_MAX):
+            raise ValueError(f"Noma'lum maqsad: {objective}")
+
+        self.origins = [city.iata_code for city in origins]
+        self.travelers = travelers or [1] * len(origins)
+        self.objective = objective
+
+        # Graf snapshot dan (bo'lmasa DB dan)
+        if graph is None:
+            snapshot = get_snapshot()
+            if snapshot:
+                graph, cities = snapshot.graph, snapshot.cities
+            else:
+                graph, cities, _ = build_flight_graph()
+        self.graph = graph
+        self.cities = cities or {}
+
+    def search(self, limit: int = 10) -> Dict:
+        """Eng yaxshi uchrashish manzillari"""
+        started = time.perf_counter()
+
+        # Manzil o'qi - grafdagi barcha shaharlar (tartib qat'iy)
+        destinations = sorted(self.graph)
+
+        # Har bir origin uchun bitta qidiruv: narx, davomiylik va yo'l daraxti
+        cost_rows = []
+        duration_rows = []
+        trees = []
+        for origin in self.origins:
+            dist, parents = dijkstra_tree(self.graph, [origin], weight=edge_price)
+            durations = self._tree_durations(origin, parents)
+            cost_rows.append([dist.get(code, INF) for code in destinations])
+            duration_rows.append([durations.get(code, INF) for code in destinations])
+            trees.append(parents)
+
+        # Ustunlar bo'yicha reduksiya (manzil o'qi)
+        weighted = [
+            [cost * count for cost in row]
+            for row, count in zip(cost_rows, self.travelers)
+        ]
+        totals = list(map(sum, zip(*weighted)))
+        worst = list(map(max, zip(*cost_rows)))
+        latest = list(map(max, zip(*duration_rows)))
+        earliest = list(map(min, zip(*duration_rows)))
+
+        objective = totals if self.objective == OBJECTIVE_SUM else worst
+        candidates = [
+            index for index, value in enumerate(objective)
+            if value < INF and latest[index] < INF
+        ]
+        candidates.sort(key=lambda i: (objective[i], latest[i] - earliest[i], destinations[i]))
+
+        results = []
+        for index in candidates[:limit]:
+            code = destinations[index]
+            results.append({
+                'destination': code,
+                'destination_name': self._get_city_name(code),
+                'total_cost': float(totals[index]),
+                'max_cost': float(worst[index]),
+                'arrival_spread_minutes': int(latest[index] - earliest[index]),
+                'legs': [
+                    {
+                        'origin': origin,
+                        'path': list(reversed(tree_path(parents, code))),
+                        'price': float(cost_rows[row][index]),
+                        'duration': int(duration_rows[row][index]),
+                        'travelers': self.travelers[row],
+                    }
+                    for row, (origin, parents) in enumerate(zip(self.origins, trees))
+                ],
+            })
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Meetup: {len(self.origins)} origin x {len(destinations)} manzil, {elapsed_ms:.1f} ms")
+
+        return {
+            'objective': self.objective,
+            'origins': self.origins,
+            'destinations_checked': len(destinations),
+            'results': results,
+            'elapsed_ms': round(elapsed_ms, 2),
+        }
+
+    def _tree_durations(self, origin: str, parents: Dict[str, Optional[str]]) -> Dict[str, float]:
+        """Eng arzon yo'llar bo'yicha davomiylik (har bir oraliq to'xtash bilan)"""
+        # Har bir qirra uchun eng arzon parallel parvoz davomiyligi
+        edge_minutes = {}
+        for node, parent in parents.items():
+            if parent is None:
+                continue
+            edge = min(
+                (e for e in self.graph.get(parent, []) if e[0] == node),
+                key=lambda e: (e[1], e[2])
+            )
+            # Birinchi parvozda layover yo'q
+            edge_minutes[node] = edge_duration(edge) if parent != origin else edge[2]
+
+        durations = {origin: 0}
+
+        def resolve(node: str) -> float:
+            # Ota-onalar zanjiri bo'ylab yuqoriga chiqib, pastga qarab to'ldirish
+            chain = []
+            while node not in durations:
+                chain.append(node)
+                node = parents[node]
+            total = durations[node]
+            for item in reversed(chain):
+                total += edge_minutes[item]
+                durations[item] = total
+            return total
+
+        for node in parents:
+            resolve(node)
+        return durations
+
+    def _get_city_name(self, code: str) -> str:
+        """Shahar nomini olish"""
+        city = self.cities.get(code)
+        return city.name_uz if city else code
@@ -0,0 +1,281 @@
+"""
+Multi-City Planner - Bir nechta shaharni optimal tartibda aylanib chiqish
+
+Foydalanuvchi shaharlar to'plamini beradi (masalan, Dubay, Istanbul, Qohira),
+planner esa eng arzon tashrif tartibini va kechalar taqsimotini topadi:
+1. Juftlik parvoz narxlari matritsasi oldindan hisoblanadi (kunlar bo'yicha)
+2. Held-Karp dinamik dasturlash - holat: (tashrif to'plami, oxirgi shahar, kun)
+3. 8 tagacha shahar uchun aniq yechim - permutatsiyalarni sanab chiqmasdan
+"""
+
+import logging
+import operator
+import time
+from datetime import timedelta
+from typing import List, Dict, Optional, Tuple
+from apps.destinations.models import City
+from apps.search.models import TravelSearch
+from services.price_oracle import DatabaseOracle
+from services.route_optimizer import RouteOptimizer
+from services.price_snapshot import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Held-Karp 2^n holatlar bilan ishlaydi - shundan ortig'i sekinlashadi
+MAX_PLANNER_CITIES = 8
+
+INF = float('inf')
+
+
+class MultiCityPlanner:
+    """Held-Karp asosida ko'p shaharli sayohat rejalashtiruvchi"""
+
+    def __init__(
+        self,
+        origin: City,
+        cities: List[City],
+        departure_date,
+        total_nights: int,
+        travelers: int = 1,
+        hotel_stars: int = 3,
+        min_nights: int = 1,
+    ):
+        if not 1 <= len(cities) <= MAX_PLANNER_CITIES:
+            raise ValueError(f"Shaharlar soni 1 dan {MAX_PLANNER_CITIES} gacha bo'lishi kerak")
+        if total_nights < len(cities) * min_nights:
+            raise ValueError("Kechalar soni har bir shaharga yetarli emas")
+
+        self.origin = origin
+        self.cities = cities
+        self.departure_date = departure_date
+        self.total_nights = total_nights
+        self.travelers = travelers
+        self.hotel_stars = hotel_stars
+        self.min_nights = min_nights
+
+        # Narxlar optimizer orqali olinadi (graf, DB, fallback zanjiri)
+        search = TravelSearch(
+            origin=origin,
+            destination=cities[0],
+            departure_date=departure_date,
+            return_date=departure_date + timedelta(days=total_nights),
+            travelers=travelers,
+            hotel_stars=hotel_stars,
+        )
+        self.optimizer = RouteOptimizer(search, snapshot=get_snapshot())
+
+        # 0-indeks - boshlang'ich shahar
+        self.codes = [origin.iata_code] + [c.iata_code for c in cities]
+        self._memo = {}
+
+    def plan(self) -> Optional[Dict]:
+        """Eng arzon tashrif tartibini topish"""
+        started = time.perf_counter()
+
+        self._build_leg_matrix()
+        self._build_hotel_rates()
+        self._solve()
+
+        order = self._reconstruct()
+        if order is None:
+            return None
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        states = len(self._memo) * (self.total_nights + 1)
+        logger.info(f"Held-Karp: {states} holat, {elapsed_ms:.1f} ms")
+
+        return self._build_variant(order, {
+            'type': 'held_karp',
+            'algorithm': 'held_karp',
+            'states': states,
+            'elapsed_ms': round(elapsed_ms, 2),
+        })
+
+    def _build_leg_matrix(self):
+        """Juftlik parvoz narxlari matritsasi: legs[i][j][kun]"""
+        size = len(self.codes)
+        days = self.total_nights + 1
+
+        # Aniq sanalar bo'yicha eng arzon parvozlar - bitta so'rov
+        day_dates = [self.departure_date + timedelta(days=day) for day in range(days)]
+        exact = DatabaseOracle()
+        exact.prefetch(self.codes, day_dates)
+
+        self.legs = [[None] * size for _ in range(size)]
+        self.leg_info = {}
+        for i, origin in enumerate(self.codes):
+            for j, dest in enumerate(self.codes):
+                if i == j:
+                    continue
+                # Sana topilmasa - optimizer zanjiri (graf, o'rtacha, fallback)
+                base = self.optimizer._get_flight_info(origin, dest, self.departure_date)
+                # Har kun uchun narx, aviakompaniya, davomiylik va manba bitta natijadan
+                infos = [exact.flight(origin, dest, day_date) or base for day_date in day_dates]
+                self.leg_info[(i, j)] = infos
+                self.legs[i][j] = [info['price'] for info in infos]
+
+    def _build_hotel_rates(self):
+        """Har bir shahar uchun bir kechalik narx"""
+        self.hotel_rates = [0.0] + [
+            float(self.optimizer._get_hotel_cost(code, 1)) for code in self.codes[1:]
+        ]
+
+    def _solve(self):
+        """
+        Held-Karp jadvalini to'ldirish
+
+        self._memo[(mask, last)][day] - mask shaharlarini ko'rib, last shahridan
+        day-kuni jo'nab ketishgacha bo'lgan minimal narx.
+        """
+        count = len(self.cities)
+        days = self.total_nights + 1
+        min_nights = self.min_nights
+        legs = [
+            [[price * self.travelers for price in row] if row else None for row in line]
+            for line in self.legs
+        ]
+        self._legs_total = legs
+        memo = {}
+
+        # mask|bit > mask - son tartibida to'plamlar kichigidan boshlab ishlanadi
+        for mask in range(1, 1 << count):
+            members = [i + 1 for i in range(count) if mask & (1 << i)]
+            for city in members:
+                previous = mask ^ (1 << (city - 1))
+
+                # Shaharga kelish kuni bo'yicha minimal narx
+                if previous == 0:
+                    arrive = [legs[0][city][0]] + [INF] * (days - 1)
+                else:
+                    rows = [
+                        list(map(operator.add, memo[(previous, last)], legs[last][city]))
+                        for last in members if last != city
+                    ]
+                    arrive = list(map(min, *rows)) if len(rows) > 1 else rows[0]
+
+                # Kamida min_nights qolish, har bir qo'shimcha kecha - rate
+                rate = self.hotel_rates[city]
+                depart = [INF] * days
+                for day in range(min_nights, days):
+                    best = arrive[day - min_nights] + rate * min_nights
+                    stay_longer = depart[day - 1] + rate
+                    depart[day] = stay_longer if stay_longer < best else best
+                memo[(mask, city)] = depart
+
+        self._memo = memo
+
+    def _reconstruct(self) -> Optional[List[Tuple[int, int, int]]]:
+        """Jadvaldan tartibni tiklash: [(shahar, kechalar, kelish kuni), ...]"""
+        legs = self._legs_total
+        last_day = self.total_nights
+        mask = (1 << len(self.cities)) - 1
+
+        # Uyga qaytish bilan eng yaxshi oxirgi shahar
+        best, city = INF, None
+        for last in range(1, len(self.codes)):
+            cost = self._memo[(mask, last)][last_day] + legs[last][0][last_day]
+            if cost < best:
+                best, city = cost, last
+        if city is None:
+            return None
+
+        order = []
+        day = last_day
+        while True:
+            depart = self._memo[(mask, city)]
+            rate = self.hotel_rates[city]
+
+            # Qancha kecha qolinganini aniqlash - jadval qiymatlari aynan takrorlanadi
+            arrival = day
+            while arrival - 1 >= self.min_nights and depart[arrival] == depart[arrival - 1] + rate:
+                arrival -= 1
+            arrival_cost = depart[arrival] - rate * self.min_nights
+            arrival -= self.min_nights
+            order.append((city, day - arrival, arrival))
+
+            previous = mask ^ (1 << (city - 1))
+            if previous == 0:
+                break
+
+            # Qaysi shahardan kelinganini topish
+            candidates = [last for last in range(1, len(self.codes)) if previous & (1 << (last - 1))]
+            city = min(
+                candidates,
+                key=lambda last: abs(self._memo[(previous, last)][arrival] + legs[last][city][arrival] - arrival_cost)
+            )
+            mask, day = previous, arrival
+
+        order.reverse()
+        return order
+
+    def _build_variant(self, order: List[Tuple[int, int, int]], optimization: Dict) -> Dict:
+        """Tartibdan variant yaratish"""
+        segments = []
+        hotels = []
+        total_flight = 0
+        total_hotel = 0
+        total_duration = 0
+
+        previous = 0
+        for position, (city, nights, day) in enumerate(order):
+            segments.append(self._segment(previous, city, day, 'outbound' if position == 0 else 'transit'))
+            rate = self.hotel_rates[city]
+            hotels.append({
+                'city': self.codes[city],
+                'city_name': self.optimizer._get_city_name(self.codes[city]),
+                'nights': nights,
+                'price_per_night': rate,
+                'total_price': rate * nights,
+                'stars': self.hotel_stars
+            })
+            total_hotel += rate * nights
+            previous = city
+
+        segments.append(self._segment(previous, 0, self.total_nights, 'inbound'))
+
+        for segment in segments:
+            total_flight += segment['price']
+            total_duration += segment['duration']
+
+        total_flight *= self.travelers
+        sequence = [self.codes[0]] + [self.codes[city] for city, _, _ in order]
+        countries = {self.origin.country_id} | {self.cities[city - 1].country_id for city, _, _ in order}
+        names = [self.optimizer._get_city_name(code) for code in sequence[1:]]
+
+        return {
+            'route_type': 'multi',
+            'cities_sequence': sequence,
+            'total_flight_cost': float(total_flight),
+            'total_hotel_cost': float(total_hotel),
+            'total_cost': float(total_flight + total_hotel),
+            'total_duration': total_duration,
+            'stops': len(order) - 1,
+            'savings_percent': 0,
+            'savings_amount': 0,
+            'is_recommended': True,
+            'score': 0,
+            'details': {
+                'segments': segments,
+                'hotels': hotels,
+                'optimization': optimization,
+                'countries_count': len(countries),
+                'bonus': f"{len(countries)} ta mamlakatni ko'rasiz! {', '.join(names)} bo'ylab sayohat."
+            }
+        }
+
+    def _segment(self, i: int, j: int, day: int, segment_type: str) -> Dict:
+        """Matritsadan segment yaratish"""
+        info = self.leg_info[(i, j)][day]
+        return {
+            'from': self.codes[i],
+            'from_name': self.optimizer._get_city_name(self.codes[i]),
+            'to': self.codes[j],
+            'to_name': self.optimizer._get_city_name(self.codes[j]),
+            'price': info['price'],
+            'airline': info['airline'],
+            'duration': info['duration'],
+            'date': str(self.departure_date + timedelta(days=day)),
+            'type': segment_type,
+            'data_source': info.get('data_source', 'unknown'),
+            'link': info.get('link', ''),
+        }
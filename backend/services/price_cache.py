@@ -0,0 +1,391 @@
+"""
+Price Cache - Tashqi narxlar uchun ikki bosqichli kesh
+
+1. Protsess ichidagi kichik LRU (har bir namespace uchun chegaralangan)
+2. Umumiy kesh - settings.CACHES['shared'] (REDIS_URL berilsa Redis, aks holda LocMem)
+
+Har bir yozuv ikki muddatga ega (stale-while-revalidate):
+- soft (ttl) - shu vaqtgacha yozuv yangi
+- hard (ttl + stale_ttl) - shu vaqtgacha eskirgan qiymat darhol qaytariladi,
+  fonda esa kalit bo'yicha bitta yangilash ishga tushadi
+
+compact namespace lar (parvoz/mehmonxona ro'yxatlari) ikkala bosqichda ham
+services/cache_codec.py formatida (ustunli, katta bo'lsa siqilgan) saqlanadi.
+
+Lokal nusxa umumiy keshdan qisqaroq yashaydi, shuning uchun boshqa worker
+yangilagan narx tez orada ko'rinadi. Umumiy kesh ishlamasa (Redis o'chgan) -
+faqat lokal bosqich ishlaydi, so'rov yiqilmaydi.
+
+Masalan:
+    price_cache.get_or_refresh('flights', key, lambda: fetch(...), cache_if=bool)
+    price_cache.get('flights', key)
+    price_cache.stats()  # {'flights': {'local_hits': .., 'stale_hits': .., 'misses': ..}}
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.db import connections
+from services.cache_codec import CacheCodecError, decode, encode, is_encoded
+from services.single_flight import NOT_FOUND, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = 'shared'
+KEY_PREFIX = 'price'
+
+# Fon yangilashlari uchun oqimlar soni
+REFRESH_WORKERS = 4
+
+# Boshqa protsess yangilayotgan kalitni qayta yangilamaslik uchun qulf muddati
+REFRESH_LOCK_TTL = 60
+
+
+@dataclass(frozen=True)
+class CacheNamespace:
+    """Namespace sozlamalari (sekundlarda)"""
+    ttl: int
+    local_ttl: int = 60
+    local_size: int = 256
+    # soft muddatdan keyin eskirgan qiymat qaytariladigan oraliq (0 - o'chirilgan)
+    stale_ttl: int = 0
+    # Qiymat cache_codec bilan ixcham saqlanadi (lug'atlar ro'yxati uchun)
+    compact: bool = False
+
+
+NAMESPACES = {
+    # Aviasales qidiruv natijalari - real vaqt uchun 5 daqiqa, keyin 30 daqiqa eskirgan holda
+    'flights': CacheNamespace(ttl=300, local_ttl=60, local_size=512, stale_ttl=1800, compact=True),
+    # Oylik narxlar kalendari
+    'calendar': CacheNamespace(ttl=3600, local_ttl=300, local_size=128, stale_ttl=6 * 3600, compact=True),
+    # Booking.com mehmonxonalari
+    'hotels': CacheNamespace(ttl=3600, local_ttl=300, local_size=256, stale_ttl=6 * 3600, compact=True),
+    # Kalendardan yoyilgan kunlik eng arzon narxlar ('TAS:IST:2025-03-15' -> {'price', 'airline', ..})
+    'flight_day': CacheNamespace(ttl=3600, local_ttl=300, local_size=4096, stale_ttl=6 * 3600),
+    # Yo'nalish bo'yicha o'rtacha narx (FlightPrice dan)
+    'flight_avg': CacheNamespace(ttl=3600, local_ttl=600, local_size=1024),
+    # Booking.com shahar ID lari - deyarli o'zgarmaydi
+    'booking_dest': CacheNamespace(ttl=30 * 86400, local_ttl=86400, local_size=512),
+}
+
+_MISSING = object()
+
+
+class PriceCache:
+    """Lokal LRU + umumiy kesh"""
+
+    def __init__(self, namespaces: Dict[str, CacheNamespace] = None, alias: str = SHARED_CACHE_ALIAS):
+        self.namespaces = namespaces or NAMESPACES
+        self.alias = alias
+        # namespace -> OrderedDict[key] = (lokal muddat, soft muddat, baytlar - _dump())
+        self._local = {name: OrderedDict() for name in self.namespaces}
+        self._counters = {
+            name: {
+                'local_hits': 0, 'shared_hits': 0, 'stale_hits': 0, 'misses': 0,
+                'sets': 0, 'refreshes': 0, 'shared_errors': 0,
+            }
+            for name in self.namespaces
+        }
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+        # Keshda yo'q kalitlar uchun bitta yuklash (protsess ichida va protsesslar o'rtasida)
+        self.single_flight = SingleFlight(lambda: self.shared)
+
+    @property
+    def shared(self):
+        """Umumiy kesh (sozlanmagan bo'lsa default)"""
+        try:
+            return caches[self.alias]
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def _shared_key(self, namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    def _count(self, namespace: str, counter: str):
+        with self._lock:
+            self._counters[namespace][counter] += 1
+
+    def _lookup(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """(qiymat, soft muddat) yoki None - avval lokal LRU, so'ng umumiy kesh"""
+        config = self.namespaces[namespace]
+        local = self._local[namespace]
+        now = time.time()
+
+        stale = None
+        with self._lock:
+            entry = local.get(key)
+            if entry is not None:
+                local_expiry, soft, payload = entry
+                if local_expiry <= now:
+                    del local[key]
+                elif soft > now:
+                    local.move_to_end(key)
+                    self._counters[namespace]['local_hits'] += 1
+                    # Nusxa qaytariladi - chaqiruvchi o'zgartirsa kesh buzilmaydi
+                    return self._load(namespace, payload), soft
+                else:
+                    # Eskirgan - umumiy keshda boshqa worker yangilagan bo'lishi mumkin
+                    stale = (soft, payload)
+
+        try:
+            envelope = self.shared.get(self._shared_key(namespace, key), _MISSING)
+        except Exception as e:
+            self._count(namespace, 'shared_errors')
+            logger.warning(f"Umumiy kesh xatosi ({namespace}): {e}")
+            envelope = _MISSING
+
+        if envelope is not _MISSING and (stale is None or envelope[0] > stale[0]):
+            soft, stored = envelope
+            try:
+                value, payload = self._from_shared(namespace, stored)
+            except CacheCodecError as e:
+                self._count(namespace, 'shared_errors')
+                logger.warning(f"Umumiy keshdagi yozuvni o'qib bo'lmadi ({namespace}): {e}")
+            else:
+                self._count(namespace, 'shared_hits')
+                self._set_local(namespace, key, payload, soft, soft + config.stale_ttl)
+                return value, soft
+
+        if stale is not None:
+            self._count(namespace, 'local_hits')
+            return self._load(namespace, stale[1]), stale[0]
+
+        self._count(namespace, 'misses')
+        return None
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Qiymat (eskirgan bo'lsa ham, hard muddatgacha)"""
+        found = self._lookup(namespace, key)
+        return found[0] if found else default
+
+    def get_or_refresh(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[int] = None,
+        cache_if: Callable[[Any], bool] = lambda value: value is not None
+    ) -> Any:
+        """
+        Yangi qiymat - darhol; eskirgan - darhol, fonda bitta yangilash bilan;
+        yo'q bo'lsa - loader kalit bo'yicha bir marta chaqiriladi (cache_if rost bo'lsa keshga yoziladi),
+        parallel chaqiruvchilar uning natijasini kutadi
+        """
+        found = self._lookup(namespace, key)
+        if found is not None:
+            value, soft = found
+            if soft <= time.time():
+                self._count(namespace, 'stale_hits')
+                self._schedule_refresh(namespace, key, loader, ttl, cache_if)
+            return value
+
+        def load():
+            value = loader()
+            # Qulf bo'shashidan oldin yoziladi - kutayotgan protsesslar shu qiymatni oladi
+            if cache_if(value):
+                self.set(namespace, key, value, ttl)
+            return value
+
+        return self.single_flight.do(
+            self._shared_key(namespace, key), load, peek=lambda: self._peek_shared(namespace, key)
+        )
+
+    async def aget_or_refresh(
+        self,
+        namespace: str,
+        key: str,
+        aloader: Callable[[], Awaitable[Any]],
+        loader: Callable[[], Any],
+        ttl: Optional[int] = None,
+        cache_if: Callable[[Any], bool] = lambda value: value is not None
+    ) -> Any:
+        """
+        get_or_refresh() ning async varianti: yo'q bo'lsa aloader() kutiladi,
+        eskirgan qiymatni fonda yangilash esa sinxron loader() bilan (REFRESH_WORKERS oqimlarida)
+        """
+        found = await sync_to_async(self._lookup, thread_sensitive=False)(namespace, key)
+        if found is not None:
+            value, soft = found
+            if soft <= time.time():
+                self._count(namespace, 'stale_hits')
+                await sync_to_async(self._schedule_refresh, thread_sensitive=False)(namespace, key, loader, ttl, cache_if)
+            return value
+
+        async def load():
+            value = await aloader()
+            if cache_if(value):
+                await sync_to_async(self.set, thread_sensitive=False)(namespace, key, value, ttl)
+            return value
+
+        return await self.single_flight.ado(
+            self._shared_key(namespace, key), load, peek=lambda: self._peek_shared(namespace, key)
+        )
+
+    def _peek_shared(self, namespace: str, key: str) -> Any:
+        """Boshqa protsess yozgan qiymat (yo'q bo'lsa NOT_FOUND)"""
+        envelope = self.shared.get(self._shared_key(namespace, key), _MISSING)
+        if envelope is _MISSING:
+            return NOT_FOUND
+        soft, stored = envelope
+        try:
+            value, payload = self._from_shared(namespace, stored)
+        except CacheCodecError:
+            return NOT_FOUND
+        self._set_local(namespace, key, payload, soft, soft + self.namespaces[namespace].stale_ttl)
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        """Ikkala bosqichga yozish"""
+        config = self.namespaces[namespace]
+        ttl = ttl or config.ttl
+        soft = time.time() + ttl
+        self._count(namespace, 'sets')
+        payload = self._dump(namespace, value)
+        self._set_local(namespace, key, payload, soft, soft + config.stale_ttl)
+
+        try:
+            self.shared.set(
+                self._shared_key(namespace, key), (soft, self._to_shared(namespace, value, payload)), ttl + config.stale_ttl
+            )
+        except Exception as e:
+            self._count(namespace, 'shared_errors')
+            logger.warning(f"Umumiy keshga yozishda xato ({namespace}): {e}")
+
+    def set_many(self, namespace: str, items: Dict[str, Any], ttl: Optional[int] = None):
+        """Bir nechta yozuv - umumiy keshga bitta so'rov bilan"""
+        if not items:
+            return
+        config = self.namespaces[namespace]
+        ttl = ttl or config.ttl
+        soft = time.time() + ttl
+        with self._lock:
+            self._counters[namespace]['sets'] += len(items)
+        shared_items = {}
+        for key, value in items.items():
+            payload = self._dump(namespace, value)
+            self._set_local(namespace, key, payload, soft, soft + config.stale_ttl)
+            shared_items[self._shared_key(namespace, key)] = (soft, self._to_shared(namespace, value, payload))
+
+        try:
+            self.shared.set_many(shared_items, ttl + config.stale_ttl)
+        except Exception as e:
+            self._count(namespace, 'shared_errors')
+            logger.warning(f"Umumiy keshga yozishda xato ({namespace}): {e}")
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._local[namespace].pop(key, None)
+        try:
+            self.shared.delete(self._shared_key(namespace, key))
+        except Exception as e:
+            logger.warning(f"Umumiy keshdan o'chirishda xato ({namespace}): {e}")
+
+    def _dump(self, namespace: str, value: Any) -> bytes:
+        """Lokal keshdagi ko'rinish (compact bo'lsa - umumiy keshdagi ham)"""
+        if self.namespaces[namespace].compact:
+            return encode(value)
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, namespace: str, payload: bytes) -> Any:
+        if self.namespaces[namespace].compact:
+            return decode(payload)
+        return pickle.loads(payload)
+
+    def _to_shared(self, namespace: str, value: Any, payload: bytes) -> Any:
+        return payload if self.namespaces[namespace].compact else value
+
+    def _from_shared(self, namespace: str, stored: Any) -> Tuple[Any, bytes]:
+        """Umumiy keshdagi qiymat -> (qiymat, lokal baytlar); kodeksiz eski yozuvlar ham o'qiladi"""
+        if self.namespaces[namespace].compact and is_encoded(stored):
+            return decode(stored), stored
+        return stored, self._dump(namespace, stored)
+
+    def _set_local(self, namespace: str, key: str, payload: bytes, soft: float, hard: float):
+        config = self.namespaces[namespace]
+        local = self._local[namespace]
+        local_expiry = min(time.time() + config.local_ttl, hard)
+        with self._lock:
+            local[key] = (local_expiry, soft, payload)
+            local.move_to_end(key)
+            # Chegaradan oshsa eng eski yozuvlar chiqariladi
+            while len(local) > config.local_size:
+                local.popitem(last=False)
+
+    def _schedule_refresh(self, namespace: str, key: str, loader: Callable, ttl: Optional[int], cache_if: Callable):
+        """Kalit bo'yicha bitta fon yangilashi (protsess ichida set, protsesslar o'rtasida cache.add qulfi)"""
+        with self._lock:
+            if (namespace, key) in self._refreshing:
+                return
+            self._refreshing.add((namespace, key))
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='price-refresh')
+
+        lock_key = self._shared_key(namespace, f"{key}:refresh")
+        try:
+            acquired = self.shared.add(lock_key, 1, REFRESH_LOCK_TTL)
+        except Exception as e:
+            logger.warning(f"Yangilash qulfini olishda xato ({namespace}): {e}")
+            acquired, lock_key = True, None
+
+        if not acquired:
+            # Boshqa protsess yangilamoqda
+            with self._lock:
+                self._refreshing.discard((namespace, key))
+            return
+
+        self._count(namespace, 'refreshes')
+        self._executor.submit(self._refresh, namespace, key, loader, ttl, cache_if, lock_key)
+
+    def _refresh(self, namespace: str, key: str, loader: Callable, ttl: Optional[int], cache_if: Callable, lock_key: Optional[str]):
+        try:
+            value = loader()
+            # Yangilash muvaffaqiyatsiz bo'lsa eskirgan qiymat hard muddatgacha qoladi
+            if cache_if(value):
+                self.set(namespace, key, value, ttl)
+        except Exception as e:
+            logger.warning(f"Fon yangilashda xato ({namespace}:{key}): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((namespace, key))
+            if lock_key:
+                try:
+                    self.shared.delete(lock_key)
+                except Exception:
+                    pass
+            # Oqim ochgan DB ulanishlari yopiladi
+            connections.close_all()
+
+    def clear_local(self):
+        """Lokal bosqichni tozalash (testlar va sozlamalar o'zgarganda)"""
+        with self._lock:
+            for local in self._local.values():
+                local.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Namespace lar bo'yicha hit/miss hisoblagichlari (shu protsess uchun)"""
+        result = {}
+        with self._lock:
+            for name, counters in self._counters.items():
+                hits = counters['local_hits'] + counters['shared_hits']
+                lookups = hits + counters['misses']
+                result[name] = {
+                    **counters,
+                    'local_size': len(self._local[name]),
+                    'local_bytes': sum(len(entry[2]) for entry in self._local[name].values()),
+                    'hit_rate': round(hits / lookups, 3) if lookups else None,
+                }
+        return result
+
+
+# Protsess bo'yicha yagona instans
+price_cache = PriceCache()
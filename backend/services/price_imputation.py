@@ -0,0 +1,183 @@
+"""
+Price Imputation - Ma'lumot yo'q sanalar uchun taxminiy narxlar jadvali
+
+Oflayn bosqich (fit):
+1. Har bir yo'nalish uchun bazaviy narx (tarixiy o'rtacha)
+2. Hafta kuni koeffitsientlari (dushanba..yakshanba)
+3. Uchishgacha qolgan kunlar koeffitsientlari (LEAD_BUCKETS oraliqlari)
+Kam ma'lumotli yo'nalishlarda koeffitsientlar umumiy egri chiziqqa tortiladi.
+
+So'rov (estimate): xotiradagi jadvaldan O(1), DB so'rovisiz.
+Tayyorlash: python manage.py build_price_imputation
+"""
+
+import json
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from django.conf import settings
+from apps.pricing.models import FlightPrice
+
+logger = logging.getLogger(__name__)
+
+IMPUTATION_VERSION = 1
+
+# Uchishgacha qolgan kunlar oraliqlari: [0-7), [7-14), [14-30), [30-60), [60-90), [90+)
+LEAD_BUCKETS = (7, 14, 30, 60, 90)
+
+# Koeffitsientni umumiy egri chiziqqa tortish kuchi (kuzatuvlar soni)
+SHRINKAGE = 5
+
+
+def lead_bucket(days: int) -> int:
+    """Qolgan kunlar soni -> oraliq indeksi"""
+    for index, limit in enumerate(LEAD_BUCKETS):
+        if days < limit:
+            return index
+    return len(LEAD_BUCKETS)
+
+
+def _factors(sums: Dict[int, float], counts: Dict[int, int], size: int, prior: List[float]) -> List[float]:
+    """O'rtacha nisbatlar -> prior ga tortilgan koeffitsientlar"""
+    return [
+        round((sums.get(i, 0) + SHRINKAGE * prior[i]) / (counts.get(i, 0) + SHRINKAGE), 4)
+        for i in range(size)
+    ]
+
+
+def fit_imputation_table(min_samples: int = 3) -> Dict:
+    """Tarixiy FlightPrice yozuvlaridan jadval tuzish"""
+    rows = defaultdict(list)
+    flights = FlightPrice.objects.values_list(
+        'origin__iata_code', 'destination__iata_code', 'price_usd',
+        'flight_duration_minutes', 'airline', 'departure_date', 'created_at'
+    )
+    for origin, dest, price, duration, airline, departure, created in flights.iterator():
+        lead = max(0, (departure - created.date()).days) if created else None
+        rows[f"{origin}-{dest}"].append((float(price), duration, airline, departure.weekday(), lead))
+
+    # Bazaviy narxlar
+    bases = {key: sum(r[0] for r in items) / len(items) for key, items in rows.items()}
+
+    # Umumiy egri chiziqlar (barcha yo'nalishlar, bazaga nisbatan)
+    dow_sums, dow_counts = defaultdict(float), defaultdict(int)
+    lead_sums, lead_counts = defaultdict(float), defaultdict(int)
+    for key, items in rows.items():
+        for price, _, _, weekday, lead in items:
+            ratio = price / bases[key]
+            dow_sums[weekday] += ratio
+            dow_counts[weekday] += 1
+            if lead is not None:
+                bucket = lead_bucket(lead)
+                lead_sums[bucket] += ratio
+                lead_counts[bucket] += 1
+
+    lead_size = len(LEAD_BUCKETS) + 1
+    global_dow = _factors(dow_sums, dow_counts, 7, [1.0] * 7)
+    global_lead = _factors(lead_sums, lead_counts, lead_size, [1.0] * lead_size)
+
+    routes = {}
+    for key, items in rows.items():
+        if len(items) < min_samples:
+            continue
+        base = bases[key]
+        dow_sums, dow_counts = defaultdict(float), defaultdict(int)
+        lead_sums, lead_counts = defaultdict(float), defaultdict(int)
+        for price, _, _, weekday, lead in items:
+            dow_sums[weekday] += price / base
+            dow_counts[weekday] += 1
+            if lead is not None:
+                bucket = lead_bucket(lead)
+                lead_sums[bucket] += price / base
+                lead_counts[bucket] += 1
+
+        durations = [r[1] for r in items if r[1]]
+        routes[key] = {
+            'base': round(base, 2),
+            'duration': int(sum(durations) / len(durations)) if durations else 240,
+            'airline': Counter(r[2] for r in items).most_common(1)[0][0],
+            'samples': len(items),
+            'dow': _factors(dow_sums, dow_counts, 7, global_dow),
+            'lead': _factors(lead_sums, lead_counts, lead_size, global_lead),
+        }
+
+    return {
+        'version': IMPUTATION_VERSION,
+        'built_at': datetime.now().isoformat(),
+        'lead_buckets': list(LEAD_BUCKETS),
+        'global': {'dow': global_dow, 'lead': global_lead},
+        'routes': routes,
+    }
+
+
+class PriceImputation:
+    """Xotiradagi taxminiy narxlar jadvali"""
+
+    def __init__(self, table: Dict):
+        self.routes = table.get('routes', {})
+        self.global_dow = table.get('global', {}).get('dow', [1.0] * 7)
+        self.global_lead = table.get('global', {}).get('lead', [1.0] * (len(LEAD_BUCKETS) + 1))
+
+    def estimate(self, origin: str, dest: str, departure_date: date, today: Optional[date] = None) -> Optional[Dict]:
+        """Yo'nalish va sana uchun taxminiy narx (jadvalda bo'lmasa None)"""
+        route = self.routes.get(f"{origin}-{dest}") or self.routes.get(f"{dest}-{origin}")
+        if not route:
+            return None
+
+        today = today or date.today()
+        lead = lead_bucket(max(0, (departure_date - today).days))
+        price = route['base'] * route['dow'][departure_date.weekday()] * route['lead'][lead]
+        return {
+            'price': round(price, 2),
+            'airline': route['airline'],
+            'duration': route['duration'],
+            'data_source': 'imputed',
+        }
+
+
+def save_imputation_table(table: Dict, path: Optional[str] = None) -> str:
+    """Jadvalni JSON faylga yozish (atomik almashtirish)"""
+    path = str(path or settings.PRICE_IMPUTATION_PATH)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(table, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return path
+
+
+# Jarayon ichidagi jadval (fayl o'zgarganda qayta yuklanadi)
+_loaded = {'mtime': None, 'imputation': None}
+
+
+def get_imputation() -> Optional[PriceImputation]:
+    """Joriy jadval (fayl mtime bo'yicha keshlangan)"""
+    path = settings.PRICE_IMPUTATION_PATH
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    if _loaded['mtime'] != mtime:
+        try:
+            with open(path) as f:
+                table = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Imputatsiya jadvalini yuklashda xato: {e}")
+            table = None
+        if table and table.get('version') != IMPUTATION_VERSION:
+            logger.warning("Imputatsiya jadvali versiyasi mos emas, qayta tayyorlang")
+            table = None
+        _loaded['imputation'] = PriceImputation(table) if table else None
+        _loaded['mtime'] = mtime
+    return _loaded['imputation']
+
+
+def impute_flight_price(origin: str, dest: str, departure_date: date) -> Optional[Dict]:
+    """Taxminiy narx (jadval bo'lmasa yoki yo'nalish topilmasa None)"""
+    imputation = get_imputation()
+    if imputation is None:
+        return None
+    return imputation.estimate(origin, dest, departure_date)
@@ -0,0 +1,380 @@
+"""
+Price Oracle - Narxlar manbalari uchun yagona interfeys
+
+RouteFinder va RouteOptimizer parvoz va mehmonxona narxlarini shu interfeys
+orqali oladi. Manbalar birlashtiriladi:
+1. SnapshotOracle - xotiradagi graf (eng tez)
+2. DatabaseOracle - FlightPrice / HotelPrice (aniq sana, set-based prefetch)
+3. LiveOracle - Travelpayouts API
+4. ImputedOracle / AverageOracle / FallbackOracle - taxminiy narxlar
+5. ChainOracle - birinchi javob bergan manba, CachedOracle - so'rov ichidagi kesh
+
+Masalan:
+    oracle = CachedOracle(ChainOracle([SnapshotOracle(graph), DatabaseOracle(), FallbackOracle()]))
+    oracle.flight('TAS', 'IST', date(2026, 11, 2))
+"""
+
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db.models import Avg, Min
+from apps.pricing.models import FlightPrice, HotelPrice
+from services.external_apis import travelpayouts_api
+from services.price_cache import price_cache
+from services.price_imputation import impute_flight_price
+from services.price_writer import DEFAULT_DURATION_MINUTES
+
+logger = logging.getLogger(__name__)
+
+# Taxminiy mehmonxona narxlari (hostel va mehmonxona turlari bo'yicha)
+FALLBACK_HOTEL_PRICES = {
+    'IST': {1: 15, 2: 30, 3: 55, 4: 95, 5: 180},
+    'DXB': {1: 20, 2: 35, 3: 45, 4: 85, 5: 200},
+    'DOH': {1: 25, 2: 40, 3: 60, 4: 110, 5: 200},
+    'BKK': {1: 8, 2: 15, 3: 25, 4: 65, 5: 150},
+    'KUL': {1: 10, 2: 20, 3: 35, 4: 80, 5: 150},
+    'SIN': {1: 25, 2: 45, 3: 70, 4: 150, 5: 300},
+    'CAI': {1: 10, 2: 20, 3: 35, 4: 90, 5: 180},
+    'TAS': {1: 12, 2: 25, 3: 40, 4: 70, 5: 120},
+}
+DEFAULT_HOTEL_PRICES = {1: 15, 2: 30, 3: 50, 4: 100, 5: 200}
+
+# Standart yo'nalish narxlari (ikki tomonga ham amal qiladi)
+BASE_ROUTE_PRICES = {
+    ('TAS', 'IST'): 250,
+    ('TAS', 'DXB'): 200,
+    ('TAS', 'DOH'): 220,
+    ('DXB', 'IST'): 150,
+    ('DOH', 'IST'): 160,
+}
+
+DEFAULT_FLIGHT_PRICE = 200
+
+
+class PriceOracle:
+    """Narxlar manbai interfeysi (topilmasa None qaytaradi)"""
+
+    name = 'base'
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        """Eng arzon parvoz: {'price', 'airline', 'duration', 'data_source', ...}"""
+        return None
+
+    def hotel_night(self, city_code: str, stars: int) -> Optional[Decimal]:
+        """Eng arzon kecha narxi (stars va undan yuqori)"""
+        return None
+
+    def hotel_nights(self, city_codes: Iterable[str], stars: int) -> Dict[str, Decimal]:
+        """Bir nechta shahar uchun kecha narxlari (topilganlari)"""
+        rates = {}
+        for code in city_codes:
+            rate = self.hotel_night(code, stars)
+            if rate is not None:
+                rates[code] = rate
+        return rates
+
+    def prefetch(self, codes: Iterable[str], dates: Iterable[date] = (), stars: Optional[int] = None):
+        """Narxlarni oldindan olish (set-based manbalar uchun, aks holda hech narsa qilmaydi)"""
+
+
+class SnapshotOracle(PriceOracle):
+    """Xotiradagi graf: bir nechta qirra bo'lsa eng arzoni (sanasiz)"""
+
+    name = 'snapshot'
+
+    def __init__(self, graph: Dict[str, List[Tuple]]):
+        self.graph = graph
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        edges = [edge for edge in self.graph.get(origin, []) if edge[0] == dest]
+        if not edges:
+            return None
+        _, price, duration, airline = min(edges, key=lambda edge: (edge[1], edge[2]))
+        return {'price': price, 'airline': airline, 'duration': duration, 'data_source': 'graph_cache'}
+
+
+class DatabaseOracle(PriceOracle):
+    """Lokal baza: aniq sanadagi eng arzon parvoz va eng arzon mehmonxona"""
+
+    name = 'database'
+
+    def __init__(self):
+        # Oldindan olingan narxlar va ular qamragan to'plamlar
+        self._flights = {}
+        self._flight_scope = None
+        self._hotels = {}
+        self._hotel_scope = None
+
+    def prefetch(self, codes: Iterable[str], dates: Iterable[date] = (), stars: Optional[int] = None):
+        """Barcha (qayerdan, qayerga, sana) kombinatsiyalari - bitta so'rov, mehmonxonalar - bitta so'rov"""
+        codes, dates = set(codes), set(dates)
+
+        if dates:
+            # Narx bo'yicha tartiblangan - birinchisi eng arzon
+            self._flights = {}
+            flights = FlightPrice.objects.filter(
+                origin__iata_code__in=codes,
+                destination__iata_code__in=codes,
+                departure_date__in=dates
+            ).order_by('price_usd').values_list(
+                'origin__iata_code', 'destination__iata_code', 'departure_date',
+                'price_usd', 'airline', 'flight_duration_minutes'
+            )
+            for origin, dest, day, price, airline, duration in flights:
+                self._flights.setdefault((origin, dest, day), {
+                    'price': float(price),
+                    'airline': airline,
+                    'duration': duration,
+                    'data_source': 'database',
+                })
+            self._flight_scope = (codes, dates)
+
+        if stars is not None:
+            self._hotels = self._query_hotel_rates(codes, stars)
+            self._hotel_scope = (codes, stars)
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        if self._flight_scope:
+            codes, dates = self._flight_scope
+            if origin in codes and dest in codes and day in dates:
+                return self._flights.get((origin, dest, day))
+
+        flight = FlightPrice.objects.filter(
+            origin__iata_code=origin,
+            destination__iata_code=dest,
+            departure_date=day
+        ).order_by('price_usd').first()
+
+        if flight:
+            return {
+                'price': float(flight.price_usd),
+                'airline': flight.airline,
+                'duration': flight.flight_duration_minutes,
+                'data_source': 'database',
+            }
+        return None
+
+    def hotel_night(self, city_code: str, stars: int) -> Optional[Decimal]:
+        if self._hotel_scope and city_code in self._hotel_scope[0] and stars == self._hotel_scope[1]:
+            return self._hotels.get(city_code)
+
+        hotel = HotelPrice.objects.filter(
+            city__iata_code=city_code,
+            stars__gte=stars
+        ).order_by('price_per_night_usd').first()
+        return hotel.price_per_night_usd if hotel else None
+
+    def hotel_nights(self, city_codes: Iterable[str], stars: int) -> Dict[str, Decimal]:
+        return self._query_hotel_rates(set(city_codes), stars)
+
+    def _query_hotel_rates(self, codes: set, stars: int) -> Dict[str, Decimal]:
+        """Shaharlar bo'yicha eng arzon kecha narxi - bitta guruhlangan so'rov"""
+        if not codes:
+            return {}
+        rates = HotelPrice.objects.filter(
+            city__iata_code__in=codes,
+            stars__gte=stars
+        ).values('city__iata_code').annotate(min_price=Min('price_per_night_usd'))
+        return {row['city__iata_code']: row['min_price'] for row in rates}
+
+
+class AverageOracle(PriceOracle):
+    """Yo'nalish bo'yicha barcha sanalardagi o'rtacha narx"""
+
+    name = 'average'
+
+    def __init__(self):
+        self._scope = None
+        self._averages = None
+
+    def prefetch(self, codes: Iterable[str], dates: Iterable[date] = (), stars: Optional[int] = None):
+        # O'rtacha narxlar kerak bo'lgandagina yuklanadi (ko'p qidiruvlarda umuman kerak emas)
+        self._scope = set(codes)
+        self._averages = None
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        if self._scope and origin in self._scope and dest in self._scope:
+            if self._averages is None:
+                # Barcha juftliklar uchun o'rtacha narx - bitta so'rov
+                averages = FlightPrice.objects.filter(
+                    origin__iata_code__in=self._scope,
+                    destination__iata_code__in=self._scope
+                ).values('origin__iata_code', 'destination__iata_code').annotate(avg=Avg('price_usd'))
+                self._averages = {
+                    (row['origin__iata_code'], row['destination__iata_code']): row['avg']
+                    for row in averages
+                }
+            avg_price = self._averages.get((origin, dest))
+        else:
+            # Qidiruvlar o'rtasida umumiy kesh (0 - yo'nalishda narx yo'q)
+            key = f"{origin}-{dest}"
+            avg_price = price_cache.get('flight_avg', key)
+            if avg_price is None:
+                avg_price = FlightPrice.objects.filter(
+                    origin__iata_code=origin,
+                    destination__iata_code=dest
+                ).aggregate(avg=Avg('price_usd'))['avg']
+                avg_price = float(avg_price or 0)
+                price_cache.set('flight_avg', key, avg_price)
+
+        if avg_price:
+            return {'price': float(avg_price), 'airline': 'Aviakompaniya', 'duration': DEFAULT_DURATION_MINUTES, 'data_source': 'database_avg'}
+        return None
+
+
+class ImputedOracle(PriceOracle):
+    """Taxminiy narxlar jadvali (hafta kuni va qolgan kunlar bo'yicha, DB so'rovsiz)"""
+
+    name = 'imputed'
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        return impute_flight_price(origin, dest, day)
+
+
+class LiveOracle(PriceOracle):
+    """Real vaqtdagi eng arzon parvoz (Travelpayouts)"""
+
+    name = 'live'
+
+    def __init__(self, api=None):
+        self.api = api or travelpayouts_api
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        # Avval oylik kalendar yozuvi - oy uchun bitta so'rov, kunlik so'rovlar shart emas
+        entry = self.api.get_calendar_day(origin, dest, day)
+        if entry:
+            return {
+                'price': entry['price'],
+                'airline': entry['airline'],
+                'duration': DEFAULT_DURATION_MINUTES,
+                'data_source': 'live_calendar',
+                'link': self.api.build_aviasales_link(origin, dest, {'departure_at': day.isoformat()}),
+            }
+
+        flights = self.api.search_flights(origin, dest, day)
+        # Taxminiy (fallback) narxlar live hisoblanmaydi - graf/DB aniqroq
+        flights = [f for f in flights if f.get('data_source') != 'fallback']
+        if not flights:
+            return None
+
+        cheapest = min(flights, key=lambda x: x['price'])
+        logger.info(f"Live API: {origin}->{dest} = ${cheapest['price']}")
+        return {
+            'price': cheapest['price'],
+            'airline': cheapest.get('airline', 'Aviakompaniya'),
+            'duration': cheapest.get('duration', DEFAULT_DURATION_MINUTES),
+            'data_source': 'live_api',
+            'link': cheapest.get('link', ''),
+        }
+
+
+class FallbackOracle(PriceOracle):
+    """Qat'iy jadvallar - har doim javob beradi (zanjirning oxirgi bo'g'ini)"""
+
+    name = 'fallback'
+
+    def __init__(self, route_prices: Optional[Dict[Tuple[str, str], float]] = None):
+        self.route_prices = route_prices or {}
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        price = self.route_prices.get((origin, dest), self.route_prices.get((dest, origin), DEFAULT_FLIGHT_PRICE))
+        return {'price': price, 'airline': 'Aviakompaniya', 'duration': DEFAULT_DURATION_MINUTES, 'data_source': 'fallback'}
+
+    def hotel_night(self, city_code: str, stars: int) -> Optional[Decimal]:
+        prices = FALLBACK_HOTEL_PRICES.get(city_code, DEFAULT_HOTEL_PRICES)
+        return Decimal(str(prices.get(stars, 50)))
+
+
+class ChainOracle(PriceOracle):
+    """Manbalar zanjiri - birinchi topilgan narx"""
+
+    name = 'chain'
+
+    def __init__(self, oracles: List[PriceOracle]):
+        self.oracles = oracles
+
+    def prefetch(self, codes: Iterable[str], dates: Iterable[date] = (), stars: Optional[int] = None):
+        codes, dates = list(codes), list(dates)
+        for oracle in self.oracles:
+            oracle.prefetch(codes, dates, stars)
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        for oracle in self.oracles:
+            result = oracle.flight(origin, dest, day)
+            if result:
+                return result
+        return None
+
+    def hotel_night(self, city_code: str, stars: int) -> Optional[Decimal]:
+        for oracle in self.oracles:
+            rate = oracle.hotel_night(city_code, stars)
+            if rate is not None:
+                return rate
+        return None
+
+    def hotel_nights(self, city_codes: Iterable[str], stars: int) -> Dict[str, Decimal]:
+        rates = {}
+        missing = list(city_codes)
+        for oracle in self.oracles:
+            if not missing:
+                break
+            rates.update(oracle.hotel_nights(missing, stars))
+            missing = [code for code in missing if code not in rates]
+        return rates
+
+
+class CachedOracle(PriceOracle):
+    """Bitta qidiruv ichidagi kesh (topilmaganlar ham eslab qolinadi)"""
+
+    name = 'cached'
+
+    def __init__(self, inner: PriceOracle):
+        self.inner = inner
+        self._flights = {}
+        self._hotels = {}
+
+    def prefetch(self, codes: Iterable[str], dates: Iterable[date] = (), stars: Optional[int] = None):
+        self.inner.prefetch(codes, dates, stars)
+
+    def flight(self, origin: str, dest: str, day: date) -> Optional[Dict]:
+        key = (origin, dest, day)
+        if key not in self._flights:
+            self._flights[key] = self.inner.flight(origin, dest, day)
+        return self._flights[key]
+
+    def hotel_night(self, city_code: str, stars: int) -> Optional[Decimal]:
+        key = (city_code, stars)
+        if key not in self._hotels:
+            self._hotels[key] = self.inner.hotel_night(city_code, stars)
+        return self._hotels[key]
+
+    def hotel_nights(self, city_codes: Iterable[str], stars: int) -> Dict[str, Decimal]:
+        city_codes = list(city_codes)
+        missing = [code for code in city_codes if (code, stars) not in self._hotels]
+        if missing:
+            found = self.inner.hotel_nights(missing, stars)
+            for code in missing:
+                self._hotels[(code, stars)] = found.get(code)
+        return {
+            code: self._hotels[(code, stars)]
+            for code in city_codes if self._hotels[(code, stars)] is not None
+        }
+
+
+# Benchmark va sozlamalar uchun nomlangan manbalar to'plami
+ORACLE_BACKENDS = ('database', 'snapshot', 'live')
+
+
+def build_oracle(backend: str, graph: Optional[Dict[str, List[Tuple]]] = None) -> PriceOracle:
+    """Nomlangan manbalar zanjiri (har doim javob beradi)"""
+    estimates = [ImputedOracle(), AverageOracle(), FallbackOracle()]
+    if backend == 'database':
+        chain = [DatabaseOracle()] + estimates
+    elif backend == 'snapshot':
+        chain = [SnapshotOracle(graph or {}), DatabaseOracle()] + estimates
+    elif backend == 'live':
+        chain = [LiveOracle(), SnapshotOracle(graph or {}), DatabaseOracle()] + estimates
+    else:
+        raise ValueError(f"Noma'lum narxlar manbai: {backend}")
+    return CachedOracle(ChainOracle(chain))
@@ -0,0 +1,225 @@
+"""
+Price Snapshot - Parvozlar grafining oflayn tayyorlangan nusxasi
+
+Snapshot tarkibi:
+1. Parvozlar grafi (FlightPrice agregati + taxminiy marshrutlar)
+2. Shaharlar lug'ati
+3. Contraction hierarchy (eng arzon yo'l so'rovlari uchun)
+4. Graf barmoq izi - DB grafi o'zgargan bo'lsa snapshot ishlatilmaydi
+
+Tayyorlash: python manage.py build_price_snapshot
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from django.conf import settings
+from django.db.models import Min, Avg
+from apps.destinations.models import City
+from apps.pricing.models import FlightPrice
+from services.contraction_hierarchy import ContractionHierarchy
+from services.graph_search import Edge, Graph, INF
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# Hub shaharlar orasida standart narxlar: (narx, davomiylik)
+ESTIMATED_ROUTES = {
+    ('TAS', 'IST'): (250, 300),
+    ('TAS', 'DXB'): (200, 270),
+    ('TAS', 'DOH'): (220, 300),
+    ('TAS', 'BKK'): (350, 420),
+    ('TAS', 'KUL'): (400, 480),
+    ('TAS', 'SIN'): (450, 540),
+    ('TAS', 'CAI'): (300, 360),
+    ('DXB', 'IST'): (150, 180),
+    ('DXB', 'DOH'): (80, 90),
+    ('DXB', 'BKK'): (250, 360),
+    ('DXB', 'KUL'): (280, 360),
+    ('DXB', 'SIN'): (300, 360),
+    ('DXB', 'CAI'): (180, 240),
+    ('IST', 'DOH'): (160, 210),
+    ('IST', 'BKK'): (350, 540),
+    ('IST', 'KUL'): (400, 540),
+    ('IST', 'SIN'): (420, 540),
+    ('IST', 'CAI'): (120, 150),
+    ('DOH', 'BKK'): (280, 390),
+    ('DOH', 'KUL'): (300, 420),
+    ('DOH', 'SIN'): (320, 420),
+    ('DOH', 'CAI'): (150, 180),
+    ('BKK', 'KUL'): (80, 120),
+    ('BKK', 'SIN'): (100, 150),
+    ('KUL', 'SIN'): (50, 60),
+}
+
+
+def build_flight_graph() -> Tuple[Graph, Dict[str, City], Dict[str, int]]:
+    """Parvozlar grafini DB dan tuzish: (graf, shaharlar, statistika)"""
+    graph = {}  # {origin: [(dest, price, duration, airline), ...]}
+    cities = {}  # {iata_code: City}
+
+    # Barcha shaharlarni olish
+    for city in City.objects.select_related('country').all():
+        cities[city.iata_code] = city
+        graph[city.iata_code] = []
+
+    # Parvoz narxlarini grafga qo'shish (har bir aviakompaniya alohida qirra)
+    flights = FlightPrice.objects.select_related(
+        'origin', 'destination'
+    ).values(
+        'origin__iata_code',
+        'destination__iata_code',
+        'airline'
+    ).annotate(
+        min_price=Min('price_usd'),
+        avg_duration=Avg('flight_duration_minutes')
+    )
+
+    for flight in flights:
+        origin = flight['origin__iata_code']
+        dest = flight['destination__iata_code']
+        price = float(flight['min_price'])
+        duration = int(flight['avg_duration'] or 240)
+
+        if origin in graph:
+            graph[origin].append((dest, price, duration, flight['airline'] or 'Multiple'))
+
+    # Ham qimmatroq, ham sekinroq qirralar hech bir qidiruvga kerak emas
+    pruned = prune_dominated_edges(graph)
+
+    # Hub shaharlar orasida standart narxlar qo'shish
+    _add_estimated_routes(graph)
+
+    stats = {
+        'edges': sum(len(targets) for targets in graph.values()),
+        'pruned_edges': pruned,
+    }
+    return graph, cities, stats
+
+
+def prune_dominated_edges(graph: Graph, key: Callable[[Edge], Hashable] = lambda edge: edge[0]) -> int:
+    """
+    Har bir guruh uchun faqat Pareto-minimal qirralarni qoldirish
+
+    Guruh - (origin, key(edge)); default key manzil, ya'ni (origin, destination).
+    Graf sanalar bo'yicha agregatlangan; kunlik qirralar uchun key ga sanani
+    qo'shish kifoya. Qirra boshqasidan ham qimmat (yoki teng), ham sekin
+    (yoki teng) bo'lsa olib tashlanadi. Olib tashlangan qirralar sonini qaytaradi.
+    """
+    pruned = 0
+    for origin, edges in graph.items():
+        groups = {}
+        for edge in edges:
+            groups.setdefault(key(edge), []).append(edge)
+
+        kept = []
+        for group in groups.values():
+            # Narx bo'yicha tartiblab, davomiylik kamaygandagina qoldiriladi
+            best_duration = INF
+            for edge in sorted(group, key=lambda e: (e[1], e[2])):
+                if edge[2] < best_duration:
+                    kept.append(edge)
+                    best_duration = edge[2]
+
+        pruned += len(edges) - len(kept)
+        graph[origin] = kept
+    return pruned
+
+
+def _add_estimated_routes(graph: Graph):
+    """Taxminiy marshrutlarni qo'shish (mavjud bo'lmasa, ikki yo'nalishda)"""
+    for (origin, dest), (price, duration) in ESTIMATED_ROUTES.items():
+        if origin in graph:
+            existing = [x for x in graph[origin] if x[0] == dest]
+            if not existing:
+                graph[origin].append((dest, price, duration, 'Estimated'))
+        if dest in graph:
+            existing = [x for x in graph[dest] if x[0] == origin]
+            if not existing:
+                graph[dest].append((origin, price, duration, 'Estimated'))
+
+
+def graph_fingerprint(graph: Graph) -> str:
+    """Graf barmoq izi - qirralar to'plamidan md5"""
+    edges = sorted(
+        (origin, dest, float(price), int(duration))
+        for origin, targets in graph.items()
+        for dest, price, duration, airline in targets
+    )
+    data = repr((sorted(graph), edges))
+    return hashlib.md5(data.encode()).hexdigest()
+
+
+@dataclass
+class PriceSnapshot:
+    """Oflayn tayyorlangan graf + contraction hierarchy"""
+    graph: Graph
+    cities: Dict[str, City]
+    fingerprint: str
+    built_at: datetime = field(default_factory=datetime.now)
+    hierarchy: Optional[ContractionHierarchy] = None
+    stats: Dict[str, int] = field(default_factory=dict)
+    version: int = SNAPSHOT_VERSION
+
+    @classmethod
+    def build(cls, with_hierarchy: bool = True) -> 'PriceSnapshot':
+        """DB dan snapshot tayyorlash"""
+        graph, cities, stats = build_flight_graph()
+        hierarchy = ContractionHierarchy.build(graph) if with_hierarchy else None
+        return cls(
+            graph=graph,
+            cities=cities,
+            fingerprint=graph_fingerprint(graph),
+            hierarchy=hierarchy,
+            stats=stats,
+        )
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Faylga saqlash (atomik almashtirish)"""
+        path = str(path or settings.PRICE_SNAPSHOT_PATH)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['PriceSnapshot']:
+        """Fayldan yuklash"""
+        path = str(path or settings.PRICE_SNAPSHOT_PATH)
+        try:
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Snapshot yuklashda xato: {e}")
+            return None
+
+        if getattr(snapshot, 'version', None) != SNAPSHOT_VERSION:
+            logger.warning("Snapshot versiyasi mos emas, qayta tayyorlang")
+            return None
+        return snapshot
+
+
+# Jarayon ichidagi snapshot (fayl o'zgarganda qayta yuklanadi)
+_loaded = {'mtime': None, 'snapshot': None}
+
+
+def get_snapshot() -> Optional[PriceSnapshot]:
+    """Joriy snapshot (fayl mtime bo'yicha keshlangan)"""
+    try:
+        mtime = os.stat(settings.PRICE_SNAPSHOT_PATH).st_mtime
+    except OSError:
+        return None
+
+    if _loaded['mtime'] != mtime:
+        _loaded['snapshot'] = PriceSnapshot.load()
+        _loaded['mtime'] = mtime
+    return _loaded['snapshot']
@@ -0,0 +1,337 @@
+"""
+Price Writer - Live narxlarni FlightPrice / HotelPrice ga yozish (write-through)
+
+Tashqi API dan olingan narxlar so'rov yo'lida bazaga yozilmaydi: navbatga
+qo'yiladi, fon oqimi esa ularni guruhlab (BATCH_SIZE ta yoki FLUSH_INTERVAL
+sekundda) upsert qiladi:
+- parvoz kaliti: (qayerdan, qayerga, uchish sanasi, aviakompaniya)
+- mehmonxona kaliti: (shahar, nomi, kirish sanasi)
+Mavjud yozuvlarning narxi, source va fetched_at yangilanadi, yangilari qo'shiladi.
+
+Faqat API javoblari yoziladi (taxminiy narxlar va borib-qaytish narxlari emas).
+Bazada yo'q shaharlar o'tkazib yuboriladi. Navbat to'lsa yangi narxlar
+tashlanadi - so'rov hech qachon kutmaydi.
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.destinations.models import City
+from apps.pricing.models import FlightPrice, HotelPrice
+
+logger = logging.getLogger(__name__)
+
+# Bir tranzaksiyada yoziladigan navbat elementlari
+BATCH_SIZE = 200
+
+# Guruh to'lmasa ham shuncha sekunddan keyin yoziladi
+FLUSH_INTERVAL = 5.0
+
+# Navbat sig'imi (to'lsa yangi narxlar tashlanadi)
+MAX_QUEUE = 10000
+
+# API davomiylikni bermasa (daqiqa) - optimizator bilan bir xil taxmin
+DEFAULT_DURATION_MINUTES = 240
+
+
+def _flight_row(flight: Dict, default_date: date) -> Optional[Dict]:
+    """API parvozi -> FlightPrice maydonlari (yaroqsiz bo'lsa None)"""
+    try:
+        price = Decimal(str(round(float(flight.get('price') or 0), 2)))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0 or flight.get('return_at'):
+        return None
+
+    departure_at = str(flight.get('departure_at') or '')
+    try:
+        departure_date = date.fromisoformat(departure_at[:10])
+    except ValueError:
+        departure_date = default_date
+
+    departure_time = None
+    if len(departure_at) >= 16 and departure_at[10] == 'T':
+        try:
+            departure_time = dtime.fromisoformat(departure_at[11:16])
+        except ValueError:
+            pass
+
+    return {
+        'origin': flight.get('origin'),
+        'destination': flight.get('destination'),
+        'price_usd': price,
+        'airline': str(flight.get('airline') or 'Aviakompaniya')[:100],
+        'flight_duration_minutes': int(flight.get('duration') or 0) or DEFAULT_DURATION_MINUTES,
+        'departure_date': departure_date,
+        'departure_time': departure_time,
+    }
+
+
+def _hotel_row(hotel: Dict) -> Optional[Dict]:
+    """API mehmonxonasi -> HotelPrice maydonlari (yaroqsiz bo'lsa None)"""
+    try:
+        price = Decimal(str(round(float(hotel.get('price_per_night') or 0), 2)))
+        stars = int(hotel.get('stars') or 0)
+        rating = Decimal(str(round(min(float(hotel.get('rating') or 0), 99.9), 1)))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0 or not 1 <= stars <= 5:
+        return None
+
+    image_url = hotel.get('image_url') or None
+    return {
+        'hotel_name': str(hotel.get('hotel_name') or '')[:200],
+        'stars': stars,
+        'price_per_night_usd': price,
+        'rating': rating,
+        # URLField 200 belgidan uzun bo'lolmaydi
+        'image_url': image_url if image_url and len(image_url) <= 200 else None,
+    }
+
+
+def _prefer(new: Dict, current: Optional[Dict], price_field: str) -> bool:
+    """Bir kalit uchun: yangiroq javob, bir xil javobda esa arzonrog'i"""
+    if current is None or new['fetched_at'] > current['fetched_at']:
+        return True
+    return new['fetched_at'] == current['fetched_at'] and new[price_field] < current[price_field]
+
+
+class PriceWriter:
+    """Navbat + fon oqimi, guruhlab upsert"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL, max_queue: int = MAX_QUEUE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: 'queue.Queue[Tuple]' = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counters = {
+            'queued': 0, 'dropped': 0, 'batches': 0, 'errors': 0,
+            'flights_created': 0, 'flights_updated': 0, 'hotels_created': 0, 'hotels_updated': 0,
+        }
+
+    def _count(self, counter: str, value: int = 1):
+        with self._lock:
+            self._counters[counter] += value
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'PRICE_WRITE_THROUGH', True)
+
+    def enqueue_flights(self, flights: List[Dict], departure_date: date, source: str):
+        """Aviasales natijalari (so'rov yo'lida faqat navbatga qo'yiladi)"""
+        if flights:
+            self._put(('flights', flights, departure_date, source, timezone.now()))
+
+    def enqueue_hotels(self, city_name: str, checkin_date: date, hotels: List[Dict], source: str = 'booking'):
+        """Booking.com natijalari (so'rov yo'lida faqat navbatga qo'yiladi)"""
+        if hotels:
+            self._put(('hotels', hotels, (city_name, checkin_date), source, timezone.now()))
+
+    def _put(self, item: Tuple):
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+            self._count('queued')
+        except queue.Full:
+            self._count('dropped')
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='price-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self.write(batch)
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Live narxlarni bazaga yozishda xato ({len(batch)} ta): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Navbatdagi barcha narxlar yozilguncha kutish (management commandlar uchun)"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def write(self, batch: List[Tuple]):
+        """Navbat elementlarini bitta tranzaksiyada upsert qilish"""
+        close_old_connections()
+        flights, hotels = {}, {}
+        codes, city_names = set(), set()
+
+        for kind, items, context, source, fetched_at in batch:
+            if kind == 'flights':
+                for flight in items:
+                    row = _flight_row(flight, context)
+                    if row is None:
+                        continue
+                    row.update(source=source, fetched_at=fetched_at)
+                    key = (row['origin'], row['destination'], row['departure_date'], row['airline'])
+                    if _prefer(row, flights.get(key), 'price_usd'):
+                        flights[key] = row
+                        codes.update(key[:2])
+            else:
+                city_name, checkin_date = context
+                for hotel in items:
+                    row = _hotel_row(hotel)
+                    if row is None:
+                        continue
+                    row.update(source=source, fetched_at=fetched_at, checkin_date=checkin_date)
+                    key = (city_name, row['hotel_name'], checkin_date)
+                    if _prefer(row, hotels.get(key), 'price_per_night_usd'):
+                        hotels[key] = row
+                        city_names.add(city_name)
+
+        with transaction.atomic():
+            if flights:
+                self._upsert_flights(flights, codes)
+            if hotels:
+                self._upsert_hotels(hotels, city_names)
+        self._count('batches')
+
+    def _upsert_flights(self, rows: Dict[Tuple, Dict], codes: set):
+        city_ids = dict(City.objects.filter(iata_code__in=codes).values_list('iata_code', 'id'))
+        by_ids = {}
+        for (origin, dest, day, airline), row in rows.items():
+            if origin in city_ids and dest in city_ids:
+                by_ids[(city_ids[origin], city_ids[dest], day, airline)] = row
+        if not by_ids:
+            return
+
+        existing = FlightPrice.objects.filter(
+            origin_id__in={key[0] for key in by_ids},
+            destination_id__in={key[1] for key in by_ids},
+            departure_date__in={key[2] for key in by_ids},
+            airline__in={key[3] for key in by_ids},
+            is_roundtrip=False,
+        )
+        now = timezone.now()
+        updated, seen = [], set()
+        for price in existing:
+            key = (price.origin_id, price.destination_id, price.departure_date, price.airline)
+            row = by_ids.get(key)
+            if row is None:
+                continue
+            seen.add(key)
+            price.price_usd = row['price_usd']
+            price.flight_duration_minutes = row['flight_duration_minutes']
+            price.departure_time = row['departure_time'] or price.departure_time
+            price.source = row['source']
+            price.fetched_at = row['fetched_at']
+            price.updated_at = now
+            updated.append(price)
+
+        created = [
+            FlightPrice(
+                origin_id=key[0],
+                destination_id=key[1],
+                price_usd=row['price_usd'],
+                airline=row['airline'],
+                flight_duration_minutes=row['flight_duration_minutes'],
+                departure_date=row['departure_date'],
+                departure_time=row['departure_time'],
+                source=row['source'],
+                fetched_at=row['fetched_at'],
+            )
+            for key, row in by_ids.items() if key not in seen
+        ]
+
+        if updated:
+            FlightPrice.objects.bulk_update(
+                updated,
+                ['price_usd', 'flight_duration_minutes', 'departure_time', 'source', 'fetched_at', 'updated_at'],
+                batch_size=BATCH_SIZE
+            )
+        if created:
+            FlightPrice.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        self._count('flights_updated', len(updated))
+        self._count('flights_created', len(created))
+
+    def _upsert_hotels(self, rows: Dict[Tuple, Dict], city_names: set):
+        city_ids = {}
+        for city_id, name, name_uz in City.objects.filter(
+            Q(name__in=city_names) | Q(name_uz__in=city_names)
+        ).values_list('id', 'name', 'name_uz'):
+            city_ids.setdefault(name, city_id)
+            city_ids.setdefault(name_uz, city_id)
+
+        by_ids = {}
+        for (city_name, hotel_name, checkin_date), row in rows.items():
+            if city_name in city_ids:
+                by_ids[(city_ids[city_name], hotel_name, checkin_date)] = row
+        if not by_ids:
+            return
+
+        existing = HotelPrice.objects.filter(
+            city_id__in={key[0] for key in by_ids},
+            hotel_name__in={key[1] for key in by_ids},
+            checkin_date__in={key[2] for key in by_ids},
+        )
+        now = timezone.now()
+        updated, seen = [], set()
+        for price in existing:
+            key = (price.city_id, price.hotel_name, price.checkin_date)
+            row = by_ids.get(key)
+            if row is None:
+                continue
+            seen.add(key)
+            price.stars = row['stars']
+            price.price_per_night_usd = row['price_per_night_usd']
+            price.rating = row['rating']
+            price.image_url = row['image_url'] or price.image_url
+            price.source = row['source']
+            price.fetched_at = row['fetched_at']
+            price.updated_at = now
+            updated.append(price)
+
+        created = [
+            HotelPrice(city_id=key[0], **row)
+            for key, row in by_ids.items() if key not in seen
+        ]
+
+        if updated:
+            HotelPrice.objects.bulk_update(
+                updated,
+                ['stars', 'price_per_night_usd', 'rating', 'image_url', 'source', 'fetched_at', 'updated_at'],
+                batch_size=BATCH_SIZE
+            )
+        if created:
+            HotelPrice.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        self._count('hotels_updated', len(updated))
+        self._count('hotels_created', len(created))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, 'pending': self._queue.qsize()}
+
+
+# Protsess bo'yicha yagona instans
+price_writer = PriceWriter()
@@ -0,0 +1,198 @@
+"""
+Rate Limiter - Tashqi API lar uchun umumiy token-bucket
+
+Chelak barcha workerlar uchun bitta: REDIS_URL sozlangan bo'lsa holat Redis da
+(Lua skript - atomik, vaqt Redis serveridan), aks holda protsess ichida.
+Token bo'lmasa chaqiruvchi faqat max_wait gacha kutadi; undan uzoq kutish kerak
+bo'lsa acquire() darhol False qaytaradi va chaqiruvchi keshga/taxminiy narxga o'tadi.
+
+Masalan:
+    limiter = get_rate_limiter('booking')
+    if not limiter.acquire(max_wait=2.0):
+        return []  # kesh yoki fallback
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_ALIAS = 'shared'
+KEY_PREFIX = 'ratelimit'
+
+# Provayder -> (sekundiga tokenlar, chelak sig'imi)
+RATE_LIMITS = {
+    # RapidAPI Booking.com - sekundiga 1 ta so'rov
+    'booking': (1.0, 1),
+    # Travelpayouts Data API - qisqa portlashlar bilan ~3 so'rov/s
+    'travelpayouts': (3.0, 10),
+}
+
+# Shundan uzoq kutish kerak bo'lsa so'rov yuborilmaydi (sekund)
+DEFAULT_MAX_WAIT = 2.0
+
+# Atomik to'ldirish va band qilish. Qaytaradi: {ruxsat, kutish, qolgan tokenlar}
+# Ruxsat berilganda tokenlar manfiy bo'lishi mumkin - bu keyingi chaqiruvchilar uchun navbat
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens < requested then
+    wait = (requested - tokens) / rate
+end
+local granted = 0
+if wait <= max_wait then
+    tokens = tokens - requested
+    granted = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {granted, tostring(wait), tostring(tokens)}
+"""
+
+
+class TokenBucket:
+    """Token-bucket: Redis da (barcha workerlar) yoki protsess ichida"""
+
+    def __init__(self, name: str, rate: float, capacity: float, alias: str = SHARED_CACHE_ALIAS):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.alias = alias
+        self.key = f"{KEY_PREFIX}:{name}"
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._script = None
+        self._counters = {'granted': 0, 'rejected': 0, 'waited_ms': 0}
+
+    def _redis_client(self):
+        """Umumiy kesh Redis bo'lsa - uning klienti, aks holda None"""
+        try:
+            backend = caches[self.alias]
+        except InvalidCacheBackendError:
+            return None
+        client_factory = getattr(getattr(backend, '_cache', None), 'get_client', None)
+        if client_factory is None:
+            return None
+        return client_factory(self.key, write=True)
+
+    def _take_redis(self, tokens: float, max_wait: float) -> Optional[Tuple[bool, float, float]]:
+        try:
+            client = self._redis_client()
+            if client is None:
+                return None
+            if self._script is None:
+                self._script = client.register_script(TOKEN_BUCKET_LUA)
+            granted, wait, remaining = self._script(
+                keys=[self.key], args=[self.rate, self.capacity, tokens, max_wait], client=client
+            )
+            return bool(int(granted)), float(wait), float(remaining)
+        except Exception as e:
+            logger.warning(f"Rate limiter ({self.name}) Redis xatosi, lokal chelak ishlatiladi: {e}")
+            return None
+
+    def _take_local(self, tokens: float, max_wait: float) -> Tuple[bool, float, float]:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if wait > max_wait:
+                return False, wait, self._tokens
+            self._tokens -= tokens
+            return True, wait, self._tokens
+
+    def try_acquire(self, tokens: float = 1, max_wait: float = DEFAULT_MAX_WAIT) -> Tuple[bool, float]:
+        """(ruxsat, kutish sekundlari) - kutmaydi, faqat band qiladi"""
+        result = self._take_redis(tokens, max_wait) or self._take_local(tokens, max_wait)
+        granted, wait, _ = result
+        with self._lock:
+            self._counters['granted' if granted else 'rejected'] += 1
+        return granted, wait
+
+    def acquire(self, tokens: float = 1, max_wait: float = DEFAULT_MAX_WAIT) -> bool:
+        """Token olish; kutish max_wait dan oshsa darhol False (uxlamaydi)"""
+        granted, wait = self.try_acquire(tokens, max_wait)
+        if not granted:
+            logger.info(f"Rate limit ({self.name}): {wait:.1f} s kutish kerak, so'rov o'tkazib yuborildi")
+            return False
+        if wait > 0:
+            with self._lock:
+                self._counters['waited_ms'] += int(wait * 1000)
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, tokens: float = 1, max_wait: float = DEFAULT_MAX_WAIT) -> bool:
+        """acquire() ning async varianti - kutish event loop ni band qilmaydi"""
+        granted, wait = await sync_to_async(self.try_acquire, thread_sensitive=False)(tokens, max_wait)
+        if not granted:
+            logger.info(f"Rate limit ({self.name}): {wait:.1f} s kutish kerak, so'rov o'tkazib yuborildi")
+            return False
+        if wait > 0:
+            with self._lock:
+                self._counters['waited_ms'] += int(wait * 1000)
+            await asyncio.sleep(wait)
+        return True
+
+    def remaining(self) -> float:
+        """Hozir mavjud tokenlar (band qilmasdan)"""
+        try:
+            client = self._redis_client()
+            if client is not None:
+                tokens, ts = client.hmget(self.key, 'tokens', 'ts')
+                if tokens is None:
+                    return self.capacity
+                seconds, micros = client.time()
+                elapsed = max(0.0, seconds + micros / 1_000_000 - float(ts))
+                return min(self.capacity, float(tokens) + elapsed * self.rate)
+        except Exception as e:
+            logger.warning(f"Rate limiter ({self.name}) holatini o'qib bo'lmadi: {e}")
+
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def status(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            'rate_per_second': self.rate,
+            'capacity': self.capacity,
+            'remaining': round(self.remaining(), 2),
+            'backend': 'local' if self._redis_client() is None else 'redis',
+            **counters,
+        }
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> TokenBucket:
+    """Provayder chelagi (RATE_LIMITS dan, protsessda bitta instans)"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                rate, capacity = RATE_LIMITS[name]
+                limiter = _limiters[name] = TokenBucket(name, rate, capacity)
+    return limiter
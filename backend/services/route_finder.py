@@ -12,10 +12,13 @@ Bu servis quyidagi vazifalarni bajaradi:
 
 from decimal import Decimal
 from datetime import timedelta
-from django.db.models import Min, Avg
+from typing import Optional
 from apps.destinations.models import City
-from apps.pricing.models import FlightPrice, HotelPrice
 from apps.search.models import TravelSearch, RouteVariant
+from services.price_oracle import (
+    BASE_ROUTE_PRICES, AverageOracle, CachedOracle, ChainOracle, DatabaseOracle, FallbackOracle,
+    ImputedOracle, PriceOracle
+)
 
 
 # Tranzit hub shaharlar
@@ -25,7 +28,7 @@ HUB_CITIES = ['DXB', 'IST', 'DOH', 'AUH', 'BKK', 'KUL', 'SIN']
 class RouteFinder:
     """Optimal yo'nalish topuvchi"""
 
-    def __init__(self, search: TravelSearch):
+    def __init__(self, search: TravelSearch, oracle: Optional[PriceOracle] = None):
         self.search = search
         self.origin = search.origin
         self.destination = search.destination
@@ -36,22 +39,37 @@ class RouteFinder:
         self.hotel_stars = search.hotel_stars
         self.budget_max = search.budget_max_usd
 
+        # Narxlar manbai (default: aniq sanadagi baza narxlari)
+        self.oracle = oracle or CachedOracle(DatabaseOracle())
+        # Parvoz topilmasa taxminiy narx: jadval -> o'rtacha narx -> standart narxlar
+        self.estimator = ChainOracle([
+            ImputedOracle(),
+            AverageOracle(),
+            FallbackOracle(route_prices=BASE_ROUTE_PRICES),
+        ])
+        # Mehmonxona topilmasa shahar o'rtacha narxi (yuklangan shaharlardan)
+        self._city_avg_hotel = {}
+
     def find_all_routes(self):
         """Barcha variantlarni topish"""
         variants = []
 
+        # Hublar va ularning barcha narxlari - bir necha so'rov bilan
+        hubs = list(City.objects.filter(iata_code__in=HUB_CITIES, is_hub=True).select_related('country'))
+        self._prefetch_prices(hubs)
+
         # 1. To'g'ridan-to'g'ri parvoz
         direct = self._find_direct_route()
         if direct:
             variants.append(direct)
 
         # 2. Tranzit variantlar (1 ta hub orqali)
-        transit_variants = self._find_transit_routes()
+        transit_variants = self._find_transit_routes(hubs)
         variants.extend(transit_variants)
 
         # 3. Multi-city variantlar (2 ta hub orqali)
         if self.search.include_transit:
-            multi_variants = self._find_multi_city_routes()
+            multi_variants = self._find_multi_city_routes(hubs)
             variants.extend(multi_variants)
 
         # Tejamkorlikni hisoblash
@@ -88,11 +106,13 @@ class RouteFinder:
             # Agar parvoz topilmasa, o'rtacha narx ishlatamiz
             outbound = self._estimate_flight_price(
                 self.origin.iata_code,
-                self.destination.iata_code
+                self.destination.iata_code,
+                self.departure_date
             )
             inbound = self._estimate_flight_price(
                 self.destination.iata_code,
-                self.origin.iata_code
+                self.origin.iata_code,
+                self.return_date
             )
 
         # Mehmonxona narxi
@@ -153,10 +173,11 @@ class RouteFinder:
             }
         }
 
-    def _find_transit_routes(self):
+    def _find_transit_routes(self, hubs=None):
         """Tranzit yo'nalishlarni topish (1 ta hub orqali)"""
         variants = []
-        hubs = City.objects.filter(iata_code__in=HUB_CITIES, is_hub=True)
+        if hubs is None:
+            hubs = City.objects.filter(iata_code__in=HUB_CITIES, is_hub=True)
 
         for hub in hubs:
             if hub.iata_code in [self.origin.iata_code, self.destination.iata_code]:
@@ -168,10 +189,11 @@ class RouteFinder:
 
         return sorted(variants, key=lambda x: x['total_cost'])[:3]
 
-    def _find_multi_city_routes(self):
+    def _find_multi_city_routes(self, hubs=None):
         """Multi-city yo'nalishlarni topish (2 ta hub orqali)"""
         variants = []
-        hubs = City.objects.filter(iata_code__in=HUB_CITIES, is_hub=True)
+        if hubs is None:
+            hubs = City.objects.filter(iata_code__in=HUB_CITIES, is_hub=True)
 
         for hub1 in hubs:
             for hub2 in hubs:
@@ -195,7 +217,7 @@ class RouteFinder:
             self.origin.iata_code,
             hub.iata_code,
             self.departure_date
-        ) or self._estimate_flight_price(self.origin.iata_code, hub.iata_code)
+        ) or self._estimate_flight_price(self.origin.iata_code, hub.iata_code, self.departure_date)
 
         # Segment 2: Hub -> Destination
         hub_departure = self.departure_date + timedelta(days=nights_at_hub)
@@ -203,14 +225,14 @@ class RouteFinder:
             hub.iata_code,
             self.destination.iata_code,
             hub_departure
-        ) or self._estimate_flight_price(hub.iata_code, self.destination.iata_code)
+        ) or self._estimate_flight_price(hub.iata_code, self.destination.iata_code, hub_departure)
 
         # Segment 3: Destination -> Origin (qaytish)
         seg3 = self._get_cheapest_flight(
             self.destination.iata_code,
             self.origin.iata_code,
             self.return_date
-        ) or self._estimate_flight_price(self.destination.iata_code, self.origin.iata_code)
+        ) or self._estimate_flight_price(self.destination.iata_code, self.origin.iata_code, self.return_date)
 
         # Mehmonxonalar
         hub_hotel = self._get_hotel_cost(hub.iata_code, nights_at_hub)
@@ -307,7 +329,7 @@ class RouteFinder:
             self.origin.iata_code,
             hub1.iata_code,
             self.departure_date
-        ) or self._estimate_flight_price(self.origin.iata_code, hub1.iata_code)
+        ) or self._estimate_flight_price(self.origin.iata_code, hub1.iata_code, self.departure_date)
 
         # Segment 2: Hub1 -> Hub2
         hub1_departure = self.departure_date + timedelta(days=nights_per_city)
@@ -315,7 +337,7 @@ class RouteFinder:
             hub1.iata_code,
             hub2.iata_code,
             hub1_departure
-        ) or self._estimate_flight_price(hub1.iata_code, hub2.iata_code)
+        ) or self._estimate_flight_price(hub1.iata_code, hub2.iata_code, hub1_departure)
 
         # Segment 3: Hub2 -> Destination
         hub2_departure = hub1_departure + timedelta(days=nights_per_city)
@@ -323,14 +345,14 @@ class RouteFinder:
             hub2.iata_code,
             self.destination.iata_code,
             hub2_departure
-        ) or self._estimate_flight_price(hub2.iata_code, self.destination.iata_code)
+        ) or self._estimate_flight_price(hub2.iata_code, self.destination.iata_code, hub2_departure)
 
         # Segment 4: Destination -> Origin
         seg4 = self._get_cheapest_flight(
             self.destination.iata_code,
             self.origin.iata_code,
             self.return_date
-        ) or self._estimate_flight_price(self.destination.iata_code, self.origin.iata_code)
+        ) or self._estimate_flight_price(self.destination.iata_code, self.origin.iata_code, self.return_date)
 
         # Mehmonxonalar
         dest_nights = self.nights - (nights_per_city * 2)
@@ -435,51 +457,40 @@ class RouteFinder:
             }
         }
 
-    def _get_cheapest_flight(self, origin_code, dest_code, date):
-        """Eng arzon parvozni topish"""
-        flight = FlightPrice.objects.filter(
-            origin__iata_code=origin_code,
-            destination__iata_code=dest_code,
-            departure_date=date
-        ).order_by('price_usd').first()
-
-        if flight:
-            return {
-                'price': float(flight.price_usd),
-                'airline': flight.airline,
-                'duration': flight.flight_duration_minutes
-            }
-        return None
+    def _prefetch_prices(self, hubs):
+        """
+        Barcha kombinatsiyalar uchun narxlarni set-based so'rovlar bilan olish
 
-    def _estimate_flight_price(self, origin_code, dest_code):
-        """Parvoz narxini taxmin qilish"""
-        # Avval o'rtacha narxni tekshirish
-        avg_price = FlightPrice.objects.filter(
-            origin__iata_code=origin_code,
-            destination__iata_code=dest_code
-        ).aggregate(avg=Avg('price_usd'))['avg']
-
-        if avg_price:
-            return {'price': float(avg_price), 'airline': 'Aviakompaniya', 'duration': 240}
-
-        # Aks holda standart narx
-        base_prices = {
-            ('TAS', 'IST'): 250,
-            ('TAS', 'DXB'): 200,
-            ('TAS', 'DOH'): 220,
-            ('DXB', 'IST'): 150,
-            ('DOH', 'IST'): 160,
+        Har bir (qayerdan, qayerga, sana) uchun eng arzon parvoz - bitta so'rov,
+        har bir shahar uchun eng arzon mehmonxona - bitta so'rov. Hub juftliklari
+        xotirada birlashtiriladi (N^2 ta alohida so'rov o'rniga).
+        """
+        codes = {self.origin.iata_code, self.destination.iata_code} | {h.iata_code for h in hubs}
+        nights_per_city = max(1, self.nights // 3)
+        dates = {
+            self.departure_date,
+            self.departure_date + timedelta(days=1),
+            self.departure_date + timedelta(days=nights_per_city),
+            self.departure_date + timedelta(days=nights_per_city * 2),
+            self.return_date,
         }
 
-        key = (origin_code, dest_code)
-        reverse_key = (dest_code, origin_code)
+        self.oracle.prefetch(codes, dates, self.hotel_stars)
+        self.estimator.prefetch(codes)
+
+        # Shahar o'rtacha narxi (mehmonxona topilmasa) - allaqachon yuklangan shaharlardan
+        self._city_avg_hotel = {
+            city.iata_code: city.avg_hotel_price_usd
+            for city in [self.origin, self.destination, *hubs]
+        }
 
-        if key in base_prices:
-            return {'price': base_prices[key], 'airline': 'Aviakompaniya', 'duration': 240}
-        elif reverse_key in base_prices:
-            return {'price': base_prices[reverse_key], 'airline': 'Aviakompaniya', 'duration': 240}
+    def _get_cheapest_flight(self, origin_code, dest_code, date):
+        """Eng arzon parvozni topish"""
+        return self.oracle.flight(origin_code, dest_code, date)
 
-        return {'price': 200, 'airline': 'Aviakompaniya', 'duration': 240}
+    def _estimate_flight_price(self, origin_code, dest_code, date=None):
+        """Parvoz narxini taxmin qilish"""
+        return self.estimator.flight(origin_code, dest_code, date or self.departure_date)
 
     def _get_hotel_cost(self, city_code, nights):
         """Mehmonxona narxini hisoblash"""
@@ -487,20 +498,19 @@ class RouteFinder:
             return Decimal('0')
 
         # Bazadan eng arzon mehmonxona
-        hotel = HotelPrice.objects.filter(
-            city__iata_code=city_code,
-            stars__gte=self.hotel_stars
-        ).order_by('price_per_night_usd').first()
-
-        if hotel:
-            return hotel.price_per_night_usd * nights
+        rate = self.oracle.hotel_night(city_code, self.hotel_stars)
 
         # Shahar o'rtacha narxi
-        city = City.objects.filter(iata_code=city_code).first()
-        if city:
-            return city.avg_hotel_price_usd * nights
-
-        return Decimal('50') * nights
+        if rate is None:
+            if city_code in self._city_avg_hotel:
+                rate = self._city_avg_hotel[city_code]
+            else:
+                city = City.objects.filter(iata_code=city_code).first()
+                rate = city.avg_hotel_price_usd if city else None
+
+        if rate is None:
+            return Decimal('50') * nights
+        return rate * nights
 
     def _calculate_score(self, total_cost, stops, days_count):
         """Variant ballini hisoblash"""
@@ -10,20 +10,49 @@ Bu servis quyidagi funksiyalarni o'z ichiga oladi:
 6. Real API integratsiya (Travelpayouts, Booking.com)
 """
 
-import heapq
+import copy
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from decimal import Decimal
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, date
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
-from django.db.models import Min, Avg, Q
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Q
 from apps.destinations.models import City
-from apps.pricing.models import FlightPrice, HotelPrice
 from apps.search.models import TravelSearch, RouteVariant
 from services.external_apis import travelpayouts_api, booking_api
+from services.geo_index import get_geo_index
+from services.price_oracle import (
+    AverageOracle, CachedOracle, ChainOracle, DatabaseOracle, FallbackOracle, ImputedOracle,
+    LiveOracle, PriceOracle, SnapshotOracle
+)
+from services.price_snapshot import PriceSnapshot, build_flight_graph, get_snapshot, graph_fingerprint
+from services.graph_search import (
+    bidirectional_dijkstra, build_reverse_graph, dijkstra_tree, edge_duration, edge_price, tree_path
+)
 
 logger = logging.getLogger(__name__)
 
+# Live narxlar bilan aniqlashtirishda parallel so'rovlar soni (protsess bo'yicha, barcha qidiruvlar uchun)
+LIVE_REFINE_WORKERS = 8
+
+# Umumiy pul - qidiruvlar o'z oqimlarini yaratmaydi, oqimlar soni cheklangan
+_live_refine_executor = ThreadPoolExecutor(max_workers=LIVE_REFINE_WORKERS, thread_name_prefix='live-refine')
+
+# Tanlangan manba javob bermasa (masalan, faqat DB zanjiri)
+FALLBACK_ORACLE = FallbackOracle()
+
+# Parvozlar qatlami keshi (refine uchun) - 1 soat
+FLIGHT_LAYER_CACHE_TTL = 3600
+
+# Pasport -> Country dagi "viza kerakmi" maydoni
+VISA_REQUIREMENT_FIELDS = {
+    'UZ': 'visa_required_for_uz',
+}
+
 
 @dataclass
 class FlightNode:
@@ -66,7 +95,17 @@ class RouteOptimizer:
     MODE_BALANCED = 'balanced'      # Muvozanatli
     MODE_COMFORT = 'comfort'        # Eng qulay
 
-    def __init__(self, search: TravelSearch, use_live_prices: bool = False):
+    def __init__(
+        self,
+        search: TravelSearch,
+        use_live_prices: bool = False,
+        snapshot: Optional[PriceSnapshot] = None,
+        passport: Optional[str] = None,
+        return_to: Optional[List[str]] = None,
+        nearby_radius_km: Optional[float] = None,
+        flight_layer: Optional[List[Dict]] = None,
+        oracle: Optional[PriceOracle] = None
+    ):
         self.search = search
         self.origin = search.origin
         self.destination = search.destination
@@ -77,95 +116,185 @@ class RouteOptimizer:
         self.hotel_stars = search.hotel_stars
         self.budget_max = float(search.budget_max_usd) if search.budget_max_usd else None
         self.use_live_prices = use_live_prices
+        self.snapshot = snapshot
+        self.passport = passport.upper() if passport else None
+        # Open-jaw: qaytish boshqa shaharga ham bo'lishi mumkin
+        self.return_to = [code.upper() for code in (return_to or [])]
+        # Muqobil aeroportlar radiusi (masalan, DXB uchun AUH, SHJ)
+        self.nearby_radius_km = nearby_radius_km
 
         # Keshlar
-        self._avg_prices_cache = {}
         self._hotel_cache = {}
-        self._live_prices_cache = {}
+        self._live_oracle = CachedOracle(LiveOracle())
+        self._return_tree = None
+        self._return_costs = None
+
+        # Anytime rejim: live so'rovlar keyinga qoldiriladi
+        self._defer_live = False
+        self.refinement = None
+
+        # Parvozlar qatlami (byudjet filtri va baholashdan oldingi variantlar)
+        self.flight_layer = flight_layer
+
+        if flight_layer is not None:
+            # Refine: parvozlar tayyor - graf tuzilmaydi
+            self.graph, self.reverse_graph, self.cities = {}, {}, {}
+            self.graph_stats = {}
+            self.hierarchy = None
+            self.origin_airports = [self.origin.iata_code]
+            self.destination_airports = [self.destination.iata_code]
+            self.excluded_cities = set()
+            self.oracle = oracle or self._default_oracle()
+            return
 
         # Graf tuzish
         self._build_flight_graph()
+        # Narxlar manbai (default: graf -> baza -> taxminiy narxlar)
+        self.oracle = oracle or self._default_oracle()
 
-    def _build_flight_graph(self):
-        """Parvozlar grafini tuzish"""
-        self.graph = {}  # {origin: [(dest, price, duration, airline), ...]}
-        self.cities = {}  # {iata_code: City}
-
-        # Barcha shaharlarni olish
-        all_cities = City.objects.select_related('country').all()
-        for city in all_cities:
-            self.cities[city.iata_code] = city
-            self.graph[city.iata_code] = []
-
-        # Parvoz narxlarini grafga qo'shish
-        flights = FlightPrice.objects.select_related(
-            'origin', 'destination'
-        ).values(
-            'origin__iata_code',
-            'destination__iata_code'
-        ).annotate(
-            min_price=Min('price_usd'),
-            avg_duration=Avg('flight_duration_minutes')
-        )
+        # Boshlanish va manzil atrofidagi aeroportlar (birinchisi - asl shahar)
+        self.origin_airports = self._get_nearby_airports(self.origin.iata_code)
+        self.destination_airports = self._get_nearby_airports(self.destination.iata_code)
+
+        # Viza talab qilinadigan oraliq shaharlar (narxlashdan oldin chiqariladi)
+        self.excluded_cities = self._get_visa_excluded_cities()
 
-        for flight in flights:
-            origin = flight['origin__iata_code']
-            dest = flight['destination__iata_code']
-            price = float(flight['min_price'])
-            duration = int(flight['avg_duration'] or 240)
-
-            if origin in self.graph:
-                self.graph[origin].append((dest, price, duration, 'Multiple'))
-
-        # Hub shaharlar orasida standart narxlar qo'shish
-        self._add_estimated_routes()
-
-    def _add_estimated_routes(self):
-        """Taxminiy marshrutlarni qo'shish"""
-        hubs = ['DXB', 'IST', 'DOH', 'AUH', 'BKK', 'KUL', 'SIN']
-        major_cities = ['TAS', 'CAI'] + hubs
-
-        estimated_prices = {
-            ('TAS', 'IST'): (250, 300),
-            ('TAS', 'DXB'): (200, 270),
-            ('TAS', 'DOH'): (220, 300),
-            ('TAS', 'BKK'): (350, 420),
-            ('TAS', 'KUL'): (400, 480),
-            ('TAS', 'SIN'): (450, 540),
-            ('TAS', 'CAI'): (300, 360),
-            ('DXB', 'IST'): (150, 180),
-            ('DXB', 'DOH'): (80, 90),
-            ('DXB', 'BKK'): (250, 360),
-            ('DXB', 'KUL'): (280, 360),
-            ('DXB', 'SIN'): (300, 360),
-            ('DXB', 'CAI'): (180, 240),
-            ('IST', 'DOH'): (160, 210),
-            ('IST', 'BKK'): (350, 540),
-            ('IST', 'KUL'): (400, 540),
-            ('IST', 'SIN'): (420, 540),
-            ('IST', 'CAI'): (120, 150),
-            ('DOH', 'BKK'): (280, 390),
-            ('DOH', 'KUL'): (300, 420),
-            ('DOH', 'SIN'): (320, 420),
-            ('DOH', 'CAI'): (150, 180),
-            ('BKK', 'KUL'): (80, 120),
-            ('BKK', 'SIN'): (100, 150),
-            ('KUL', 'SIN'): (50, 60),
+    def _build_flight_graph(self):
+        """
+        Parvozlar grafini tuzish
+
+        snapshot berilsa (HTTP viewlar) - graf va hierarchy undan; berilmasa (batch/CLI) -
+        graf DB dan, hierarchy esa faqat snapshot barmoq izi mos kelsa ishlatiladi.
+        """
+        snapshot = self.snapshot
+        if snapshot:
+            # Oflayn snapshot dan (DB so'rovsiz)
+            self.graph = snapshot.graph
+            self.cities = snapshot.cities
+            self.graph_stats = snapshot.stats
+        else:
+            self.graph, self.cities, self.graph_stats = build_flight_graph()
+            snapshot = get_snapshot()
+
+        # Orqaga qidiruv uchun teskari graf
+        self.reverse_graph = build_reverse_graph(self.graph)
+
+        # Contraction hierarchy faqat graf o'zgarmagan bo'lsa ishlatiladi
+        self.hierarchy = None
+        if snapshot and snapshot.hierarchy:
+            if snapshot is self.snapshot or snapshot.fingerprint == graph_fingerprint(self.graph):
+                self.hierarchy = snapshot.hierarchy
+            else:
+                logger.info("Snapshot eskirgan - oddiy Dijkstra ishlatiladi")
+
+    def _default_oracle(self) -> PriceOracle:
+        """Graf, lokal baza va taxminiy narxlar zanjiri (so'rov ichida keshlangan)"""
+        return CachedOracle(ChainOracle([
+            SnapshotOracle(self.graph),
+            DatabaseOracle(),
+            ImputedOracle(),
+            AverageOracle(),
+            FallbackOracle(),
+        ]))
+
+    def _get_visa_excluded_cities(self) -> set:
+        """Pasport uchun viza talab qilinadigan shaharlar (boshlanish va manzildan tashqari)"""
+        field_name = VISA_REQUIREMENT_FIELDS.get(self.passport)
+        if not field_name:
+            if self.passport:
+                logger.info(f"Pasport {self.passport} uchun viza ma'lumoti yo'q")
+            return set()
+
+        endpoints = {*self.origin_airports, *self.destination_airports, *self.return_to}
+        return {
+            code for code, city in self.cities.items()
+            if code not in endpoints and city.country and getattr(city.country, field_name, False)
         }
 
-        for (origin, dest), (price, duration) in estimated_prices.items():
-            if origin in self.graph:
-                # Mavjud bo'lmasa qo'shish
-                existing = [x for x in self.graph[origin] if x[0] == dest]
-                if not existing:
-                    self.graph[origin].append((dest, price, duration, 'Estimated'))
-            if dest in self.graph:
-                existing = [x for x in self.graph[dest] if x[0] == origin]
-                if not existing:
-                    self.graph[dest].append((origin, price, duration, 'Estimated'))
-
-    def find_optimal_route(self, mode: str = MODE_BALANCED) -> List[Dict]:
-        """Optimal marshrutni topish"""
+    def _get_nearby_airports(self, code: str) -> List[str]:
+        """Shahar va radius ichidagi muqobil aeroportlar (grafda borlari)"""
+        if not self.nearby_radius_km:
+            return [code]
+        nearby = get_geo_index().nearby_code(code, self.nearby_radius_km)
+        return [code] + [other for _, other in nearby if other in self.graph]
+
+    def find_optimal_route(self, mode: str = MODE_BALANCED, deadline: Optional[float] = None) -> List[Dict]:
+        """
+        Optimal marshrutni topish
+
+        Args:
+            mode: Optimallashtirish rejimi
+            deadline: time.monotonic() bo'yicha muddat. Berilsa (va live narxlar
+                yoqilgan bo'lsa), avval kesh/DB bilan to'liq javob tuziladi, so'ng
+                segmentlar muddat tugaguncha live narxlar bilan aniqlashtiriladi.
+        """
+        anytime = deadline is not None and self.use_live_prices
+        self._defer_live = anytime
+        try:
+            variants = self._collect_variants()
+        finally:
+            self._defer_live = False
+
+        if anytime:
+            self._refine_with_live_prices(variants, deadline)
+
+        # Keyingi refine so'rovlari uchun parvozlar qatlami
+        self.flight_layer = copy.deepcopy(variants)
+
+        return self._finalize_variants(variants, mode)
+
+    def refine(self, mode: str = MODE_BALANCED) -> List[Dict]:
+        """
+        Parvozlar qatlamini qayta ishlatib variantlarni yangilash
+
+        Faqat mehmonxona narxlari (hotel_stars), yo'lovchilar soni, byudjet
+        filtri va ballar qayta hisoblanadi - graf va parvoz narxlari o'zgarmaydi.
+        """
+        variants = copy.deepcopy(self.flight_layer or [])
+
+        # Barcha mehmonxona shaharlari uchun bitta so'rov
+        cities = {hotel['city'] for v in variants for hotel in v['details'].get('hotels', [])}
+        self._prefetch_hotel_rates(sorted(cities))
+
+        for variant in variants:
+            total_hotel = 0
+            for hotel in variant['details'].get('hotels', []):
+                cost = self._get_hotel_cost(hotel['city'], hotel['nights'])
+                hotel['price_per_night'] = float(cost / hotel['nights']) if hotel['nights'] > 0 else 0
+                hotel['total_price'] = float(cost)
+                hotel['stars'] = self.hotel_stars
+                total_hotel += float(cost)
+            variant['total_hotel_cost'] = float(total_hotel)
+            variant.update(savings_percent=0, savings_amount=0, is_recommended=False, score=0)
+            self._recalculate_flight_totals(variant)
+
+        return self._finalize_variants(variants, mode)
+
+    def _finalize_variants(self, variants: List[Dict], mode: str) -> List[Dict]:
+        """Byudjet filtri, dublikatlar, tejamkorlik va baholash"""
+        # Byudjet cheklovini qo'llash
+        if self.budget_max:
+            variants = [v for v in variants if v['total_cost'] <= self.budget_max]
+
+        # Dublikatlarni olib tashlash
+        variants = self._remove_duplicates(variants)
+
+        # Tejamkorlikni hisoblash
+        self._calculate_savings(variants)
+
+        # Baholash va tartiblash
+        for variant in variants:
+            variant['score'] = self._calculate_advanced_score(variant, mode)
+
+        variants.sort(key=lambda x: x['score'], reverse=True)
+
+        # Eng yaxshisini belgilash
+        self._mark_recommended(variants, mode)
+
+        return variants
+
+    def _collect_variants(self) -> List[Dict]:
+        """Barcha turdagi variantlarni yig'ish"""
         variants = []
 
         # 1. Dijkstra bilan eng arzon yo'l
@@ -178,6 +307,20 @@ class RouteOptimizer:
             if variant:
                 variants.append(variant)
 
+        # 1b. Muqobil aeroportlar orqali eng arzon yo'l
+        if len(self.origin_airports) > 1 or len(self.destination_airports) > 1:
+            nearby_path = self._find_nearby_airports_path()
+            if nearby_path and nearby_path != cheapest_path:
+                variant = self._build_variant_from_path(nearby_path, 'optimal_cheap')
+                if variant:
+                    variant['details']['optimization']['algorithm'] = 'multi_source_dijkstra'
+                    variant['details']['nearby_airports'] = {
+                        'origin': nearby_path[0],
+                        'destination': nearby_path[-1],
+                        'radius_km': self.nearby_radius_km,
+                    }
+                    variants.append(variant)
+
         # 2. Dijkstra bilan eng tez yo'l
         fastest_path = self._dijkstra_fastest(
             self.origin.iata_code,
@@ -202,78 +345,158 @@ class RouteOptimizer:
             multi_variants = self._find_smart_multi_city()
             variants.extend(multi_variants)
 
-        # Byudjet cheklovini qo'llash
-        if self.budget_max:
-            variants = [v for v in variants if v['total_cost'] <= self.budget_max]
-
-        # Dublikatlarni olib tashlash
-        variants = self._remove_duplicates(variants)
+        return variants
 
-        # Tejamkorlikni hisoblash
-        self._calculate_savings(variants)
+    def _refine_with_live_prices(self, variants: List[Dict], deadline: float):
+        """Segmentlarni muddat tugaguncha live narxlar bilan aniqlashtirish"""
+        started = time.monotonic()
+
+        # Noyob segmentlar - eng arzon variantlar birinchi navbatda
+        pending = {}
+        for variant in sorted(variants, key=lambda x: x['total_cost']):
+            for segment in variant['details']['segments']:
+                key = (segment['from'], segment['to'], segment['date'])
+                pending.setdefault(key, []).append(segment)
+
+        refined = []
+        remaining = deadline - started
+        if pending and remaining > 0:
+            futures = {
+                _live_refine_executor.submit(
+                    self._fetch_live_flight_in_worker, origin, dest, date.fromisoformat(day)
+                ): (origin, dest, day)
+                for origin, dest, day in pending
+            }
+            done, not_done = wait(futures, timeout=remaining)
+            # Boshlanmaganlari bekor qilinadi, boshlanganlarini kutmaymiz - natijasi keshga tushadi
+            for future in not_done:
+                future.cancel()
+
+            for future in done:
+                key = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"Live API xatosi: {e}")
+                    continue
+                if not result:
+                    continue
+                for segment in pending.pop(key):
+                    segment['price'] = result['price']
+                    segment['airline'] = result['airline']
+                    segment['duration'] = result['duration']
+                    segment['data_source'] = result['data_source']
+                    segment['link'] = result.get('link', '')
+                    segment['refined'] = True
+                refined.append(f"{key[0]}-{key[1]}:{key[2]}")
 
-        # Baholash va tartiblash
         for variant in variants:
-            variant['score'] = self._calculate_advanced_score(variant, mode)
-
-        variants.sort(key=lambda x: x['score'], reverse=True)
+            self._recalculate_flight_totals(variant)
 
-        # Eng yaxshisini belgilash
-        self._mark_recommended(variants, mode)
+        self.refinement = {
+            'refined_segments': sorted(refined),
+            'pending_segments': sorted(f"{o}-{d}:{day}" for o, d, day in pending),
+            'complete': not pending,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        }
 
-        return variants
+    def _recalculate_flight_totals(self, variant: Dict):
+        """Segment narxlaridan variant jamilarini qayta hisoblash"""
+        segments = variant['details']['segments']
+        total_flight = sum(s['price'] for s in segments) * self.travelers
+        variant['total_flight_cost'] = float(total_flight)
+        variant['total_cost'] = float(total_flight + variant['total_hotel_cost'])
+        variant['total_duration'] = sum(s['duration'] for s in segments)
 
     def _dijkstra_cheapest(self, start: str, end: str) -> Optional[List[str]]:
-        """Dijkstra algoritmi - eng arzon yo'l"""
+        """Dijkstra algoritmi - eng arzon yo'l (hierarchy yoki ikki tomonlama qidiruv)"""
         if start not in self.graph or end not in self.graph:
             return None
 
-        # Priority queue: (cost, city, path)
-        heap = [(0, start, [start])]
-        visited = set()
-
-        while heap:
-            cost, current, path = heapq.heappop(heap)
-
-            if current in visited:
-                continue
-            visited.add(current)
-
-            if current == end:
+        if self.hierarchy:
+            path = self.hierarchy.query(start, end)
+            # Cheklovsiz eng arzon yo'l taqiqlangan shaharni chetlasa - u baribir optimal
+            if path and not self.excluded_cities.intersection(path):
                 return path
 
-            for neighbor, price, duration, airline in self.graph.get(current, []):
-                if neighbor not in visited:
-                    new_cost = cost + price
-                    heapq.heappush(heap, (new_cost, neighbor, path + [neighbor]))
+        return bidirectional_dijkstra(
+            self.graph, self.reverse_graph, start, end,
+            weight=edge_price, excluded=self.excluded_cities
+        )
 
-        return None
+    def _find_nearby_airports_path(self) -> Optional[List[str]]:
+        """Barcha muqobil boshlanish aeroportlaridan bitta qidiruv - eng arzon manzil aeroporti"""
+        dist, parents = dijkstra_tree(
+            self.graph, self.origin_airports,
+            weight=edge_price, excluded=self.excluded_cities
+        )
+        reachable = [code for code in self.destination_airports if code in dist]
+        if not reachable:
+            return None
+        best = min(reachable, key=lambda code: (dist[code], code))
+        return list(reversed(tree_path(parents, best)))
 
     def _dijkstra_fastest(self, start: str, end: str) -> Optional[List[str]]:
-        """Dijkstra algoritmi - eng tez yo'l"""
+        """Dijkstra algoritmi - eng tez yo'l (ikki tomonlama qidiruv)"""
         if start not in self.graph or end not in self.graph:
             return None
 
-        heap = [(0, start, [start])]
-        visited = set()
+        # Vaqtga har bir to'xtash uchun layover qo'shiladi (2 soat)
+        return bidirectional_dijkstra(
+            self.graph, self.reverse_graph, start, end,
+            weight=edge_duration, excluded=self.excluded_cities
+        )
 
-        while heap:
-            time, current, path = heapq.heappop(heap)
+    def _get_return_tree(self) -> Dict[str, Optional[str]]:
+        """
+        Qaytish yo'llari daraxti - qidiruv uchun bir marta hisoblanadi
+
+        Teskari grafda uy shahri (va open-jaw shaharlari) dan ko'p manbali
+        Dijkstra: har bir shahar uchun eng arzon qaytish yo'lidagi keyingi tugun.
+        """
+        if self._return_tree is None:
+            sources = self.origin_airports + [
+                code for code in self.return_to if code in self.graph
+            ]
+            self._return_costs, self._return_tree = dijkstra_tree(
+                self.reverse_graph, sources,
+                weight=edge_price, excluded=self.excluded_cities
+            )
+        return self._return_tree
 
-            if current in visited:
-                continue
-            visited.add(current)
+    def _get_return_costs(self) -> Dict[str, float]:
+        """Har bir shahardan uyga eng arzon qaytish narxi (graf bo'yicha)"""
+        self._get_return_tree()
+        return self._return_costs
 
-            if current == end:
-                return path
+    def _build_return_segments(self, from_code: str) -> List[Dict]:
+        """Qaytish segmentlari (hub orqali yoki boshqa shaharga qaytish mumkin)"""
+        path = tree_path(self._get_return_tree(), from_code)
+        if not path or len(path) < 2:
+            path = [from_code, self.origin.iata_code]
 
-            for neighbor, price, duration, airline in self.graph.get(current, []):
-                if neighbor not in visited:
-                    # Vaqtga layover qo'shamiz (2 soat)
-                    new_time = time + duration + (120 if len(path) > 1 else 0)
-                    heapq.heappush(heap, (new_time, neighbor, path + [neighbor]))
+        segments = []
+        for origin_code, dest_code in zip(path, path[1:]):
+            # Ulanishlar qaytish kunining o'zida (layover)
+            flight_info = self._get_flight_info(origin_code, dest_code, self.return_date)
+            segments.append({
+                'from': origin_code,
+                'from_name': self._get_city_name(origin_code),
+                'to': dest_code,
+                'to_name': self._get_city_name(dest_code),
+                'price': flight_info['price'],
+                'airline': flight_info['airline'],
+                'duration': flight_info['duration'],
+                'date': str(self.return_date),
+                'type': 'inbound',
+                'data_source': flight_info.get('data_source', 'unknown'),
+                'link': flight_info.get('link', ''),
+            })
+        return segments
 
-        return None
+    def _return_path(self, inbound: List[Dict]) -> List[str]:
+        """Qaytish segmentlaridan shaharlar ketma-ketligi"""
+        return [inbound[0]['from']] + [s['to'] for s in inbound]
 
     def _build_variant_from_path(self, path: List[str], route_type: str) -> Optional[Dict]:
         """Yo'ldan variant yaratish"""
@@ -312,27 +535,11 @@ class RouteOptimizer:
             if i < len(path) - 2:
                 current_date = current_date + timedelta(days=1)
 
-        # Qaytish parvozi
-        return_flight = self._get_flight_info(
-            self.destination.iata_code,
-            self.origin.iata_code,
-            self.return_date
-        )
-        segments.append({
-            'from': self.destination.iata_code,
-            'from_name': self._get_city_name(self.destination.iata_code),
-            'to': self.origin.iata_code,
-            'to_name': self._get_city_name(self.origin.iata_code),
-            'price': return_flight['price'],
-            'airline': return_flight['airline'],
-            'duration': return_flight['duration'],
-            'date': str(self.return_date),
-            'type': 'inbound',
-            'data_source': return_flight.get('data_source', 'unknown'),
-            'link': return_flight.get('link', ''),
-        })
-        total_flight_cost += return_flight['price']
-        total_duration += return_flight['duration']
+        # Qaytish parvozi (teskari daraxt bo'yicha, yo'l tugagan aeroportdan)
+        inbound = self._build_return_segments(path[-1])
+        segments.extend(inbound)
+        total_flight_cost += sum(s['price'] for s in inbound)
+        total_duration += sum(s['duration'] for s in inbound)
 
         # Mehmonxonalar
         hotels = self._calculate_hotels_for_path(path)
@@ -360,6 +567,7 @@ class RouteOptimizer:
                     'algorithm': 'dijkstra',
                     'path_length': len(path)
                 },
+                'return_path': self._return_path(inbound),
                 'bonus': self._get_bonus_for_path(path, route_type)
             }
         }
@@ -380,13 +588,14 @@ class RouteOptimizer:
         """Yo'l uchun mehmonxonalarni hisoblash"""
         hotels = []
         stops = len(path) - 2  # Oraliq shaharlar soni
+        destination = path[-1]  # Muqobil aeroport bo'lishi mumkin
 
         if stops == 0:
             # To'g'ridan-to'g'ri - faqat manzilda
-            hotel_cost = self._get_hotel_cost(self.destination.iata_code, self.nights)
+            hotel_cost = self._get_hotel_cost(destination, self.nights)
             hotels.append({
-                'city': self.destination.iata_code,
-                'city_name': self._get_city_name(self.destination.iata_code),
+                'city': destination,
+                'city_name': self._get_city_name(destination),
                 'nights': self.nights,
                 'price_per_night': float(hotel_cost / self.nights) if self.nights > 0 else 0,
                 'total_price': float(hotel_cost),
@@ -412,10 +621,10 @@ class RouteOptimizer:
 
             # Manzilda qolgan kunlar
             if remaining_nights > 0:
-                hotel_cost = self._get_hotel_cost(self.destination.iata_code, remaining_nights)
+                hotel_cost = self._get_hotel_cost(destination, remaining_nights)
                 hotels.append({
-                    'city': self.destination.iata_code,
-                    'city_name': self._get_city_name(self.destination.iata_code),
+                    'city': destination,
+                    'city_name': self._get_city_name(destination),
                     'nights': remaining_nights,
                     'price_per_night': float(hotel_cost / remaining_nights) if remaining_nights > 0 else 0,
                     'total_price': float(hotel_cost),
@@ -496,35 +705,87 @@ class RouteOptimizer:
         }
 
     def _find_best_transit_routes(self) -> List[Dict]:
-        """Eng yaxshi tranzit marshrutlarni topish"""
+        """Eng yaxshi tranzit marshrutlarni topish (quyi chegara bo'yicha kesish bilan)"""
         variants = []
-        hubs = self._get_dynamic_hubs()
+        ranked = self._get_dynamic_hubs()
 
-        for hub_code in hubs:
-            if hub_code in [self.origin.iata_code, self.destination.iata_code]:
-                continue
+        # Live narxlar graf narxidan arzon bo'lishi mumkin - chegara kafolat emas
+        can_prune = not (self.use_live_prices and not self._defer_live)
+
+        priced = 0
+        for bound, hub_code in ranked:
+            # Hub chegarasi joriy 3-o'rindagi variantdan oshsa, qolganlari ham oshadi
+            if can_prune and len(variants) >= 3 and bound > variants[2]['total_cost']:
+                break
 
             variant = self._calculate_transit_variant(hub_code)
+            priced += 1
             if variant:
                 variants.append(variant)
+                variants.sort(key=lambda x: x['total_cost'])
 
-        # Narx bo'yicha tartiblash va top 3 ni olish
-        variants.sort(key=lambda x: x['total_cost'])
+        logger.info(f"Tranzit: {len(ranked)} ta hubdan {priced} tasi narxlandi")
+
+        # Narx bo'yicha top 3
         return variants[:3]
 
-    def _get_dynamic_hubs(self) -> List[str]:
-        """Dinamik hub shaharlarni tanlash - optimallashtirilgan"""
-        # Standart hub shaharlarni qaytarish (tez)
-        # Graf allaqachon eng arzon parvozlarni o'z ichiga oladi
+    def _get_dynamic_hubs(self) -> List[Tuple[float, str]]:
+        """Dinamik hub shaharlar - (quyi chegara, kod) bo'yicha tartiblangan"""
+        # Standart hub shaharlar + graf orqali qo'shimcha hublar (DB so'rovsiz)
         standard_hubs = ['DXB', 'IST', 'DOH', 'BKK', 'KUL', 'SIN']
 
-        # Graf orqali qo'shimcha hublarni topish (DB so'rovsiz)
         hubs = set(standard_hubs)
         for dest, price, duration, airline in self.graph.get(self.origin.iata_code, []):
-            if dest not in [self.origin.iata_code, self.destination.iata_code]:
-                hubs.add(dest)
+            hubs.add(dest)
+        hubs -= {self.origin.iata_code, self.destination.iata_code}
+
+        # Viza talab qilinadigan va noma'lum hublar narxlanmaydi
+        hubs = {code for code in hubs if code in self.cities} - self.excluded_cities
+
+        bounds = self._hub_lower_bounds(hubs)
+        ranked = sorted((bounds[code], code) for code in hubs)
+        return ranked[:8]  # Maksimal 8 ta hub
+
+    def _hub_lower_bounds(self, hubs) -> Dict[str, float]:
+        """
+        Tranzit variant narxining quyi chegarasi
+
+        Graf dagi eng arzon origin -> hub, hub -> manzil va qaytish narxi
+        + hub va manzildagi eng arzon mehmonxona kechalari.
+        """
+        origin_code = self.origin.iata_code
+        dest_code = self.destination.iata_code
+        self._prefetch_hotel_rates(list(hubs) + [dest_code])
+
+        return_cost = self._get_return_costs().get(dest_code, 0)
+        dest_hotel = self._cheapest_night(dest_code) * max(0, self.nights - 1)
+
+        bounds = {}
+        for hub_code in hubs:
+            flights = (
+                self._min_edge_price(origin_code, hub_code)
+                + self._min_edge_price(hub_code, dest_code)
+                + return_cost
+            )
+            bounds[hub_code] = flights * self.travelers + self._cheapest_night(hub_code) + dest_hotel
+        return bounds
 
-        return list(hubs)[:8]  # Maksimal 8 ta hub
+    def _min_edge_price(self, origin: str, dest: str) -> float:
+        """Graf dagi eng arzon to'g'ridan-to'g'ri narx (qirra bo'lmasa 0 - chegara sifatida)"""
+        return min((edge[1] for edge in self.graph.get(origin, []) if edge[0] == dest), default=0)
+
+    def _cheapest_night(self, city_code: str) -> float:
+        """Keshdagi eng arzon kecha narxi (noma'lum bo'lsa 0)"""
+        return float(self._hotel_cache.get((city_code, self.hotel_stars), 0))
+
+    def _prefetch_hotel_rates(self, city_codes: List[str]):
+        """Shaharlar uchun eng arzon kecha narxlarini bitta so'rov bilan keshga olish"""
+        missing = [code for code in city_codes if (code, self.hotel_stars) not in self._hotel_cache]
+        if not missing:
+            return
+
+        for code, rate in self.oracle.hotel_nights(missing, self.hotel_stars).items():
+            self._hotel_cache[(code, self.hotel_stars)] = rate
 
     def _calculate_transit_variant(self, hub_code: str) -> Optional[Dict]:
         """Tranzit variant hisoblash"""
@@ -539,13 +800,13 @@ class RouteOptimizer:
         seg1 = self._get_flight_info(self.origin.iata_code, hub_code, self.departure_date)
         hub_departure = self.departure_date + timedelta(days=nights_at_hub)
         seg2 = self._get_flight_info(hub_code, self.destination.iata_code, hub_departure)
-        seg3 = self._get_flight_info(self.destination.iata_code, self.origin.iata_code, self.return_date)
+        inbound = self._build_return_segments(self.destination.iata_code)
 
         # Mehmonxonalar
         hub_hotel = self._get_hotel_cost(hub_code, nights_at_hub)
         dest_hotel = self._get_hotel_cost(self.destination.iata_code, dest_nights)
 
-        total_flight = (seg1['price'] + seg2['price'] + seg3['price']) * self.travelers
+        total_flight = (seg1['price'] + seg2['price'] + sum(s['price'] for s in inbound)) * self.travelers
         total_hotel = float(hub_hotel) + float(dest_hotel)
         total_cost = total_flight + total_hotel
 
@@ -555,7 +816,7 @@ class RouteOptimizer:
             'total_flight_cost': float(total_flight),
             'total_hotel_cost': float(total_hotel),
             'total_cost': float(total_cost),
-            'total_duration': seg1['duration'] + seg2['duration'] + seg3['duration'],
+            'total_duration': seg1['duration'] + seg2['duration'] + sum(s['duration'] for s in inbound),
             'stops': 1,
             'savings_percent': 0,
             'savings_amount': 0,
@@ -589,19 +850,7 @@ class RouteOptimizer:
                         'data_source': seg2.get('data_source', 'unknown'),
                         'link': seg2.get('link', ''),
                     },
-                    {
-                        'from': self.destination.iata_code,
-                        'from_name': self._get_city_name(self.destination.iata_code),
-                        'to': self.origin.iata_code,
-                        'to_name': self._get_city_name(self.origin.iata_code),
-                        'price': seg3['price'],
-                        'airline': seg3['airline'],
-                        'duration': seg3['duration'],
-                        'date': str(self.return_date),
-                        'type': 'inbound',
-                        'data_source': seg3.get('data_source', 'unknown'),
-                        'link': seg3.get('link', ''),
-                    }
+                    *inbound
                 ],
                 'hotels': [
                     {
@@ -627,6 +876,7 @@ class RouteOptimizer:
                     'country': hub.country.name_uz if hub and hub.country else '',
                     'flag': hub.country.flag_emoji if hub and hub.country else ''
                 },
+                'return_path': self._return_path(inbound),
                 'bonus': f"2 ta mamlakatni ko'rasiz! {self._get_city_name(hub_code)} shahriga tashrif buyuring.",
                 'countries_count': 2
             }
@@ -648,6 +898,8 @@ class RouteOptimizer:
                 continue
             if hub2 in [self.origin.iata_code, self.destination.iata_code]:
                 continue
+            if hub1 in self.excluded_cities or hub2 in self.excluded_cities:
+                continue
 
             variant = self._calculate_multi_city_variant(hub1, hub2)
             if variant:
@@ -682,14 +934,14 @@ class RouteOptimizer:
         seg2 = self._get_flight_info(hub1, hub2, hub1_departure)
         hub2_departure = hub1_departure + timedelta(days=nights_per_city)
         seg3 = self._get_flight_info(hub2, self.destination.iata_code, hub2_departure)
-        seg4 = self._get_flight_info(self.destination.iata_code, self.origin.iata_code, self.return_date)
+        inbound = self._build_return_segments(self.destination.iata_code)
 
         # Mehmonxonalar
         hub1_hotel = self._get_hotel_cost(hub1, nights_per_city)
         hub2_hotel = self._get_hotel_cost(hub2, nights_per_city)
         dest_hotel = self._get_hotel_cost(self.destination.iata_code, dest_nights)
 
-        total_flight = (seg1['price'] + seg2['price'] + seg3['price'] + seg4['price']) * self.travelers
+        total_flight = (seg1['price'] + seg2['price'] + seg3['price'] + sum(s['price'] for s in inbound)) * self.travelers
         total_hotel = float(hub1_hotel) + float(hub2_hotel) + float(dest_hotel)
         total_cost = total_flight + total_hotel
 
@@ -699,7 +951,7 @@ class RouteOptimizer:
             'total_flight_cost': float(total_flight),
             'total_hotel_cost': float(total_hotel),
             'total_cost': float(total_cost),
-            'total_duration': seg1['duration'] + seg2['duration'] + seg3['duration'] + seg4['duration'],
+            'total_duration': seg1['duration'] + seg2['duration'] + seg3['duration'] + sum(s['duration'] for s in inbound),
             'stops': 2,
             'savings_percent': 0,
             'savings_amount': 0,
@@ -746,19 +998,7 @@ class RouteOptimizer:
                         'data_source': seg3.get('data_source', 'unknown'),
                         'link': seg3.get('link', ''),
                     },
-                    {
-                        'from': self.destination.iata_code,
-                        'from_name': self._get_city_name(self.destination.iata_code),
-                        'to': self.origin.iata_code,
-                        'to_name': self._get_city_name(self.origin.iata_code),
-                        'price': seg4['price'],
-                        'airline': seg4['airline'],
-                        'duration': seg4['duration'],
-                        'date': str(self.return_date),
-                        'type': 'inbound',
-                        'data_source': seg4.get('data_source', 'unknown'),
-                        'link': seg4.get('link', ''),
-                    }
+                    *inbound
                 ],
                 'hotels': [
                     {
@@ -787,6 +1027,7 @@ class RouteOptimizer:
                     }
                 ],
                 'countries_count': 3,
+                'return_path': self._return_path(inbound),
                 'bonus': f"3 ta mamlakatni ko'rasiz! {self._get_city_name(hub1)} va {self._get_city_name(hub2)} orqali ajoyib sayohat."
             }
         }
@@ -795,106 +1036,41 @@ class RouteOptimizer:
         """Parvoz ma'lumotlarini olish - Real API yoki lokal bazadan"""
 
         # 0. Real vaqtda narxlar (agar yoqilgan bo'lsa)
-        if self.use_live_prices:
-            cache_key = (origin, dest, str(date))
-            if cache_key in self._live_prices_cache:
-                return self._live_prices_cache[cache_key]
-
+        if self.use_live_prices and not self._defer_live:
             try:
-                flights = travelpayouts_api.search_flights(origin, dest, date)
-                if flights:
-                    cheapest = min(flights, key=lambda x: x['price'])
-                    result = {
-                        'price': cheapest['price'],
-                        'airline': cheapest.get('airline', 'Aviakompaniya'),
-                        'duration': cheapest.get('duration', 240),
-                        'data_source': 'live_api',
-                        'link': cheapest.get('link', ''),
-                    }
-                    self._live_prices_cache[cache_key] = result
-                    logger.info(f"Live API: {origin}->{dest} = ${cheapest['price']}")
+                result = self._fetch_live_flight(origin, dest, date)
+                if result:
                     return result
             except Exception as e:
                 logger.warning(f"Live API xatosi: {e}")
 
-        # 1. Graf dan olish (eng tez - keshdan)
-        for neighbor, price, duration, airline in self.graph.get(origin, []):
-            if neighbor == dest:
-                return {'price': price, 'airline': airline, 'duration': duration, 'data_source': 'graph_cache'}
-
-        # 2. Lokal bazadan qidirish (aniq sana)
-        flight = FlightPrice.objects.filter(
-            origin__iata_code=origin,
-            destination__iata_code=dest,
-            departure_date=date
-        ).order_by('price_usd').first()
-
-        if flight:
-            return {
-                'price': float(flight.price_usd),
-                'airline': flight.airline,
-                'duration': flight.flight_duration_minutes,
-                'data_source': 'database',
-            }
-
-        # 3. O'rtacha narxni tekshirish
-        key = (origin, dest)
-        if key in self._avg_prices_cache:
-            return self._avg_prices_cache[key]
+        # 1. Narxlar manbai: graf -> aniq sana (baza) -> taxminiy jadval -> o'rtacha narx
+        return self.oracle.flight(origin, dest, date) or FALLBACK_ORACLE.flight(origin, dest, date)
 
-        avg_price = FlightPrice.objects.filter(
-            origin__iata_code=origin,
-            destination__iata_code=dest
-        ).aggregate(avg=Avg('price_usd'))['avg']
+    def _fetch_live_flight(self, origin: str, dest: str, date) -> Optional[Dict]:
+        """Real vaqtdagi eng arzon parvoz (Travelpayouts)"""
+        return self._live_oracle.flight(origin, dest, date)
 
-        if avg_price:
-            result = {'price': float(avg_price), 'airline': 'Aviakompaniya', 'duration': 240, 'data_source': 'database_avg'}
-            self._avg_prices_cache[key] = result
-            return result
-
-        return {'price': 200, 'airline': 'Aviakompaniya', 'duration': 240, 'data_source': 'fallback'}
+    def _fetch_live_flight_in_worker(self, origin: str, dest: str, date) -> Optional[Dict]:
+        """_fetch_live_flight pul oqimida (oracle ORM ga murojaat qiladi - ulanish oqimda qolmaydi)"""
+        try:
+            return self._fetch_live_flight(origin, dest, date)
+        finally:
+            close_old_connections()
 
     def _get_hotel_cost(self, city_code: str, nights: int) -> Decimal:
         """Mehmonxona narxini olish - Faqat lokal bazadan (tez)"""
         if nights <= 0:
             return Decimal('0')
 
-        # 1. Keshdan tekshirish
         cache_key = (city_code, self.hotel_stars)
-        if hasattr(self, '_hotel_cache') and cache_key in self._hotel_cache:
-            return self._hotel_cache[cache_key] * nights
-
-        # 2. Lokal bazadan qidirish
-        hotel = HotelPrice.objects.filter(
-            city__iata_code=city_code,
-            stars__gte=self.hotel_stars
-        ).order_by('price_per_night_usd').first()
-
-        if hotel:
-            if not hasattr(self, '_hotel_cache'):
-                self._hotel_cache = {}
-            self._hotel_cache[cache_key] = hotel.price_per_night_usd
-            return hotel.price_per_night_usd * nights
-
-        # 3. Taxminiy narxlar (hostel va mehmonxona turlari bo'yicha)
-        fallback_prices = {
-            'IST': {1: 15, 2: 30, 3: 55, 4: 95, 5: 180},
-            'DXB': {1: 20, 2: 35, 3: 45, 4: 85, 5: 200},
-            'DOH': {1: 25, 2: 40, 3: 60, 4: 110, 5: 200},
-            'BKK': {1: 8, 2: 15, 3: 25, 4: 65, 5: 150},
-            'KUL': {1: 10, 2: 20, 3: 35, 4: 80, 5: 150},
-            'SIN': {1: 25, 2: 45, 3: 70, 4: 150, 5: 300},
-            'CAI': {1: 10, 2: 20, 3: 35, 4: 90, 5: 180},
-            'TAS': {1: 12, 2: 25, 3: 40, 4: 70, 5: 120},
-        }
-
-        city_fallback = fallback_prices.get(city_code, {1: 15, 2: 30, 3: 50, 4: 100, 5: 200})
-        price_per_night = city_fallback.get(self.hotel_stars, 50)
-
-        if not hasattr(self, '_hotel_cache'):
-            self._hotel_cache = {}
-        self._hotel_cache[cache_key] = Decimal(str(price_per_night))
-        return Decimal(str(price_per_night)) * nights
+        if cache_key not in self._hotel_cache:
+            # Baza, topilmasa taxminiy narxlar (hostel va mehmonxona turlari bo'yicha)
+            rate = self.oracle.hotel_night(city_code, self.hotel_stars)
+            if rate is None:
+                rate = FALLBACK_ORACLE.hotel_night(city_code, self.hotel_stars)
+            self._hotel_cache[cache_key] = rate
+        return self._hotel_cache[cache_key] * nights
 
     def _get_city_name(self, code: str) -> str:
         """Shahar nomini olish"""
@@ -992,6 +1168,11 @@ class RouteOptimizer:
 
         best['is_recommended'] = True
 
+    def cache_flight_layer(self):
+        """Parvozlar qatlamini qidiruv bo'yicha keshga saqlash (refine uchun)"""
+        if self.search.pk and self.flight_layer is not None:
+            cache.set(flight_layer_cache_key(self.search.pk), self.flight_layer, FLIGHT_LAYER_CACHE_TTL)
+
     def save_variants(self, variants: List[Dict]) -> List[RouteVariant]:
         """Variantlarni bazaga saqlash"""
         saved = []
@@ -1011,3 +1192,34 @@ class RouteOptimizer:
             )
             saved.append(route)
         return saved
+
+
+def flight_layer_cache_key(search_id: int) -> str:
+    return f"flight_layer:{search_id}"
+
+
+def load_flight_layer(search: TravelSearch) -> Tuple[List[Dict], str]:
+    """Qidiruvning parvozlar qatlami: keshdan, bo'lmasa saqlangan variantlardan"""
+    layer = cache.get(flight_layer_cache_key(search.pk))
+    if layer is not None:
+        return layer, 'cache'
+
+    # Keshda yo'q - saqlangan variantlar (byudjetdan o'tganlari) asosida
+    layer = []
+    for route in search.variants.all():
+        segments = route.details.get('segments', [])
+        layer.append({
+            'route_type': route.route_type,
+            'cities_sequence': route.cities_sequence,
+            'total_flight_cost': float(route.total_flight_cost),
+            'total_hotel_cost': float(route.total_hotel_cost),
+            'total_cost': float(route.total_cost),
+            'total_duration': sum(s.get('duration', 0) for s in segments),
+            'stops': max(0, len(route.cities_sequence) - 2),
+            'savings_percent': 0,
+            'savings_amount': 0,
+            'is_recommended': False,
+            'score': 0,
+            'details': route.details,
+        })
+    return layer, 'saved_variants'
@@ -0,0 +1,256 @@
+"""
+Single Flight - Bir xil kalit uchun parallel so'rovlarni birlashtirish
+
+Keshda yo'q kalitga bir vaqtda ko'p so'rov kelganda tashqi API faqat bir marta
+chaqiriladi:
+1. Protsess ichida - birinchi chaqiruvchi (leader) yuklaydi, qolganlari Event da kutadi
+2. Protsesslar o'rtasida - umumiy keshda cache.add qulfi; qulfni ololmagan protsess
+   natija keshda paydo bo'lguncha (yoki qulf bo'shaguncha) kutadi
+
+Kutish muddati tugasa chaqiruvchi o'zi yuklaydi - so'rov hech qachon osilib qolmaydi.
+Async chaqiruvchilar uchun ado() - kutish event loop da, oqim band qilinmaydi.
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# peek() natija topilmaganini bildiradi
+NOT_FOUND = object()
+
+
+class _LeaderCancelled(Exception):
+    """Async leader bekor qilindi (masalan, mijoz uzildi) - kutayotganlar o'zi yuklaydi"""
+
+
+class _Call:
+    """Jarayondagi yuklash"""
+
+    def __init__(self, future: Optional[asyncio.Future] = None):
+        self.event = threading.Event()
+        # Async chaqiruvchilar Event o'rniga shu Future ni kutadi
+        self.future = future
+        self.value = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Kalit bo'yicha bitta yuklash (protsess ichida va protsesslar o'rtasida)"""
+
+    def __init__(
+        self,
+        get_shared: Callable[[], Any],
+        wait_timeout: float = 20.0,
+        lock_ttl: int = 30,
+        poll_interval: float = 0.1
+    ):
+        self.get_shared = get_shared
+        self.wait_timeout = wait_timeout
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        # (event loop, kalit) -> yuklash (async chaqiruvchilar)
+        self._async_calls: Dict[Tuple[int, str], _Call] = {}
+        self._lock = threading.Lock()
+        self._counters = {'leaders': 0, 'followers': 0, 'remote_waits': 0, 'remote_hits': 0, 'timeouts': 0}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def do(self, key: str, loader: Callable[[], Any], peek: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        loader() natijasi; kalit allaqachon yuklanayotgan bo'lsa - o'sha natija
+
+        peek() - boshqa protsess yozgan natijani umumiy keshdan o'qish (yo'q bo'lsa NOT_FOUND)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters['leaders'] += 1
+            else:
+                call.followers += 1
+                self._counters['followers'] += 1
+
+        if not leader:
+            if call.event.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                # Leader natijasining nusxasi - chaqiruvchilar bir-biriga ta'sir qilmaydi
+                return copy.deepcopy(call.value)
+            # Leader juda sekin - o'zimiz yuklaymiz
+            self._count('timeouts')
+            return loader()
+
+        value = None
+        try:
+            value = self._load_with_lock(key, loader, peek)
+            return value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Olib tashlangandan keyin yangi follower qo'shilmaydi - soni aniq
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.followers and call.error is None:
+                # Kutayotganlarga alohida nusxa - leader chaqiruvchisi natijani o'zgartirsa ham ta'sir qilmaydi
+                call.value = copy.deepcopy(value)
+            call.event.set()
+
+    def _load_with_lock(self, key: str, loader: Callable[[], Any], peek: Optional[Callable[[], Any]]) -> Any:
+        """Protsesslar o'rtasidagi qulf bilan yuklash"""
+        lock_key = f"{key}:load"
+        token = uuid.uuid4().hex
+        try:
+            shared = self.get_shared()
+            acquired = shared.add(lock_key, token, self.lock_ttl)
+        except Exception as e:
+            # Umumiy kesh ishlamasa - faqat protsess ichidagi birlashtirish
+            logger.warning(f"Single-flight qulfi olinmadi ({key}): {e}")
+            return loader()
+
+        if acquired:
+            try:
+                return loader()
+            finally:
+                try:
+                    self._release(shared, lock_key, token)
+                except Exception:
+                    pass
+
+        # Boshqa protsess yuklamoqda - natija keshga tushishini kutamiz
+        self._count('remote_waits')
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            try:
+                if peek is not None:
+                    value = peek()
+                    if value is not NOT_FOUND:
+                        self._count('remote_hits')
+                        return value
+                if shared.get(lock_key) is None:
+                    # Qulf bo'shadi, lekin natija keshlanmagan (masalan, bo'sh javob)
+                    break
+            except Exception:
+                break
+        else:
+            self._count('timeouts')
+
+        return loader()
+
+    async def ado(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        peek: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """do() ning async varianti: loader - korutina, peek - sinxron (oqimda chaqiriladi)"""
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        with self._lock:
+            call = self._async_calls.get(call_key)
+            leader = call is None
+            if leader:
+                call = self._async_calls[call_key] = _Call(loop.create_future())
+                self._counters['leaders'] += 1
+            else:
+                call.followers += 1
+                self._counters['followers'] += 1
+        future = call.future
+
+        if not leader:
+            try:
+                value = await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self._count('timeouts')
+                return await loader()
+            except _LeaderCancelled:
+                return await loader()
+            return copy.deepcopy(value)
+
+        loaded = False
+        try:
+            value = await self._aload_with_lock(key, loader, peek)
+            loaded = True
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Kutayotgan bo'lmasa ham "retrieved" - asyncio ogohlantirmasin
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                self._async_calls.pop(call_key, None)
+            if loaded:
+                # do() dagi kabi - kutayotganlarga leader qiymatidan alohida nusxa
+                future.set_result(copy.deepcopy(value) if call.followers else value)
+            elif not future.done():
+                # cancel() emas - kutayotganlar o'zlari bekor qilinmagan
+                future.set_exception(_LeaderCancelled())
+                future.exception()
+
+    async def _aload_with_lock(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        peek: Optional[Callable[[], Any]]
+    ) -> Any:
+        """_load_with_lock ning async varianti (kesh amallari oqimda, kutish - asyncio.sleep)"""
+        lock_key = f"{key}:load"
+        token = uuid.uuid4().hex
+        try:
+            shared = self.get_shared()
+            acquired = await sync_to_async(shared.add, thread_sensitive=False)(lock_key, token, self.lock_ttl)
+        except Exception as e:
+            logger.warning(f"Single-flight qulfi olinmadi ({key}): {e}")
+            return await loader()
+
+        if acquired:
+            try:
+                return await loader()
+            finally:
+                try:
+                    await sync_to_async(self._release, thread_sensitive=False)(shared, lock_key, token)
+                except Exception:
+                    pass
+
+        self._count('remote_waits')
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if peek is not None:
+                    value = await sync_to_async(peek, thread_sensitive=False)()
+                    if value is not NOT_FOUND:
+                        self._count('remote_hits')
+                        return value
+                if await sync_to_async(shared.get, thread_sensitive=False)(lock_key) is None:
+                    break
+            except Exception:
+                break
+        else:
+            self._count('timeouts')
+
+        return await loader()
+
+    @staticmethod
+    def _release(shared, lock_key: str, token: str):
+        # Faqat o'z qulfimizni bo'shatamiz (muddati o'tib boshqasi olgan bo'lishi mumkin)
+        if shared.get(lock_key) == token:
+            shared.delete(lock_key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._calls) + len(self._async_calls)}